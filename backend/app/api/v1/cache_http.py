@@ -0,0 +1,105 @@
+"""
+GET condicional (ETag / If-None-Match) y Cache-Control para las rutas de la API v1
+
+Cada ruta declara una versión barata de sus datos (p. ej. cantidad de filas
+y máximo updated_at, leídos del índice) con la dependencia `VersionHTTP`.
+El ETag se arma con esa versión y la URL, sin generar la respuesta: si
+coincide con el If-None-Match del cliente se responde 304 sin cuerpo.
+
+Los routers que la usan se crean con `APIRouter(route_class=RutaConVersion)`,
+que responde el 304 y agrega ETag y Cache-Control a la respuesta, incluso
+cuando la ruta retorna un Response propio.
+"""
+import hashlib
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from fastapi import Depends, Request, Response, status
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.deps import get_async_db
+
+# Los datos de residentes no deben quedar en caches compartidos; el
+# navegador los guarda pero los revalida en cada uso
+CACHE_CONTROL_PRIVADO = "private, no-cache"
+
+# Datos comunes a todos los usuarios que cambian muy poco
+CACHE_CONTROL_PUBLICO = "public, max-age=60"
+
+
+def calcular_etag(*version: Any) -> str:
+    """ETag débil a partir de los valores que identifican la versión de los datos"""
+    crudo = "|".join(v.isoformat() if isinstance(v, (date, datetime)) else str(v) for v in version)
+    return 'W/"' + hashlib.blake2b(crudo.encode(), digest_size=12).hexdigest() + '"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista de ETags o "*") con el ETag actual"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaco = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == opaco for candidato in if_none_match.split(","))
+
+
+def no_modificado(etag: str, cache_control: str = CACHE_CONTROL_PRIVADO) -> Response:
+    """Respuesta 304 con los headers de validación"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+class NoModificado(Exception):
+    """El cliente ya tiene la versión actual (lo responde RutaConVersion)"""
+
+    def __init__(self, etag: str, cache_control: str):
+        self.etag = etag
+        self.cache_control = cache_control
+
+
+class VersionHTTP:
+    """
+    Dependencia de GET condicional.
+
+    `version(request, db)` retorna los valores que cambian cuando cambia la
+    respuesta (sin generarla). La URL completa (ruta y parámetros) forma
+    parte del ETag.
+    """
+
+    def __init__(
+        self,
+        version: Callable[[Request, AsyncSession], Awaitable[Iterable[Any]]],
+        cache_control: str = CACHE_CONTROL_PRIVADO,
+    ):
+        self.version = version
+        self.cache_control = cache_control
+
+    async def __call__(self, request: Request, db: AsyncSession = Depends(get_async_db)) -> str:
+        etag = calcular_etag(request.url.path, request.url.query, *(await self.version(request, db)))
+        if etag_coincide(request.headers.get("if-none-match"), etag):
+            raise NoModificado(etag, self.cache_control)
+        request.state.cache_http = {"ETag": etag, "Cache-Control": self.cache_control}
+        return etag
+
+
+class RutaConVersion(APIRoute):
+    """Ruta que responde NoModificado con 304 y agrega los headers de VersionHTTP"""
+
+    def get_route_handler(self) -> Callable:
+        manejador = super().get_route_handler()
+
+        async def manejar(request: Request) -> Response:
+            try:
+                respuesta = await manejador(request)
+            except NoModificado as e:
+                return no_modificado(e.etag, e.cache_control)
+            headers = getattr(request.state, "cache_http", None)
+            if headers and respuesta.status_code == status.HTTP_200_OK:
+                for nombre, valor in headers.items():
+                    respuesta.headers.setdefault(nombre, valor)
+            return respuesta
+
+        return manejar
@@ -0,0 +1,42 @@
+"""
+Utilidades de paginación por cursor (keyset) para las rutas de la API v1
+
+El cursor es opaco para el cliente: los valores de la última fila de la
+página, serializados en JSON y codificados en base64 url-safe.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List
+
+from fastapi import HTTPException, status
+
+# Header con el cursor de la página siguiente (ausente en la última página)
+HEADER_SIGUIENTE_CURSOR = "X-Next-Cursor"
+
+
+def codificar_cursor(*valores: Any) -> str:
+    """Codifica los valores de la clave de orden de la última fila"""
+    serializables = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in valores]
+    crudo = json.dumps(serializables, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, cantidad: int) -> List[Any]:
+    """
+    Decodifica un cursor generado por `codificar_cursor`.
+
+    Raises:
+        HTTPException 400 si el cursor no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != cantidad:
+            raise ValueError("cantidad de valores incorrecta")
+        return valores
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación no válido"
+        )
@@ -1,8 +1,9 @@
 from fastapi import APIRouter
-from .routes import auth, gastos, reservas, pagos
+from .routes import auth, gastos, reservas, pagos, uf
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(gastos.router, prefix="/gastos", tags=["gastos"])
 api_router.include_router(reservas.router, prefix="/reservas", tags=["reservas"])
 api_router.include_router(pagos.router, prefix="/pagos", tags=["pagos"])
+api_router.include_router(uf.router, prefix="/uf", tags=["uf"])
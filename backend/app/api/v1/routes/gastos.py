@@ -1,11 +1,96 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ....db.deps import get_async_db
+from ....models.models import Condominio, GastoComun, Vivienda
+from ....schemas.gastos import FacturacionCreate, FacturacionResponse
+from ....services.facturacion import facturar_mes
+from ....services.morosidad import invalidar_morosidad
+from ....services.uf import UFNoDisponible, servicio_uf
+from ..cache_http import RutaConVersion, VersionHTTP
+import json
 
-router = APIRouter()
+router = APIRouter(route_class=RutaConVersion)
 
-@router.get("/vivienda/{vivienda_id}")
-async def listar_gastos(vivienda_id: int):
-    # TODO: fetch from DB. Mock for now
-    return [
-        {"id": 1, "mes": 1, "ano": 2025, "monto_total": 150000, "estado": "pendiente"},
-        {"id": 2, "mes": 2, "ano": 2025, "monto_total": 150000, "estado": "pagado"}
-    ]
+
+async def _version_gastos_vivienda(request: Request, db: AsyncSession):
+    # Cantidad de gastos y último updated_at (solo del índice por vivienda)
+    return (await db.execute(
+        select(func.count(), func.max(GastoComun.updated_at))
+        .where(GastoComun.vivienda_id == int(request.path_params["vivienda_id"]))
+    )).one()
+
+
+@router.get("/vivienda/{vivienda_id}", dependencies=[Depends(VersionHTTP(_version_gastos_vivienda))])
+async def listar_gastos(vivienda_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Gastos comunes de la vivienda, del periodo más reciente al más antiguo.
+
+    Responde con un ETag (cantidad de gastos y último updated_at, leídos del
+    índice por vivienda); si el cliente envía ese mismo ETag en
+    If-None-Match se responde 304 sin volver a leer ni enviar los gastos.
+    """
+    gastos = (await db.execute(
+        select(
+            GastoComun.id,
+            GastoComun.mes,
+            GastoComun.ano,
+            GastoComun.monto_total,
+            GastoComun.estado,
+            GastoComun.vencimiento,
+        ).where(
+            GastoComun.vivienda_id == vivienda_id
+        ).order_by(GastoComun.ano.desc(), GastoComun.mes.desc(), GastoComun.id.desc())
+    )).all()
+    if not gastos and await db.get(Vivienda, vivienda_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vivienda {vivienda_id} no encontrada"
+        )
+    contenido = json.dumps([
+        {
+            "id": g.id,
+            "mes": g.mes,
+            "ano": g.ano,
+            "monto_total": float(g.monto_total),
+            "estado": g.estado,
+            "vencimiento": g.vencimiento.isoformat() if g.vencimiento else None,
+        }
+        for g in gastos
+    ], separators=(",", ":"))
+    return Response(content=contenido, media_type="application/json")
+
+@router.post(
+    "/facturacion",
+    response_model=FacturacionResponse,
+    summary="Facturar los gastos comunes de un mes",
+)
+async def facturar(datos: FacturacionCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Genera el gasto común del mes para cada vivienda del condominio
+    (cargo_fijo_uf × valor_uf, por defecto la UF del día). Es idempotente:
+    las viviendas que ya tienen el gasto del mes se omiten, así que una
+    facturación interrumpida se completa volviendo a ejecutarla.
+    """
+    if await db.get(Condominio, datos.condominio_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Condominio {datos.condominio_id} no encontrado"
+        )
+    valor_uf = datos.valor_uf
+    if valor_uf is None:
+        try:
+            valor_uf = (await servicio_uf.obtener(db)).valor
+        except UFNoDisponible as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    resumen = await facturar_mes(
+        db, datos.condominio_id, datos.ano, datos.mes, valor_uf, vencimiento=datos.vencimiento
+    )
+    invalidar_morosidad(datos.condominio_id)
+    return FacturacionResponse(
+        condominio_id=datos.condominio_id,
+        ano=datos.ano,
+        mes=datos.mes,
+        valor_uf=float(valor_uf),
+        **resumen
+    )
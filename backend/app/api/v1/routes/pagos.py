@@ -1,114 +1,569 @@
-from fastapi import APIRouter, Depends
-from typing import Any
-from sqlalchemy.orm import Session
-from ....db.deps import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Float, Numeric, Select, Text, cast, func, literal, literal_column, null, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import Callable, List, NamedTuple, Optional, Tuple
+from ....core.config import settings
+from ....db.deps import get_async_db
+from ....db.session import AsyncSessionLocal
 from ....models.models import (
+    Condominio,
     ResidenteVivienda,
+    SaldoVivienda,
     Vivienda,
     GastoComun,
     Multa,
     Reserva,
 )
+from ....services.conciliacion import CartolaInvalida, conciliar_cartola, lineas_de_bytes
+from ....services.morosidad import a_csv, a_ndjson, invalidar_morosidad, leer_morosidad
+from ....services.saldos import obtener_saldos, serializar_saldo
+from ....services.uf import UFNoDisponible, ValorUFDia, servicio_uf
+from ..cache_http import RutaConVersion, VersionHTTP
+from ..paginacion import HEADER_SIGUIENTE_CURSOR, codificar_cursor, decodificar_cursor
 import logging
 import json
-from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=RutaConVersion)
 
-# Helper para convertir Decimal a float
-def decimal_to_float(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+# Headers con el cursor de la página siguiente de cada sección del desglose
+# (ausentes en la última página)
+HEADER_CURSOR_GASTOS = "X-Next-Cursor-Gastos"
+HEADER_CURSOR_MULTAS = "X-Next-Cursor-Multas"
+HEADER_CURSOR_RESERVAS = "X-Next-Cursor-Reservas"
+_HEADERS_CURSOR = (HEADER_CURSOR_GASTOS, HEADER_CURSOR_MULTAS, HEADER_CURSOR_RESERVAS)
 
-@router.get("/residente/{usuario_id}")
-async def desglose_residente(usuario_id: int, db: Session = Depends(get_db)):
-    logger.info(f"DEBUG Pagos: Iniciando desglose_residente para usuario_id={usuario_id}")
+Periodo = Tuple[int, int]  # (año, mes)
+
+
+class _Seccion(NamedTuple):
+    """
+    Sección paginada del desglose: consulta de solo columnas (ya filtrada),
+    clave de orden descendente (keyset) y cómo leer el cursor.
+    """
+    nombre: str
+    header: str
+    consulta: Select
+    claves: tuple
+    nombres_claves: Tuple[str, ...]
+    tipos_claves: Tuple[Callable, ...]
+    cursor: Optional[str]
+
+
+def _periodo(valor: str, parametro: str) -> Periodo:
     try:
-        # Viviendas del residente
-        rv_list: list[Any] = db.query(ResidenteVivienda).filter(ResidenteVivienda.usuario_id == usuario_id).all()
-        viv_ids = [int(getattr(rv, "vivienda_id")) for rv in rv_list]
-        if not viv_ids:
-            logger.warning(f"DEBUG Pagos: No se encontraron viviendas para usuario_id={usuario_id}")
-            return {"viviendas": [], "cargo_fijo_uf": 0.0, "gastos_comunes": [], "multas": [], "reservas": []}
-
-        # Tomamos la primera vivienda para cargo fijo (MVP)
-        vivienda: Any = db.query(Vivienda).filter(Vivienda.id.in_(viv_ids)).order_by(Vivienda.id.asc()).first()
-        cargo_val: Any = getattr(vivienda, "cargo_fijo_uf", 0.0) if vivienda is not None else 0.0
-        cargo_fijo_uf = float(cargo_val) if cargo_val is not None else 0.0
-
-        # Gastos comunes
-        gastos: list[Any] = db.query(GastoComun).filter(GastoComun.vivienda_id.in_(viv_ids)).all()
-        gastos_payload = []
-        for g in gastos:
-            venci = getattr(g, "vencimiento", None)
-            monto_val = getattr(g, "monto_total", 0)
-            monto_total = float(monto_val) if monto_val is not None else 0.0
-            gastos_payload.append(
-                {
-                    "id": int(getattr(g, "id")),
-                    "vivienda_id": int(getattr(g, "vivienda_id")),
-                    "mes": int(getattr(g, "mes")),
-                    "ano": int(getattr(g, "ano")),
-                    "monto_total": monto_total,
-                    "estado": str(getattr(g, "estado", "")),
-                    "vencimiento": venci.isoformat() if venci is not None else None,
-                }
-            )
+        ano, mes = (int(parte) for parte in valor.split("-"))
+        date(ano, mes, 1)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'{parametro}' debe tener el formato AAAA-MM"
+        )
+    return ano, mes
 
-        # Multas
-        multas: list[Any] = db.query(Multa).filter(Multa.vivienda_id.in_(viv_ids)).all()
-        multas_payload = []
-        for m in multas:
-            monto_val = getattr(m, "monto", 0)
-            monto = float(monto_val) if monto_val is not None else 0.0
-            fecha_aplicada = getattr(m, "fecha_aplicada", None)
-            fecha_aplicada_str = fecha_aplicada.isoformat() if fecha_aplicada is not None else None
-            multas_payload.append(
-                {
-                    "id": int(getattr(m, "id")),
-                    "vivienda_id": int(getattr(m, "vivienda_id")),
-                    "monto": monto,
-                    "descripcion": str(getattr(m, "descripcion", "")),
-                    "fecha_aplicada": fecha_aplicada_str,
-                }
-            )
 
-        # Reservas del usuario
-        reservas: list[Any] = db.query(Reserva).filter(Reserva.usuario_id == usuario_id).all()
-        reservas_payload = []
-        for r in reservas:
-            monto_val = getattr(r, "monto_pago", 0)
-            monto_pago = float(monto_val) if monto_val is not None else 0.0
-            
-            inicio = getattr(r, "fecha_hora_inicio", None)
-            fin = getattr(r, "fecha_hora_fin", None)
-            inicio_str = inicio.isoformat() if inicio is not None else None
-            fin_str = fin.isoformat() if fin is not None else None
-            
-            reservas_payload.append(
-                {
-                    "id": int(getattr(r, "id")),
-                    "monto_pago": monto_pago,
-                    "estado_pago": str(getattr(r, "estado_pago", "")),
-                    "inicio": inicio_str,
-                    "fin": fin_str,
-                }
+def _periodo_por_defecto() -> Periodo:
+    """Primer mes de la ventana por defecto (los últimos N meses, incluido el actual)"""
+    hoy = date.today()
+    indice = hoy.year * 12 + hoy.month - 1 - (settings.DESGLOSE_MESES_POR_DEFECTO - 1)
+    return indice // 12, indice % 12 + 1
+
+
+def _inicio_mes(periodo: Periodo) -> date:
+    return date(periodo[0], periodo[1], 1)
+
+
+def _inicio_mes_siguiente(periodo: Periodo) -> date:
+    ano, mes = periodo
+    return date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+
+
+def _secciones(
+    usuario_id: int,
+    viviendas,
+    desde: Periodo,
+    hasta: Optional[Periodo],
+    estado: Optional[str],
+    cursores: Tuple[Optional[str], Optional[str], Optional[str]],
+) -> List[_Seccion]:
+    """
+    Consultas de gastos comunes, multas y reservas del periodo. `viviendas`
+    es la lista de ids o un select que los retorna.
+    """
+    gastos = select(
+        GastoComun.id,
+        GastoComun.vivienda_id,
+        GastoComun.mes,
+        GastoComun.ano,
+        cast(func.coalesce(GastoComun.monto_total, 0), Float).label("monto_total"),
+        GastoComun.estado,
+        GastoComun.vencimiento,
+    ).where(
+        GastoComun.vivienda_id.in_(viviendas),
+        tuple_(GastoComun.ano, GastoComun.mes) >= tuple_(*desde),
+    )
+    multas = select(
+        Multa.id,
+        Multa.vivienda_id,
+        cast(func.coalesce(Multa.monto, 0), Float).label("monto"),
+        func.coalesce(Multa.descripcion, "").label("descripcion"),
+        Multa.fecha_aplicada,
+    ).where(
+        Multa.vivienda_id.in_(viviendas),
+        Multa.fecha_aplicada >= _inicio_mes(desde),
+    )
+    # Sin viviendas el desglose va vacío, también en reservas
+    reservas = select(
+        Reserva.id,
+        cast(func.coalesce(Reserva.monto_pago, 0), Float).label("monto_pago"),
+        Reserva.estado_pago,
+        Reserva.fecha_hora_inicio.label("inicio"),
+        Reserva.fecha_hora_fin.label("fin"),
+    ).where(
+        Reserva.usuario_id == usuario_id,
+        Reserva.fecha_hora_inicio >= datetime.combine(_inicio_mes(desde), datetime.min.time()),
+        select(ResidenteVivienda.vivienda_id).where(ResidenteVivienda.usuario_id == usuario_id).exists(),
+    )
+
+    if hasta is not None:
+        gastos = gastos.where(tuple_(GastoComun.ano, GastoComun.mes) <= tuple_(*hasta))
+        multas = multas.where(Multa.fecha_aplicada < _inicio_mes_siguiente(hasta))
+        reservas = reservas.where(
+            Reserva.fecha_hora_inicio < datetime.combine(_inicio_mes_siguiente(hasta), datetime.min.time())
+        )
+    if estado is not None:
+        # Las multas no tienen estado
+        gastos = gastos.where(GastoComun.estado == estado)
+        reservas = reservas.where(Reserva.estado_pago == estado)
+
+    cursor_gastos, cursor_multas, cursor_reservas = cursores
+    return [
+        _Seccion("gastos_comunes", HEADER_CURSOR_GASTOS, gastos,
+                 (GastoComun.ano, GastoComun.mes, GastoComun.id), ("ano", "mes", "id"), (int, int, int), cursor_gastos),
+        _Seccion("multas", HEADER_CURSOR_MULTAS, multas,
+                 (Multa.fecha_aplicada, Multa.id), ("fecha_aplicada", "id"), (date.fromisoformat, int), cursor_multas),
+        _Seccion("reservas", HEADER_CURSOR_RESERVAS, reservas,
+                 (Reserva.fecha_hora_inicio, Reserva.id), ("inicio", "id"), (datetime.fromisoformat, int), cursor_reservas),
+    ]
+
+
+def _paginar(seccion: _Seccion, limite: int):
+    """Consulta de la sección desde el cursor, ordenada y con una fila extra (hay más)"""
+    consulta = seccion.consulta
+    if seccion.cursor:
+        valores = decodificar_cursor(seccion.cursor, len(seccion.claves))
+        try:
+            valores = [tipo(valor) for tipo, valor in zip(seccion.tipos_claves, valores)]
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginación no válido"
             )
+        consulta = consulta.where(tuple_(*seccion.claves) < tuple_(*valores))
+    return consulta.order_by(*(clave.desc() for clave in seccion.claves)).limit(limite + 1)
+
 
-        response_data = {
-            "viviendas": viv_ids,
-            "cargo_fijo_uf": cargo_fijo_uf,
-            "gastos_comunes": gastos_payload,
-            "multas": multas_payload,
-            "reservas": reservas_payload,
-        }
-        
-        logger.info(f"DEBUG Pagos: Desglose completado para usuario_id={usuario_id}")
-        return response_data
-        
-    except Exception as e:
-        logger.error(f"ERROR Pagos: Exception en desglose_residente: {str(e)}", exc_info=True)
+def _texto(valor: str):
+    # json_build_object es variádica: PostgreSQL no infiere el tipo del parámetro
+    return cast(literal(valor), Text)
+
+
+def _json_agg(expresion, orden, condicion=None):
+    agregado = func.json_agg(aggregate_order_by(expresion, orden))
+    if condicion is not None:
+        agregado = agregado.filter(condicion)
+    return func.coalesce(agregado, literal_column("'[]'::json"))
+
+
+def _consulta_desglose_json(usuario_id: int, secciones_de: Callable, limite: int, uf: Optional[ValorUFDia]):
+    """
+    Sentencia única para PostgreSQL: el desglose armado como JSON (texto) y,
+    por sección, la clave de la última fila de la página y cuántas filas trajo
+    (limite + 1 si hay otra página).
+    """
+    viviendas = select(ResidenteVivienda.vivienda_id).where(
+        ResidenteVivienda.usuario_id == usuario_id
+    ).cte("viviendas_usuario")
+    ids_viviendas = select(viviendas.c.vivienda_id)
+    cargo_fijo_uf = func.coalesce(
+        select(Vivienda.cargo_fijo_uf)
+        .where(Vivienda.id.in_(ids_viviendas))
+        .order_by(Vivienda.id)
+        .limit(1)
+        .scalar_subquery(),
+        0,
+    )
+    if uf is not None:
+        valor_uf = literal(uf.valor, Numeric(12, 2))
+        pares_uf = [
+            cast(valor_uf, Float),
+            _texto(uf.fecha.isoformat()),
+            cast(func.round(cargo_fijo_uf * valor_uf), Float),
+        ]
+    else:
+        pares_uf = [null(), null(), null()]
+
+    pares = [
+        _texto("viviendas"),
+        select(_json_agg(viviendas.c.vivienda_id, viviendas.c.vivienda_id)).scalar_subquery(),
+        _texto("cargo_fijo_uf"),
+        cast(cargo_fijo_uf, Float),
+    ]
+    for nombre, valor in zip(("valor_uf", "fecha_uf", "cargo_fijo_clp"), pares_uf):
+        pares += [_texto(nombre), valor]
+    paginacion = []
+    for seccion in secciones_de(ids_viviendas):
+        orden = [clave.desc() for clave in seccion.claves]
+        filas = _paginar(seccion, limite).add_columns(
+            func.row_number().over(order_by=orden).label("n")
+        ).cte(f"pagina_{seccion.nombre}")
+        columnas = [c for c in filas.c if c.name != "n"]
+        objeto = func.json_build_object(*(a for c in columnas for a in (_texto(c.name), c)))
+        pares += [
+            _texto(seccion.nombre),
+            select(_json_agg(objeto, filas.c.n, filas.c.n <= limite)).scalar_subquery(),
+        ]
+        paginacion += [
+            select(func.json_build_array(*(filas.c[n] for n in seccion.nombres_claves)))
+            .where(filas.c.n == limite)
+            .scalar_subquery(),
+            select(func.count()).select_from(filas).scalar_subquery(),
+        ]
+    return select(cast(func.json_build_object(*pares), Text), *paginacion)
+
+
+def _conversion_uf(cargo_fijo_uf, uf: Optional[ValorUFDia]) -> dict:
+    return {
+        "valor_uf": float(uf.valor) if uf is not None else None,
+        "fecha_uf": uf.fecha.isoformat() if uf is not None else None,
+        "cargo_fijo_clp": float(uf.a_pesos(cargo_fijo_uf)) if uf is not None else None,
+    }
+
+
+def _iso(valor):
+    return valor.isoformat() if isinstance(valor, (date, datetime)) else valor
+
+
+async def _desglose_columnas(
+    db: AsyncSession, usuario_id: int, secciones_de: Callable, limite: int, uf: Optional[ValorUFDia]
+):
+    """
+    Mismo desglose con consultas de solo columnas (sin hidratar objetos ORM),
+    para motores sin json_agg (p. ej. SQLite en los benchmarks).
+    """
+    viv_ids = list((await db.execute(
+        select(ResidenteVivienda.vivienda_id)
+        .where(ResidenteVivienda.usuario_id == usuario_id)
+        .order_by(ResidenteVivienda.vivienda_id)
+    )).scalars())
+    if not viv_ids:
+        return {
+            "viviendas": [], "cargo_fijo_uf": 0.0, **_conversion_uf(0, uf),
+            "gastos_comunes": [], "multas": [], "reservas": [],
+        }, {}
+
+    cargo = (await db.execute(
+        select(Vivienda.cargo_fijo_uf).where(Vivienda.id.in_(viv_ids)).order_by(Vivienda.id).limit(1)
+    )).scalar() or 0
+    desglose = {"viviendas": viv_ids, "cargo_fijo_uf": float(cargo), **_conversion_uf(cargo, uf)}
+    cursores = {}
+    for seccion in secciones_de(viv_ids):
+        filas = (await db.execute(_paginar(seccion, limite))).mappings().all()
+        if len(filas) > limite:
+            filas = filas[:limite]
+            cursores[seccion.header] = codificar_cursor(*(filas[-1][n] for n in seccion.nombres_claves))
+        desglose[seccion.nombre] = [{k: _iso(v) for k, v in fila.items()} for fila in filas]
+    return desglose, cursores
+
+
+async def _version_desglose(request: Request, db: AsyncSession):
+    """
+    Versión del desglose: viviendas del residente (con su cargo fijo),
+    cantidad y último updated_at de sus gastos comunes, multas y reservas,
+    la UF del día y el día actual (el periodo por defecto depende de él).
+    """
+    usuario_id = int(request.path_params["usuario_id"])
+    viviendas_usuario = select(ResidenteVivienda.vivienda_id).where(ResidenteVivienda.usuario_id == usuario_id)
+    viviendas = (await db.execute(
+        select(Vivienda.id, Vivienda.cargo_fijo_uf).where(Vivienda.id.in_(viviendas_usuario)).order_by(Vivienda.id)
+    )).all()
+
+    def resumen(modelo, condicion):
+        return (
+            select(func.count()).where(condicion).scalar_subquery(),
+            select(func.max(modelo.updated_at)).where(condicion).scalar_subquery(),
+        )
+
+    tablas = (await db.execute(select(
+        *resumen(GastoComun, GastoComun.vivienda_id.in_(viviendas_usuario)),
+        *resumen(Multa, Multa.vivienda_id.in_(viviendas_usuario)),
+        *resumen(Reserva, Reserva.usuario_id == usuario_id),
+    ))).one()
+    try:
+        uf = await servicio_uf.obtener(db)
+        # Solo lo que sale en la respuesta (no la fuente, que depende del proceso)
+        version_uf = (uf.fecha, uf.valor)
+    except UFNoDisponible:
+        version_uf = None
+    return (*viviendas, *tablas, version_uf, date.today())
+
+
+@router.get("/residente/{usuario_id}", dependencies=[Depends(VersionHTTP(_version_desglose))])
+async def desglose_residente(
+    usuario_id: int,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    estado: Optional[str] = None,
+    cursor_gastos: Optional[str] = None,
+    cursor_multas: Optional[str] = None,
+    cursor_reservas: Optional[str] = None,
+    limite: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Desglose de pagos del residente: viviendas, cargo fijo (UF y su
+    equivalente en pesos con la UF del día), gastos comunes, multas y
+    reservas, de la más reciente a la más antigua.
+
+    Cada sección se pagina por separado: si tiene más filas, el header
+    X-Next-Cursor-Gastos / -Multas / -Reservas trae el cursor para pedir su
+    página siguiente.
+
+    En PostgreSQL se arma en una sola consulta y se retorna el JSON tal como
+    lo genera la base de datos.
+
+    Responde con un ETag; si el cliente lo envía en If-None-Match y los
+    datos no cambiaron, se responde 304 sin armar el desglose.
+
+    Args:
+        usuario_id: ID del usuario
+        desde: Primer mes del periodo (AAAA-MM); por defecto los últimos
+            DESGLOSE_MESES_POR_DEFECTO meses
+        hasta: Último mes del periodo (AAAA-MM, inclusive)
+        estado: Solo gastos comunes y reservas con este estado (las multas
+            no tienen estado)
+        cursor_gastos, cursor_multas, cursor_reservas: Cursor de la página
+            siguiente de cada sección
+        limite: Cantidad máxima de filas por sección (default: 50)
+        db: Sesión de base de datos
+    """
+    logger.debug("Desglose de pagos para usuario_id=%s", usuario_id)
+    periodo_desde = _periodo(desde, "desde") if desde else _periodo_por_defecto()
+    periodo_hasta = _periodo(hasta, "hasta") if hasta else None
+    if periodo_hasta is not None and periodo_hasta < periodo_desde:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'hasta' debe ser igual o posterior a 'desde'"
+        )
+
+    def secciones_de(viviendas):
+        return _secciones(
+            usuario_id, viviendas, periodo_desde, periodo_hasta, estado,
+            (cursor_gastos, cursor_multas, cursor_reservas)
+        )
+
+    try:
+        uf = await servicio_uf.obtener(db)
+    except UFNoDisponible as e:
+        logger.warning("Desglose sin conversión a pesos: %s", e)
+        uf = None
+
+    try:
+        if db.bind.dialect.name == "postgresql":
+            fila = (await db.execute(_consulta_desglose_json(usuario_id, secciones_de, limite, uf))).one()
+            contenido, paginacion = fila[0], fila[1:]
+            cursores = {}
+            for header, ultima, cantidad in zip(_HEADERS_CURSOR, paginacion[::2], paginacion[1::2]):
+                if cantidad > limite:
+                    cursores[header] = codificar_cursor(*ultima)
+        else:
+            desglose, cursores = await _desglose_columnas(db, usuario_id, secciones_de, limite, uf)
+            contenido = json.dumps(desglose)
+        return Response(content=contenido, media_type="application/json", headers=cursores)
+    except HTTPException:
         raise
+    except Exception:
+        logger.exception("Error en desglose_residente para usuario_id=%s", usuario_id)
+        raise
+
+
+@router.get("/saldos/vivienda/{vivienda_id}")
+async def saldo_vivienda(vivienda_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Estado de deuda de una vivienda: total cobrado (gastos comunes, multas y
+    reservas pendientes), total pagado, saldo y gasto común impago más
+    antiguo. Se lee de saldos_viviendas, que mantienen los triggers.
+    """
+    numero = (await db.execute(
+        select(Vivienda.numero_vivienda).where(Vivienda.id == vivienda_id)
+    )).scalar()
+    if numero is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vivienda {vivienda_id} no encontrada"
+        )
+    saldos = await obtener_saldos(db, [vivienda_id])
+    return {"numero_vivienda": numero, **serializar_saldo(saldos[vivienda_id])}
+
+
+@router.get("/saldos/residente/{usuario_id}")
+async def saldos_residente(usuario_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Estado de deuda de cada vivienda del residente"""
+    viviendas = (await db.execute(
+        select(Vivienda.id, Vivienda.numero_vivienda)
+        .join(ResidenteVivienda, ResidenteVivienda.vivienda_id == Vivienda.id)
+        .where(ResidenteVivienda.usuario_id == usuario_id)
+        .order_by(Vivienda.id)
+    )).all()
+    saldos = await obtener_saldos(db, [v.id for v in viviendas])
+    return [{"numero_vivienda": v.numero_vivienda, **serializar_saldo(saldos[v.id])} for v in viviendas]
+
+
+@router.get("/saldos/condominio/{condominio_id}")
+async def saldos_condominio(
+    condominio_id: int,
+    response: Response,
+    solo_deudores: bool = False,
+    cursor: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Estado de deuda de las viviendas del condominio (para el panel de
+    administración), con un resumen del condominio completo.
+
+    Las viviendas se paginan por id (cursor en el header X-Next-Cursor).
+    Con `solo_deudores` solo se listan las viviendas con saldo mayor a cero.
+    """
+    deuda = func.coalesce(SaldoVivienda.saldo, 0)
+    consulta = select(Vivienda.id, Vivienda.numero_vivienda).outerjoin(
+        SaldoVivienda, SaldoVivienda.vivienda_id == Vivienda.id
+    ).where(Vivienda.condominio_id == condominio_id)
+    if solo_deudores:
+        consulta = consulta.where(deuda > 0)
+    if cursor:
+        (cursor_id,) = decodificar_cursor(cursor, 1)
+        consulta = consulta.where(Vivienda.id > int(cursor_id))
+    viviendas = (await db.execute(consulta.order_by(Vivienda.id).limit(limite + 1))).all()
+    if len(viviendas) > limite:
+        viviendas = viviendas[:limite]
+        response.headers[HEADER_SIGUIENTE_CURSOR] = codificar_cursor(viviendas[-1].id)
+
+    resumen = (await db.execute(
+        select(
+            func.count().label("viviendas"),
+            func.count().filter(deuda > 0).label("deudoras"),
+            func.coalesce(func.sum(deuda).filter(deuda > 0), 0).label("deuda_total"),
+        ).select_from(Vivienda).outerjoin(
+            SaldoVivienda, SaldoVivienda.vivienda_id == Vivienda.id
+        ).where(Vivienda.condominio_id == condominio_id)
+    )).one()
+    if not resumen.viviendas and await db.get(Condominio, condominio_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Condominio {condominio_id} no encontrado"
+        )
+
+    saldos = await obtener_saldos(db, [v.id for v in viviendas])
+    return {
+        "resumen": {
+            "viviendas": resumen.viviendas,
+            "deudoras": resumen.deudoras,
+            "deuda_total": float(resumen.deuda_total),
+        },
+        "viviendas": [{"numero_vivienda": v.numero_vivienda, **serializar_saldo(saldos[v.id])} for v in viviendas],
+    }
+
+
+@router.post("/conciliacion/{condominio_id}")
+async def conciliar(
+    condominio_id: int,
+    request: Request,
+    metodo_pago: str = Query("transferencia", min_length=1, max_length=30),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Carga una cartola bancaria o de Webpay (CSV en el cuerpo de la
+    solicitud, `Content-Type: text/csv`) y registra como pagos los abonos
+    que coinciden con un gasto común abierto del condominio por vivienda,
+    periodo y monto; esos gastos quedan pagados.
+
+    Columnas: referencia, fecha, vivienda_id, periodo (AAAA-MM), monto. El
+    archivo se lee como flujo, en lotes, y volver a cargarlo no duplica
+    pagos (se omiten las referencias ya registradas).
+    """
+    if await db.get(Condominio, condominio_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Condominio {condominio_id} no encontrado"
+        )
+    try:
+        resumen = await conciliar_cartola(
+            db, condominio_id, lineas_de_bytes(request.stream()), metodo_pago=metodo_pago
+        )
+    except (CartolaInvalida, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cartola no válida: {e}"
+        )
+    finally:
+        # Los lotes ya confirmados cambian la morosidad aunque la carga falle después
+        invalidar_morosidad(condominio_id)
+    return resumen
+
+
+MEDIA_TYPE_CSV = "text/csv; charset=utf-8"
+MEDIA_TYPE_NDJSON = "application/x-ndjson"
+
+
+async def _transmitir_morosidad(condominio_id: int, corte: date, formato: str):
+    """
+    Genera el informe por bloques de filas. Usa su propia sesión: la del
+    request ya se cerró cuando empieza el envío.
+    """
+    async with AsyncSessionLocal() as db:
+        if formato == "csv":
+            yield a_csv([], encabezado=True)
+        try:
+            async for bloque in leer_morosidad(db, condominio_id, corte):
+                yield a_csv(bloque) if formato == "csv" else a_ndjson(bloque)
+        except Exception:
+            # El status ya se envió: se corta el stream y queda registrado
+            logger.exception("Error al transmitir la morosidad del condominio %s", condominio_id)
+
+
+@router.get(
+    "/morosidad/condominio/{condominio_id}",
+    responses={200: {"content": {MEDIA_TYPE_CSV: {}, MEDIA_TYPE_NDJSON: {}}}},
+)
+async def informe_morosidad(
+    condominio_id: int,
+    corte: Optional[date] = Query(None, description="Fecha de corte (default: hoy)"),
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Viviendas con deuda vencida a la fecha de corte (gastos comunes por
+    vencimiento y multas por fecha aplicada, descontando los pagos hasta el
+    corte, imputados a los cargos más antiguos), por antigüedad: 1-30,
+    31-60, 61-90 y más de 90 días. De la mayor deuda a la menor, con el
+    ranking y la participación de cada vivienda en la deuda del condominio.
+
+    Se transmite como CSV o NDJSON (una vivienda por línea) y queda en cache
+    por condominio y fecha de corte.
+    """
+    if await db.get(Condominio, condominio_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Condominio {condominio_id} no encontrado"
+        )
+    corte = corte or date.today()
+    return StreamingResponse(
+        _transmitir_morosidad(condominio_id, corte, formato),
+        media_type=MEDIA_TYPE_CSV if formato == "csv" else MEDIA_TYPE_NDJSON,
+        headers={"Content-Disposition": f'attachment; filename="morosidad_{condominio_id}_{corte.isoformat()}.{formato}"'},
+    )
@@ -1,36 +1,66 @@
 """
 Rutas para gestión de reservas de espacios comunes
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+import asyncio
+import json
 import logging
+import zlib
 
 logger = logging.getLogger(__name__)
 
-from app.db.deps import get_db
+from app.api.v1.cache_http import CACHE_CONTROL_PUBLICO, RutaConVersion, VersionHTTP
+from app.api.v1.paginacion import HEADER_SIGUIENTE_CURSOR, codificar_cursor, decodificar_cursor
+from app.db.deps import get_async_db
+from app.db.session import AsyncSessionLocal
+from app.db.errores import VIOLACION_EXCLUSION, VIOLACION_FOREIGN_KEY, sqlstate
 from app.schemas.reservas import (
     ReservaCreate, 
     ReservaResponse, 
     ReservaListResponse,
+    ReservaRecurrenteCreate,
+    ReservaRecurrenteResponse,
+    ConflictoOcurrencia,
+    MAX_OCURRENCIAS,
     EspacioComunResponse,
     DisponibilidadResponse,
+    DisponibilidadMultipleResponse,
     SlotDisponible,
     ErrorResponse
 )
 from app.models.models import Reserva, EspacioComun, Usuario
 from app.services.google_calendar_service import GoogleCalendarManager
+from app.services.espacios_registry import registro_espacios
+from app.services.calendar_outbox import encolar_eliminacion, insertar_creaciones, notificar_pendientes
+from app.services.disponibilidad import (
+    IndiceIntervalos,
+    a_epoch,
+    agrupar_slots_por_dia,
+    cache_disponibilidad,
+    dias_en_rango,
+    invalidar_disponibilidad,
+    mapas_ocupacion,
+    marcar_slots_ocupados,
+)
 from app.core.google_calendar import ESPACIOS_COMUNES
 
-router = APIRouter()
+router = APIRouter(route_class=RutaConVersion)
 
 # Intentar inicializar Google Calendar Manager, pero continuar sin él si falla
 try:
     calendar_manager = GoogleCalendarManager()
     GOOGLE_CALENDAR_AVAILABLE = True
 except Exception as e:
-    print(f"Advertencia: Google Calendar no disponible: {str(e)}")
+    logger.warning("Google Calendar no disponible: %s", e)
     calendar_manager = None
     GOOGLE_CALENDAR_AVAILABLE = False
 
@@ -59,25 +89,296 @@ def _generar_slots_prueba(fecha_inicio, fecha_fin, duracion_minutos=60):
     
     return slots
 
+
+async def _slots_calendario(espacio, fecha_inicio, fecha_fin, duracion_minutos):
+    """
+    Obtiene los slots de un espacio desde Google Calendar, o datos de prueba
+    si no está disponible.
+    
+    Returns:
+        Tupla (slots, cacheable). No es cacheable si Google Calendar estaba
+        configurado pero falló y se usaron datos de prueba.
+    """
+    slots = None
+    cacheable = True
+    if GOOGLE_CALENDAR_AVAILABLE and calendar_manager:
+        try:
+            # La consulta a Google es bloqueante: se ejecuta fuera del event loop
+            slots = await asyncio.to_thread(
+                calendar_manager.get_disponibilidad,
+                espacio,
+                fecha_inicio,
+                fecha_fin,
+                duracion_minutos
+            )
+        except Exception as cal_error:
+            logger.warning("Google Calendar falló para %s, se usan datos de prueba: %s: %s", espacio, type(cal_error).__name__, cal_error)
+            slots = None
+            cacheable = False
+    
+    # Si Google Calendar fallo o no está disponible, usar datos de prueba
+    if slots is None:
+        slots = _generar_slots_prueba(fecha_inicio, fecha_fin, duracion_minutos)
+        logger.debug("Datos de prueba para %s: %s slots", espacio, len(slots))
+    
+    return slots, cacheable
+
+
+async def _calcular_tramos(tramos, duracion_minutos, db):
+    """
+    Calcula los slots de varios tramos (espacio, desde, hasta) cruzando Google
+    Calendar con las reservas existentes en la BD.
+    
+    Los calendarios se consultan en paralelo (cada hilo con su propio cliente
+    de Google) y las reservas de todos los espacios se cargan con una sola
+    consulta.
+    
+    Returns:
+        Lista de tuplas (slots, cacheable), en el mismo orden que `tramos`
+    """
+    if not tramos:
+        return []
+    
+    resultados = await asyncio.gather(*(
+        _slots_calendario(espacio, desde, hasta, duracion_minutos)
+        for espacio, desde, hasta in tramos
+    ))
+    
+    # Resolver los espacios en el registro en memoria (sin consultar la BD)
+    ids_espacios = {}
+    for espacio in {t[0] for t in tramos}:
+        encontrado = await registro_espacios.resolver_slug(espacio, db)
+        if encontrado:
+            ids_espacios[espacio] = encontrado.id
+        else:
+            logger.debug("Espacio '%s' no encontrado en la BD", espacio)
+    
+    # Obtener todas las reservas existentes de esos espacios en el rango total
+    reservas_por_espacio = {}
+    if ids_espacios:
+        rango_inicio = min(t[1] for t in tramos)
+        rango_fin = max(t[2] for t in tramos)
+        reservas_existentes = (await db.execute(
+            select(Reserva.espacio_comun_id, Reserva.fecha_hora_inicio, Reserva.fecha_hora_fin).where(
+                Reserva.espacio_comun_id.in_(set(ids_espacios.values())),
+                Reserva.fecha_hora_inicio < rango_fin,
+                Reserva.fecha_hora_fin > rango_inicio
+            )
+        )).all()
+        logger.debug("%s reservas entre %s y %s", len(reservas_existentes), rango_inicio, rango_fin)
+        for espacio_id, inicio, fin in reservas_existentes:
+            reservas_por_espacio.setdefault(espacio_id, []).append((inicio, fin))
+    
+    # Marcar slots ocupados: reservas y slots se normalizan a epoch UTC una
+    # sola vez y se cruzan en un barrido ordenado
+    for (espacio, _, _), (slots, _) in zip(tramos, resultados):
+        marcar_slots_ocupados(slots, reservas_por_espacio.get(ids_espacios.get(espacio), []))
+    
+    return resultados
+
+
+async def _disponibilidad_espacios(espacios, fecha_inicio, fecha_fin, duracion_minutos, db):
+    """
+    Arma la disponibilidad de varios espacios desde las grillas diarias
+    cacheadas; solo se calculan (en tramos contiguos) los días que no estén
+    en cache.
+    
+    Returns:
+        Diccionario espacio -> lista de slots del rango
+    """
+    dias = dias_en_rango(fecha_inicio, fecha_fin)
+    grillas = {espacio: {} for espacio in espacios}
+    tramos = []
+    for espacio in espacios:
+        faltantes = []
+        for dia in dias:
+            grilla = cache_disponibilidad.obtener((espacio, dia, duracion_minutos))
+            if grilla is not None:
+                grillas[espacio][dia] = grilla
+            elif faltantes and faltantes[-1][-1] == dia - timedelta(days=1):
+                faltantes[-1].append(dia)
+            else:
+                faltantes.append([dia])
+        tramos.extend((espacio, tramo) for tramo in faltantes)
+    
+    rangos = [
+        (
+            espacio,
+            datetime.combine(tramo[0], datetime.min.time(), tzinfo=fecha_inicio.tzinfo),
+            datetime.combine(tramo[-1], datetime.min.time(), tzinfo=fecha_inicio.tzinfo).replace(hour=23, minute=59, second=59)
+        )
+        for espacio, tramo in tramos
+    ]
+    resultados = await _calcular_tramos(rangos, duracion_minutos, db)
+    
+    for (espacio, tramo), (slots_tramo, cacheable) in zip(tramos, resultados):
+        por_dia = agrupar_slots_por_dia(slots_tramo)
+        for dia in tramo:
+            grillas[espacio][dia] = por_dia.get(dia, [])
+            if cacheable:
+                cache_disponibilidad.guardar((espacio, dia, duracion_minutos), grillas[espacio][dia])
+    
+    return {
+        espacio: [slot for dia in dias for slot in grillas[espacio][dia]]
+        for espacio in espacios
+    }
+
+
+# Días que se calculan por bloque al transmitir la disponibilidad en NDJSON
+_DIAS_POR_BLOQUE = 7
+
+MEDIA_TYPE_NDJSON = "application/x-ndjson"
+MEDIA_TYPE_BITMAP = "application/vnd.condominio.disponibilidad-bitmap+json"
+
+# Celdas de los mapas de ocupación (48 por día)
+RESOLUCION_MAPA_MINUTOS = 30
+
+
+def _formato_solicitado(formato, accept):
+    """
+    Formato de respuesta de disponibilidad: el parámetro `formato` tiene
+    prioridad sobre el header Accept. Default: json.
+    """
+    if formato:
+        formato = formato.lower()
+        if formato not in ("json", "ndjson", "bitmap"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Formato '{formato}' no válido. Use: json, ndjson, bitmap"
+            )
+        return formato
+    if accept and MEDIA_TYPE_NDJSON in accept:
+        return "ndjson"
+    if accept and MEDIA_TYPE_BITMAP in accept:
+        return "bitmap"
+    return "json"
+
+
+async def _disponibilidad_bitmap(espacio, fecha_inicio, fecha_fin, db):
+    """
+    Disponibilidad como un mapa de ocupación por día (un entero de 48 bits,
+    bit i = celda de 30 minutos i desde las 00:00 UTC), calculado
+    directamente desde los intervalos ocupados, sin generar slots.
+    """
+    dias = dias_en_rango(fecha_inicio, fecha_fin)
+    desde = datetime.combine(dias[0], datetime.min.time(), tzinfo=timezone.utc)
+    hasta = datetime.combine(dias[-1], datetime.min.time(), tzinfo=timezone.utc) + timedelta(days=1)
+    
+    ocupados = []
+    if GOOGLE_CALENDAR_AVAILABLE and calendar_manager:
+        try:
+            eventos = await asyncio.to_thread(calendar_manager.obtener_ocupados, espacio, desde, hasta)
+            ocupados.extend(zip(eventos.inicios, eventos.fines))
+        except Exception as cal_error:
+            # Igual que en el formato json: sin Google, solo las reservas de la BD
+            logger.warning("Google Calendar falló para %s, solo se usan las reservas: %s: %s", espacio, type(cal_error).__name__, cal_error)
+    
+    espacio_db = await registro_espacios.resolver_slug(espacio, db)
+    if espacio_db:
+        reservas = (await db.execute(
+            select(Reserva.fecha_hora_inicio, Reserva.fecha_hora_fin).where(
+                Reserva.espacio_comun_id == espacio_db.id,
+                Reserva.fecha_hora_inicio < hasta,
+                Reserva.fecha_hora_fin > desde
+            )
+        )).all()
+        ocupados.extend((a_epoch(inicio), a_epoch(fin)) for inicio, fin in reservas)
+    
+    return {
+        "espacio": espacio,
+        "fecha_inicio": dias[0].isoformat(),
+        "fecha_fin": dias[-1].isoformat(),
+        "resolucion_minutos": RESOLUCION_MAPA_MINUTOS,
+        "hora_apertura": GoogleCalendarManager.HORA_APERTURA,
+        "hora_cierre": GoogleCalendarManager.HORA_CIERRE,
+        "ocupacion": mapas_ocupacion(dias, IndiceIntervalos(ocupados), RESOLUCION_MAPA_MINUTOS),
+    }
+
+
+async def _transmitir_disponibilidad(espacio, fecha_inicio, fecha_fin, duracion_minutos):
+    """
+    Genera la disponibilidad como NDJSON (un slot por línea), calculando el
+    rango por bloques de días para que la memoria y el tiempo al primer byte
+    no dependan del largo del rango.
+    
+    Usa su propia sesión: la del request ya se cerró cuando empieza el envío.
+    """
+    dias = dias_en_rango(fecha_inicio, fecha_fin)
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(dias), _DIAS_POR_BLOQUE):
+            bloque = dias[i:i + _DIAS_POR_BLOQUE]
+            desde = datetime.combine(bloque[0], datetime.min.time(), tzinfo=fecha_inicio.tzinfo)
+            hasta = datetime.combine(bloque[-1], datetime.min.time(), tzinfo=fecha_inicio.tzinfo).replace(hour=23, minute=59, second=59)
+            try:
+                slots = (await _disponibilidad_espacios([espacio], desde, hasta, duracion_minutos, db))[espacio]
+            except Exception:
+                # El status ya se envió: se corta el stream y queda registrado
+                logger.exception("Error al transmitir disponibilidad de %s", espacio)
+                return
+            yield "".join(
+                json.dumps({"inicio": s["inicio"], "fin": s["fin"], "disponible": s["disponible"]}, separators=(",", ":")) + "\n"
+                for s in slots
+            )
+
+
+def _parsear_rango(fecha_inicio, fecha_fin):
+    """
+    Convierte los parámetros de fecha (ISO) en el rango a consultar.
+    
+    Defaults: desde hoy a las 00:00 hasta 30 días después a las 23:59:59.
+    """
+    # Convertir strings a datetime si es necesario
+    if fecha_inicio:
+        # Parsear como fecha ISO: "2025-10-25" → datetime con hora 00:00:00
+        fecha_inicio_dt = datetime.fromisoformat(fecha_inicio)
+    else:
+        fecha_inicio_dt = datetime.now().replace(hour=0, minute=0, second=0)
+    
+    if fecha_fin:
+        # Parsear como fecha ISO y configurar hora final del día
+        fecha_fin_dt = datetime.fromisoformat(fecha_fin).replace(hour=23, minute=59, second=59)
+    else:
+        fecha_fin_dt = (fecha_inicio_dt + timedelta(days=30)).replace(hour=23, minute=59, second=59)
+    
+    # Las grillas se cachean por día UTC (las fechas sin zona ya se
+    # interpretan como UTC al cruzarlas con las reservas)
+    if fecha_inicio_dt.tzinfo is not None:
+        fecha_inicio_dt = fecha_inicio_dt.astimezone(timezone.utc)
+    if fecha_fin_dt.tzinfo is not None:
+        fecha_fin_dt = fecha_fin_dt.astimezone(timezone.utc)
+    
+    return fecha_inicio_dt, fecha_fin_dt
+
 # ============================================================================
 # ESPACIOS COMUNES
 # ============================================================================
 
+async def _version_espacios(request: Request, db: AsyncSession):
+    # El listado sale del registro en memoria (y de ESPACIOS_COMUNES, fijo)
+    await registro_espacios.asegurar_cargado(db)
+    return registro_espacios.todos()
+
+
 @router.get(
     "/espacios",
     response_model=List[EspacioComunResponse],
+    dependencies=[Depends(VersionHTTP(_version_espacios, cache_control=CACHE_CONTROL_PUBLICO))],
     summary="Listar todos los espacios comunes disponibles",
     tags=["Espacios"]
 )
-async def listar_espacios(db: Session = Depends(get_db)):
+async def listar_espacios(db: AsyncSession = Depends(get_async_db)):
     """
     Obtiene la lista de todos los espacios comunes disponibles.
     
+    Responde con ETag y Cache-Control público (max-age 60 s); con
+    If-None-Match de la misma versión responde 304.
+    
     Returns:
         Lista de espacios comunes con su información
     """
     try:
-        espacios_db = db.query(EspacioComun).all()
+        await registro_espacios.asegurar_cargado(db)
+        espacios_db = registro_espacios.todos()
         
         # Si la BD está vacía, retornamos los espacios predefinidos
         if not espacios_db:
@@ -85,7 +386,9 @@ async def listar_espacios(db: Session = Depends(get_db)):
             for key, espacio_info in ESPACIOS_COMUNES.items():
                 espacios_response.append(
                     EspacioComunResponse(
-                        id=hash(key) % 1000,  # ID temporal
+                        # ID temporal; determinístico (hash() cambia entre procesos y
+                        # el listado se cachea con un ETag compartido)
+                        id=zlib.crc32(key.encode()) % 1000,
                         nombre=espacio_info["nombre"],
                         descripcion=espacio_info["descripcion"],
                         requiere_pago=espacio_info["requiere_pago"],
@@ -117,6 +420,7 @@ async def listar_espacios(db: Session = Depends(get_db)):
 @router.get(
     "/espacios/{espacio}/disponibilidad",
     response_model=DisponibilidadResponse,
+    responses={200: {"content": {MEDIA_TYPE_NDJSON: {}, MEDIA_TYPE_BITMAP: {}}}},
     summary="Obtener disponibilidad de un espacio",
     tags=["Disponibilidad"]
 )
@@ -125,16 +429,29 @@ async def obtener_disponibilidad(
     fecha_inicio: Optional[str] = None,
     fecha_fin: Optional[str] = None,
     duracion_minutos: int = 60,
-    db: Session = Depends(get_db)
+    formato: Optional[str] = Query(None, description="json (default), ndjson o bitmap"),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene los slots disponibles para un espacio en un rango de fechas.
     
+    Con `formato=ndjson` (o `Accept: application/x-ndjson`) la respuesta se
+    transmite como un slot JSON por línea a medida que se calcula, útil
+    para rangos largos.
+    
+    Con `formato=bitmap` (o `Accept: application/vnd.condominio.disponibilidad-bitmap+json`)
+    retorna un entero por día en `ocupacion`: el bit i indica que la franja
+    de 30 minutos i (desde las 00:00 UTC) está ocupada; `hora_apertura` y
+    `hora_cierre` delimitan el horario reservable. No depende de
+    `duracion_minutos`.
+    
     Args:
         espacio: Tipo de espacio (multicancha, quincho, sala_eventos)
         fecha_inicio: Fecha de inicio (default: hoy)
         fecha_fin: Fecha de fin (default: 30 días desde hoy)
         duracion_minutos: Duración deseada en minutos (default: 60)
+        formato: Formato de la respuesta (json, ndjson, bitmap)
     
     Returns:
         Lista de slots disponibles
@@ -148,150 +465,162 @@ async def obtener_disponibilidad(
     
     # Valores por defecto y parsing de fechas
     try:
-        # Convertir strings a datetime si es necesario
-        if fecha_inicio:
-            if isinstance(fecha_inicio, str):
-                # Parsear como fecha ISO: "2025-10-25" → datetime con hora 00:00:00
-                dt = datetime.fromisoformat(fecha_inicio)
-                fecha_inicio_dt = dt  # type: ignore
-            else:
-                fecha_inicio_dt = fecha_inicio  # type: ignore
-        else:
-            fecha_inicio_dt = datetime.now().replace(hour=0, minute=0, second=0)
-        
-        if fecha_fin:
-            if isinstance(fecha_fin, str):
-                # Parsear como fecha ISO y configurar hora final del día
-                dt = datetime.fromisoformat(fecha_fin)
-                fecha_fin_dt = dt.replace(hour=23, minute=59, second=59)  # type: ignore
-            else:
-                fecha_fin_dt = fecha_fin  # type: ignore
-        else:
-            fecha_fin_dt = (fecha_inicio_dt + timedelta(days=30)).replace(hour=23, minute=59, second=59)
-        
-        fecha_inicio = fecha_inicio_dt  # type: ignore
-        fecha_fin = fecha_fin_dt  # type: ignore
+        fecha_inicio, fecha_fin = _parsear_rango(fecha_inicio, fecha_fin)
     except Exception as date_err:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al parsear fechas: {str(date_err)}"
         )
     
+    formato = _formato_solicitado(formato, accept)
+    if formato == "ndjson":
+        return StreamingResponse(
+            _transmitir_disponibilidad(espacio.lower(), fecha_inicio, fecha_fin, duracion_minutos),
+            media_type=MEDIA_TYPE_NDJSON
+        )
+    if formato == "bitmap":
+        try:
+            mapa = await _disponibilidad_bitmap(espacio.lower(), fecha_inicio, fecha_fin, db)
+        except Exception as e:
+            logger.exception("Error al obtener mapa de disponibilidad de %s", espacio)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener disponibilidad: {str(e)}"
+            )
+        return Response(
+            content=json.dumps(mapa, separators=(",", ":")),
+            media_type=MEDIA_TYPE_BITMAP
+        )
+    
     try:
-        import sys
-        print(f"DEBUG: Obteniendo disponibilidad para {espacio}", file=sys.stderr, flush=True)
-        
-        # Obtener disponibilidad de Google Calendar o generar datos de prueba
-        slots = None
-        if GOOGLE_CALENDAR_AVAILABLE and calendar_manager:
-            try:
-                print(f"DEBUG: Intentando usar Google Calendar", file=sys.stderr, flush=True)
-                slots = calendar_manager.get_disponibilidad(
-                    espacio.lower(),
-                    fecha_inicio,
-                    fecha_fin,
-                    duracion_minutos
-                )
-                print(f"DEBUG: Google Calendar OK", file=sys.stderr, flush=True)
-            except Exception as cal_error:
-                print(f"DEBUG: Google Calendar error: {type(cal_error).__name__}", file=sys.stderr, flush=True)
-                print(f"DEBUG: Fallback a datos de prueba", file=sys.stderr, flush=True)
-                slots = None
-        
-        # Si Google Calendar fallo o no está disponible, usar datos de prueba
-        if slots is None:
-            print(f"DEBUG: Usando datos de prueba", file=sys.stderr, flush=True)
-            slots = _generar_slots_prueba(fecha_inicio, fecha_fin, duracion_minutos)
-            print(f"DEBUG: Se generaron {len(slots)} slots", file=sys.stderr, flush=True)
+        espacio_key = espacio.lower()
+        slots = (await _disponibilidad_espacios(
+            [espacio_key], fecha_inicio, fecha_fin, duracion_minutos, db
+        ))[espacio_key]
         
-        # Obtener el espacio en la BD para verificar reservas existentes
-        espacio_nombre = ESPACIOS_COMUNES.get(espacio, {}).get('nombre', '')
-        espacio_db = db.query(EspacioComun).filter(
-            EspacioComun.nombre.ilike(f"%{espacio_nombre}%")
-        ).first()
-        
-        print(f"DEBUG: Buscando espacio '{espacio_nombre}', encontrado: {espacio_db.id if espacio_db else 'NO ENCONTRADO'}", file=sys.stderr, flush=True)
-        
-        # Obtener todas las reservas existentes para este espacio
-        reservas_existentes = []
-        if espacio_db:
-            reservas_existentes = db.query(Reserva).filter(
-                Reserva.espacio_comun_id == espacio_db.id,
-                Reserva.fecha_hora_inicio < fecha_fin,
-                Reserva.fecha_hora_fin > fecha_inicio
-            ).all()
-            print(f"DEBUG: Encontradas {len(reservas_existentes)} reservas para espacio {espacio_db.id} entre {fecha_inicio} y {fecha_fin}", file=sys.stderr, flush=True)
-            for r in reservas_existentes:
-                print(f"DEBUG: Reserva ID {r.id}: {r.fecha_hora_inicio} - {r.fecha_hora_fin}", file=sys.stderr, flush=True)
-        
-        # Marcar slots ocupados
-        # Convertir reservas a tuplas de Python SIN timezone para evitar conflictos
-        reservas_python = []
-        for r in reservas_existentes:
-            res_inicio = r.fecha_hora_inicio
-            res_fin = r.fecha_hora_fin
-            # Remover timezone si existe
-            if hasattr(res_inicio, 'tzinfo') and res_inicio.tzinfo is not None:
-                res_inicio = res_inicio.replace(tzinfo=None)
-            if hasattr(res_fin, 'tzinfo') and res_fin.tzinfo is not None:
-                res_fin = res_fin.replace(tzinfo=None)
-            reservas_python.append((res_inicio, res_fin))
-        
-        for slot in slots:
-            slot_inicio = datetime.fromisoformat(slot["inicio"])
-            slot_fin = datetime.fromisoformat(slot["fin"])
-            
-            # Remover timezone de los slots también
-            if hasattr(slot_inicio, 'tzinfo') and slot_inicio.tzinfo is not None:
-                slot_inicio = slot_inicio.replace(tzinfo=None)
-            if hasattr(slot_fin, 'tzinfo') and slot_fin.tzinfo is not None:
-                slot_fin = slot_fin.replace(tzinfo=None)
-            
-            # Verificar si este slot se solapa con alguna reserva existente
-            tiene_conflicto = False
-            for res_inicio, res_fin in reservas_python:
-                # Hay solapamiento si NOT (fin <= inicio OR inicio >= fin)
-                if not (slot_fin <= res_inicio or slot_inicio >= res_fin):
-                    tiene_conflicto = True
-                    break
-            
-            # Marcar como no disponible si hay conflicto
-            slot["disponible"] = not tiene_conflicto
-        
-        # Crear slots disponibles
-        slots_disponibles = []
-        for s in slots:
-            try:
-                slot_obj = SlotDisponible(inicio=s["inicio"], fin=s["fin"], disponible=s["disponible"])
-                slots_disponibles.append(slot_obj)
-            except Exception as slot_err:
-                logger.error(f"DEBUG: Error al crear SlotDisponible: {str(slot_err)}, slot: {s}")
-                raise
-        
-        response = DisponibilidadResponse(
+        return DisponibilidadResponse(
             espacio=espacio,
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin,
-            slots=slots_disponibles
+            slots=[
+                SlotDisponible(inicio=s["inicio"], fin=s["fin"], disponible=s["disponible"])
+                for s in slots
+            ]
         )
-        logger.error(f"DEBUG: Retornando respuesta con {len(slots_disponibles)} slots")
-        return response
         
     except ValueError as e:
-        logger.error(f"DEBUG: ValueError: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"DEBUG: Exception: {type(e).__name__}: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("Error al obtener disponibilidad de %s", espacio)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener disponibilidad: {str(e)}"
+        )
+
+@router.get(
+    "/disponibilidad",
+    response_model=DisponibilidadMultipleResponse,
+    summary="Obtener disponibilidad de varios espacios",
+    tags=["Disponibilidad"]
+)
+async def obtener_disponibilidad_espacios(
+    espacios: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    duracion_minutos: int = 60,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene los slots de varios espacios en una sola llamada.
+    
+    Los calendarios de Google se consultan en paralelo y las reservas de
+    todos los espacios se cargan con una sola consulta.
+    
+    Args:
+        espacios: Espacios separados por coma (default: todos)
+        fecha_inicio: Fecha de inicio (default: hoy)
+        fecha_fin: Fecha de fin (default: 30 días desde hoy)
+        duracion_minutos: Duración deseada en minutos (default: 60)
+    
+    Returns:
+        Disponibilidad de cada espacio solicitado
+    """
+    if espacios:
+        claves = list(dict.fromkeys(e.strip().lower() for e in espacios.split(",") if e.strip()))
+    else:
+        claves = list(ESPACIOS_COMUNES)
+    
+    invalidos = [e for e in claves if e not in ESPACIOS_COMUNES]
+    if invalidos or not claves:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Espacios no válidos: {', '.join(invalidos)}. Use: {', '.join(ESPACIOS_COMUNES)}"
+        )
+    
+    try:
+        fecha_inicio, fecha_fin = _parsear_rango(fecha_inicio, fecha_fin)
+    except Exception as date_err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error al parsear fechas: {str(date_err)}"
+        )
+    
+    try:
+        slots_por_espacio = await _disponibilidad_espacios(
+            claves, fecha_inicio, fecha_fin, duracion_minutos, db
+        )
+        
+        return DisponibilidadMultipleResponse(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            espacios=[
+                DisponibilidadResponse(
+                    espacio=espacio,
+                    fecha_inicio=fecha_inicio,
+                    fecha_fin=fecha_fin,
+                    slots=[
+                        SlotDisponible(inicio=s["inicio"], fin=s["fin"], disponible=s["disponible"])
+                        for s in slots
+                    ]
+                )
+                for espacio, slots in slots_por_espacio.items()
+            ]
+        )
+    except Exception as e:
+        logger.exception("Error al obtener disponibilidad de espacios")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener disponibilidad: {str(e)}"
         )
 
+@router.post(
+    "/espacios/registro/refrescar",
+    summary="Recargar el registro de espacios comunes",
+    tags=["Espacios"]
+)
+async def refrescar_registro_espacios(db: AsyncSession = Depends(get_async_db)):
+    """
+    Recarga desde la BD el registro en memoria de espacios (por ejemplo,
+    tras agregar un espacio o cambiar su slug).
+    """
+    total = await registro_espacios.cargar(db)
+    return {"espacios": total, "version": registro_espacios.version}
+
+@router.get(
+    "/disponibilidad/cache",
+    summary="Estadísticas del cache de disponibilidad",
+    tags=["Disponibilidad"]
+)
+async def estadisticas_cache_disponibilidad():
+    """
+    Retorna aciertos, fallos y ocupación del cache de grillas diarias,
+    para dimensionar DISPONIBILIDAD_CACHE_MAX_ENTRADAS y el TTL.
+    """
+    return cache_disponibilidad.estadisticas()
+
 # ============================================================================
 # RESERVAS
 # ============================================================================
@@ -306,7 +635,7 @@ async def obtener_disponibilidad(
 async def crear_reserva(
     reserva_data: ReservaCreate,
     usuario_id: int,  # En producción, esto vendría del token JWT
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Crea una nueva reserva para un espacio común.
@@ -319,9 +648,7 @@ async def crear_reserva(
     Returns:
         Datos de la reserva creada
     """
-    import sys
-    print(f"DEBUG CREAR: Fecha inicio recibida: {reserva_data.fecha_hora_inicio}", file=sys.stderr, flush=True)
-    print(f"DEBUG CREAR: Fecha fin recibida: {reserva_data.fecha_hora_fin}", file=sys.stderr, flush=True)
+    logger.debug("Crear reserva: %s de %s a %s", reserva_data.espacio, reserva_data.fecha_hora_inicio, reserva_data.fecha_hora_fin)
     
     # Validar que el espacio sea válido
     if reserva_data.espacio.lower() not in ESPACIOS_COMUNES:
@@ -330,14 +657,6 @@ async def crear_reserva(
             detail=f"Espacio '{reserva_data.espacio}' no válido"
         )
     
-    # Validar que el usuario exista
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-    if not usuario:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Usuario {usuario_id} no encontrado"
-        )
-    
     # Validar fechas
     if reserva_data.fecha_hora_fin <= reserva_data.fecha_hora_inicio:
         raise HTTPException(
@@ -345,13 +664,10 @@ async def crear_reserva(
             detail="La hora de fin debe ser posterior a la hora de inicio"
         )
     
-    # Validar que no haya conflictos con otras reservas
     espacio = reserva_data.espacio.lower()
     
     # Obtener el espacio en la BD - REQUERIDO
-    espacio_db = db.query(EspacioComun).filter(
-        EspacioComun.nombre.ilike(f"%{ESPACIOS_COMUNES.get(espacio, {}).get('nombre', '')}%")
-    ).first()
+    espacio_db = await registro_espacios.resolver_slug(espacio, db)
     
     if not espacio_db:
         raise HTTPException(
@@ -359,128 +675,409 @@ async def crear_reserva(
             detail=f"Espacio '{espacio}' no encontrado en la base de datos"
         )
     
-    # Buscar reservas que se solapen en el mismo espacio
-    reserva_conflictiva = db.query(Reserva).filter(
-        Reserva.espacio_comun_id == espacio_db.id,
-        Reserva.fecha_hora_inicio < reserva_data.fecha_hora_fin,
-        Reserva.fecha_hora_fin > reserva_data.fecha_hora_inicio
-    ).first()
+    # Obtener información del espacio
+    espacio_info = ESPACIOS_COMUNES.get(espacio, {})
+    monto_pago = espacio_info.get("precio", 0) if espacio_info.get("requiere_pago") else 0
     
-    if reserva_conflictiva:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"El espacio ya está reservado en ese horario. Conflicto con reserva ID {reserva_conflictiva.id}"
+    # Una sola sentencia: los solapes los rechaza la exclusion constraint
+    # reservas_sin_solape y un usuario inexistente, su foreign key
+    insercion = insert(Reserva).values(
+        espacio_comun_id=espacio_db.id,
+        usuario_id=usuario_id,
+        fecha_hora_inicio=reserva_data.fecha_hora_inicio,
+        fecha_hora_fin=reserva_data.fecha_hora_fin,
+        monto_pago=monto_pago,
+        estado_pago="pendiente" if monto_pago > 0 else "pagado",
+    ).returning(*Reserva.__table__.c)
+    
+    if GOOGLE_CALENDAR_AVAILABLE and calendar_manager:
+        # El evento en Google Calendar se crea en segundo plano (outbox), en
+        # la misma sentencia que la reserva
+        nueva = insercion.cte("nueva")
+        sentencia = select(nueva).add_cte(
+            insertar_creaciones(nueva, espacio, f"Reserva - {espacio_info.get('nombre', espacio)}").cte("outbox")
         )
+    else:
+        sentencia = insercion
     
     try:
-        # Obtener información del espacio
-        espacio_info = ESPACIOS_COMUNES.get(espacio, {})
-        espacio_id = espacio_db.id if espacio_db else 1
-        monto_pago = espacio_info.get("precio", 0) if espacio_info.get("requiere_pago") else 0
-        
-        # Crear evento en Google Calendar (si está disponible)
-        google_event = {}
-        if GOOGLE_CALENDAR_AVAILABLE and calendar_manager:
-            try:
-                google_event = calendar_manager.crear_evento(
-                    espacio,
-                    f"Reserva - {espacio_info.get('nombre', espacio)}",
-                    f"Reserva del usuario {usuario.nombre_completo} ({usuario.email})",
-                    reserva_data.fecha_hora_inicio,
-                    reserva_data.fecha_hora_fin,
-                    usuario.email
+        nueva_reserva = (await db.execute(sentencia)).one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        codigo = sqlstate(e)
+        if codigo == VIOLACION_EXCLUSION:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="El espacio ya está reservado en ese horario"
+            )
+        if codigo == VIOLACION_FOREIGN_KEY:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Usuario {usuario_id} no encontrado"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear reserva: {str(e)}"
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear reserva: {str(e)}"
+        )
+    
+    notificar_pendientes()
+    
+    # Las grillas cacheadas de los días afectados quedan obsoletas
+    invalidar_disponibilidad(espacio, reserva_data.fecha_hora_inicio, reserva_data.fecha_hora_fin)
+    
+    return ReservaResponse(
+        id=nueva_reserva.id,
+        espacio_comun_id=nueva_reserva.espacio_comun_id,
+        usuario_id=nueva_reserva.usuario_id,
+        fecha_hora_inicio=nueva_reserva.fecha_hora_inicio,
+        fecha_hora_fin=nueva_reserva.fecha_hora_fin,
+        monto_pago=nueva_reserva.monto_pago,
+        estado_pago=nueva_reserva.estado_pago,
+        created_at=nueva_reserva.created_at,
+        google_event_id=nueva_reserva.google_event_id
+    )
+
+def _expandir_ocurrencias(datos: ReservaRecurrenteCreate) -> List[Tuple[datetime, datetime]]:
+    """
+    Ocurrencias (inicio, fin) de una serie, ya sea desde la lista explícita o
+    desde la regla de recurrencia.
+    
+    Raises:
+        HTTPException 400 si la serie está mal definida
+    """
+    if datos.intervalos:
+        ocurrencias = [(i.fecha_hora_inicio, i.fecha_hora_fin) for i in datos.intervalos]
+    else:
+        if not (datos.fecha_hora_inicio and datos.fecha_hora_fin and datos.frecuencia):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Indique 'intervalos' o la regla fecha_hora_inicio/fecha_hora_fin/frecuencia"
+            )
+        if datos.repeticiones is None and datos.hasta is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La regla de recurrencia requiere 'repeticiones' o 'hasta'"
+            )
+        paso = timedelta(days=datos.cada * (7 if datos.frecuencia == "semanal" else 1))
+        duracion = datos.fecha_hora_fin - datos.fecha_hora_inicio
+        ocurrencias = []
+        inicio = datos.fecha_hora_inicio
+        while datos.repeticiones is None or len(ocurrencias) < datos.repeticiones:
+            if datos.hasta is not None and inicio > datos.hasta:
+                break
+            if len(ocurrencias) == MAX_OCURRENCIAS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La serie supera el máximo de {MAX_OCURRENCIAS} ocurrencias"
                 )
-            except Exception as e:
-                print(f"Advertencia: No se pudo crear evento en Google Calendar: {str(e)}")
-        
-        # Crear reserva en la BD
-        nueva_reserva = Reserva(
-            espacio_comun_id=espacio_id,
-            usuario_id=usuario_id,
-            fecha_hora_inicio=reserva_data.fecha_hora_inicio,
-            fecha_hora_fin=reserva_data.fecha_hora_fin,
-            monto_pago=monto_pago,
-            estado_pago="pendiente" if monto_pago > 0 else "pagado",
+            ocurrencias.append((inicio, inicio + duracion))
+            inicio += paso
+    
+    if not ocurrencias:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La serie no tiene ocurrencias"
         )
-        
-        # Guardar ID de Google Event si está disponible
-        if "id" in google_event:
-            nueva_reserva.google_event_id = google_event["id"]
-        
-        db.add(nueva_reserva)
-        db.commit()
-        db.refresh(nueva_reserva)
-        
-        return ReservaResponse(
-            id=nueva_reserva.id,
-            espacio_comun_id=nueva_reserva.espacio_comun_id,
-            usuario_id=nueva_reserva.usuario_id,
-            fecha_hora_inicio=nueva_reserva.fecha_hora_inicio,
-            fecha_hora_fin=nueva_reserva.fecha_hora_fin,
-            monto_pago=nueva_reserva.monto_pago,
-            estado_pago=nueva_reserva.estado_pago,
-            created_at=nueva_reserva.created_at,
-            google_event_id=getattr(nueva_reserva, 'google_event_id', None)
+    if any(fin <= inicio for inicio, fin in ocurrencias):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La hora de fin debe ser posterior a la hora de inicio"
         )
+    return ocurrencias
+
+@router.post(
+    "/recurrentes",
+    response_model=ReservaRecurrenteResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={409: {"model": ReservaRecurrenteResponse}},
+    summary="Crear una serie de reservas",
+    tags=["Reservas"]
+)
+async def crear_reservas_recurrentes(
+    datos: ReservaRecurrenteCreate,
+    usuario_id: int,  # En producción, esto vendría del token JWT
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea una serie de reservas (p. ej. el quincho todos los miércoles) con una
+    consulta de conflictos y un INSERT multi-fila, en una sola transacción.
     
-    except HTTPException:
-        raise
+    Si alguna ocurrencia tiene conflicto responde 409 con el detalle por
+    ocurrencia y no crea ninguna, salvo que `omitir_conflictos` sea true: en
+    ese caso crea las libres y reporta las demás.
+    
+    Args:
+        datos: Regla de recurrencia o lista de intervalos
+        usuario_id: ID del usuario que reserva
+        db: Sesión de base de datos
+    
+    Returns:
+        Reservas creadas y ocurrencias con conflicto
+    """
+    espacio = datos.espacio.lower()
+    if espacio not in ESPACIOS_COMUNES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Espacio '{datos.espacio}' no válido"
+        )
+    
+    espacio_db = await registro_espacios.resolver_slug(espacio, db)
+    if not espacio_db:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Espacio '{espacio}' no encontrado en la base de datos"
+        )
+    
+    ocurrencias = sorted(_expandir_ocurrencias(datos), key=lambda o: a_epoch(o[0]))
+    
+    # Una sola consulta: reservas del espacio que tocan el rango de la serie.
+    # La exclusion constraint garantiza que no se solapan entre sí, así que
+    # ordenadas por inicio también quedan ordenadas por fin.
+    existentes = (await db.execute(
+        select(Reserva.id, Reserva.fecha_hora_inicio, Reserva.fecha_hora_fin).where(
+            Reserva.espacio_comun_id == espacio_db.id,
+            Reserva.fecha_hora_inicio < max(fin for _, fin in ocurrencias),
+            Reserva.fecha_hora_fin > ocurrencias[0][0]
+        ).order_by(Reserva.fecha_hora_inicio)
+    )).all()
+    ids_existentes = [r.id for r in existentes]
+    inicios_existentes = [a_epoch(r.fecha_hora_inicio) for r in existentes]
+    fines_existentes = [a_epoch(r.fecha_hora_fin) for r in existentes]
+    
+    candidatas: List[Tuple[datetime, datetime]] = []
+    conflictos: List[ConflictoOcurrencia] = []
+    fin_anterior = None
+    for inicio, fin in ocurrencias:
+        inicio_epoch, fin_epoch = a_epoch(inicio), a_epoch(fin)
+        i = bisect_right(fines_existentes, inicio_epoch)
+        if i < len(inicios_existentes) and inicios_existentes[i] < fin_epoch:
+            conflictos.append(ConflictoOcurrencia(
+                fecha_hora_inicio=inicio, fecha_hora_fin=fin,
+                motivo="El espacio ya está reservado en ese horario",
+                reserva_id=ids_existentes[i]
+            ))
+        elif fin_anterior is not None and inicio_epoch < fin_anterior:
+            conflictos.append(ConflictoOcurrencia(
+                fecha_hora_inicio=inicio, fecha_hora_fin=fin,
+                motivo="Se solapa con otra ocurrencia de la serie"
+            ))
+        else:
+            candidatas.append((inicio, fin))
+            fin_anterior = fin_epoch
+    
+    if not candidatas or (conflictos and not datos.omitir_conflictos):
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content=jsonable_encoder(ReservaRecurrenteResponse(creadas=[], conflictos=conflictos))
+        )
+    
+    espacio_info = ESPACIOS_COMUNES.get(espacio, {})
+    monto_pago = espacio_info.get("precio", 0) if espacio_info.get("requiere_pago") else 0
+    
+    # INSERT multi-fila; ON CONFLICT DO NOTHING descarta las ocurrencias que
+    # otra transacción haya reservado después de la consulta anterior
+    insercion = pg_insert(Reserva).values([
+        {
+            "espacio_comun_id": espacio_db.id,
+            "usuario_id": usuario_id,
+            "fecha_hora_inicio": inicio,
+            "fecha_hora_fin": fin,
+            "monto_pago": monto_pago,
+            "estado_pago": "pendiente" if monto_pago > 0 else "pagado",
+        }
+        for inicio, fin in candidatas
+    ]).on_conflict_do_nothing().returning(*Reserva.__table__.c)
+    
+    if GOOGLE_CALENDAR_AVAILABLE and calendar_manager:
+        nuevas = insercion.cte("nuevas")
+        sentencia = select(nuevas).add_cte(
+            insertar_creaciones(nuevas, espacio, f"Reserva - {espacio_info.get('nombre', espacio)}").cte("outbox")
+        )
+    else:
+        sentencia = insercion
+    
+    try:
+        filas = (await db.execute(sentencia)).all()
+        creadas = {a_epoch(f.fecha_hora_inicio): f for f in filas}
+        for inicio, fin in candidatas:
+            if a_epoch(inicio) not in creadas:
+                conflictos.append(ConflictoOcurrencia(
+                    fecha_hora_inicio=inicio, fecha_hora_fin=fin,
+                    motivo="El espacio fue reservado por otra solicitud en ese horario"
+                ))
+        
+        if not filas or (conflictos and not datos.omitir_conflictos):
+            await db.rollback()
+            return JSONResponse(
+                status_code=status.HTTP_409_CONFLICT,
+                content=jsonable_encoder(ReservaRecurrenteResponse(creadas=[], conflictos=conflictos))
+            )
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if sqlstate(e) == VIOLACION_FOREIGN_KEY:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Usuario {usuario_id} no encontrado"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear reservas: {str(e)}"
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al crear reserva: {str(e)}"
+            detail=f"Error al crear reservas: {str(e)}"
         )
+    
+    notificar_pendientes()
+    for fila in filas:
+        invalidar_disponibilidad(espacio, fila.fecha_hora_inicio, fila.fecha_hora_fin)
+    
+    return ReservaRecurrenteResponse(
+        creadas=[
+            ReservaResponse(
+                id=f.id,
+                espacio_comun_id=f.espacio_comun_id,
+                usuario_id=f.usuario_id,
+                fecha_hora_inicio=f.fecha_hora_inicio,
+                fecha_hora_fin=f.fecha_hora_fin,
+                monto_pago=f.monto_pago,
+                estado_pago=f.estado_pago,
+                created_at=f.created_at,
+                google_event_id=f.google_event_id
+            )
+            for f in sorted(filas, key=lambda f: f.fecha_hora_inicio)
+        ],
+        conflictos=conflictos
+    )
+
+async def _version_reservas_usuario(request: Request, db: AsyncSession):
+    # Cantidad de reservas del usuario y última modificación
+    return (await db.execute(
+        select(func.count(), func.max(Reserva.updated_at))
+        .where(Reserva.usuario_id == int(request.path_params["usuario_id"]))
+    )).one()
+
 
 @router.get(
     "/usuario/{usuario_id}",
     response_model=List[ReservaListResponse],
+    dependencies=[Depends(VersionHTTP(_version_reservas_usuario))],
     summary="Listar reservas del usuario",
     tags=["Reservas"]
 )
-async def listar_reservas(usuario_id: int, db: Session = Depends(get_db)):
+async def listar_reservas(
+    usuario_id: int,
+    response: Response,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limite: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Obtiene todas las reservas de un usuario.
+    Obtiene las reservas de un usuario, de la más reciente a la más antigua.
+    
+    La paginación es por cursor (keyset sobre fecha_hora_inicio, id): si hay
+    más resultados, el header X-Next-Cursor trae el cursor de la página
+    siguiente.
+    
+    Responde con un ETag (cantidad de reservas y último updated_at); con
+    If-None-Match de la misma versión responde 304.
     
     Args:
         usuario_id: ID del usuario
+        desde: Solo reservas que comienzan desde esta fecha (ISO, inclusive)
+        hasta: Solo reservas que comienzan hasta esta fecha (ISO, inclusive)
+        cursor: Cursor de la página siguiente
+        limite: Cantidad máxima de reservas por página (default: 50)
         db: Sesión de base de datos
     
     Returns:
         Lista de reservas del usuario
     """
     try:
-        # Verificar que el usuario exista
-        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-        if not usuario:
+        desde_dt = datetime.fromisoformat(desde) if desde else None
+        hasta_dt = datetime.fromisoformat(hasta) if hasta else None
+        if hasta_dt is not None and len(hasta) == 10:
+            # Solo fecha: incluir el día completo
+            hasta_dt = hasta_dt.replace(hour=23, minute=59, second=59, microsecond=999999)
+    except ValueError as date_err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error al parsear fechas: {str(date_err)}"
+        )
+    
+    try:
+        # Reservas y nombre del espacio en una sola consulta
+        consulta = select(
+            Reserva.id,
+            EspacioComun.nombre,
+            Reserva.fecha_hora_inicio,
+            Reserva.fecha_hora_fin,
+            Reserva.estado_pago,
+            Reserva.monto_pago
+        ).outerjoin(
+            EspacioComun, EspacioComun.id == Reserva.espacio_comun_id
+        ).where(
+            Reserva.usuario_id == usuario_id
+        )
+        
+        if desde_dt is not None:
+            consulta = consulta.where(Reserva.fecha_hora_inicio >= desde_dt)
+        if hasta_dt is not None:
+            consulta = consulta.where(Reserva.fecha_hora_inicio <= hasta_dt)
+        if cursor:
+            cursor_inicio, cursor_id = decodificar_cursor(cursor, 2)
+            try:
+                cursor_inicio, cursor_id = datetime.fromisoformat(cursor_inicio), int(cursor_id)
+            except (TypeError, ValueError):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cursor de paginación no válido"
+                )
+            consulta = consulta.where(
+                tuple_(Reserva.fecha_hora_inicio, Reserva.id) < tuple_(cursor_inicio, cursor_id)
+            )
+        
+        filas = (await db.execute(
+            consulta.order_by(
+                Reserva.fecha_hora_inicio.desc(), Reserva.id.desc()
+            ).limit(limite + 1)
+        )).all()
+        
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            response.headers[HEADER_SIGUIENTE_CURSOR] = codificar_cursor(ultima.fecha_hora_inicio, ultima.id)
+        
+        # Sin resultados: verificar que el usuario exista
+        if not filas and not cursor and await db.get(Usuario, usuario_id) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Usuario {usuario_id} no encontrado"
             )
         
-        # Obtener reservas
-        reservas = db.query(Reserva).filter(
-            Reserva.usuario_id == usuario_id
-        ).order_by(Reserva.fecha_hora_inicio.desc()).all()
-        
-        resultado = []
-        for reserva in reservas:
-            espacio_db = db.query(EspacioComun).filter(
-                EspacioComun.id == reserva.espacio_comun_id
-            ).first()
-            
-            resultado.append(
-                ReservaListResponse(
-                    id=reserva.id,
-                    espacio=espacio_db.nombre if espacio_db else "Desconocido",
-                    fecha_hora_inicio=reserva.fecha_hora_inicio,
-                    fecha_hora_fin=reserva.fecha_hora_fin,
-                    estado_pago=reserva.estado_pago,
-                    monto_pago=float(reserva.monto_pago)
-                )
+        return [
+            ReservaListResponse(
+                id=fila.id,
+                espacio=fila.nombre if fila.nombre is not None else "Desconocido",
+                fecha_hora_inicio=fila.fecha_hora_inicio,
+                fecha_hora_fin=fila.fecha_hora_fin,
+                estado_pago=fila.estado_pago,
+                monto_pago=float(fila.monto_pago)
             )
-        
-        return resultado
+            for fila in filas
+        ]
     
     except HTTPException:
         raise
@@ -499,7 +1096,7 @@ async def listar_reservas(usuario_id: int, db: Session = Depends(get_db)):
 async def cancelar_reserva(
     reserva_id: int,
     usuario_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cancela una reserva existente.
@@ -514,7 +1111,7 @@ async def cancelar_reserva(
     """
     try:
         # Obtener la reserva
-        reserva = db.query(Reserva).filter(Reserva.id == reserva_id).first()
+        reserva = await db.get(Reserva, reserva_id)
         
         if not reserva:
             raise HTTPException(
@@ -529,37 +1126,30 @@ async def cancelar_reserva(
                 detail="No tienes permiso para cancelar esta reserva"
             )
         
-        # Eliminar de Google Calendar si existe el evento
-        if hasattr(reserva, 'google_event_id') and reserva.google_event_id and GOOGLE_CALENDAR_AVAILABLE and calendar_manager:
-            espacio_db = db.query(EspacioComun).filter(
-                EspacioComun.id == reserva.espacio_comun_id
-            ).first()
-            
-            # Encontrar el espacio correcto basado en el nombre
-            espacio_key = None
-            if espacio_db:
-                for key, info in ESPACIOS_COMUNES.items():
-                    if info["nombre"].lower() == espacio_db.nombre.lower():
-                        espacio_key = key
-                        break
-            
-            if espacio_key:
-                try:
-                    calendar_manager.eliminar_evento(espacio_key, reserva.google_event_id)
-                except Exception as e:
-                    # Log del error pero continuamos con la cancelación en la BD
-                    print(f"Advertencia: No se pudo eliminar evento de Google Calendar: {str(e)}")
+        await registro_espacios.asegurar_cargado(db)
+        espacio_db = registro_espacios.por_id(reserva.espacio_comun_id)
+        espacio_key = espacio_db.slug if espacio_db else None
+        
+        # El evento de Google Calendar se elimina en segundo plano (outbox)
+        if GOOGLE_CALENDAR_AVAILABLE and calendar_manager and espacio_key:
+            await encolar_eliminacion(db, reserva, espacio_key)
         
         # Eliminar de la BD
-        db.delete(reserva)
-        db.commit()
+        inicio, fin = reserva.fecha_hora_inicio, reserva.fecha_hora_fin
+        await db.delete(reserva)
+        await db.commit()
+        notificar_pendientes()
+        
+        # Las grillas cacheadas de los días afectados quedan obsoletas
+        if espacio_key:
+            invalidar_disponibilidad(espacio_key, inicio, fin)
         
         return {"message": "Reserva cancelada exitosamente", "reserva_id": reserva_id}
     
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al cancelar reserva: {str(e)}"
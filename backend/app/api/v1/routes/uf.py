@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ....db.deps import get_async_db
+from ....services.uf import UFNoDisponible, servicio_uf
+
+router = APIRouter()
+
+@router.get("")
+async def obtener_uf(db: AsyncSession = Depends(get_async_db)):
+    """
+    Valor de la UF del día (consultado a la CMF una vez al día). `fuente`
+    es "respaldo" cuando la CMF no respondió y se usa el último valor
+    guardado.
+    """
+    try:
+        uf = await servicio_uf.obtener(db)
+    except UFNoDisponible as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return {"valor": float(uf.valor), "fecha": uf.fecha.isoformat(), "fuente": uf.fuente}
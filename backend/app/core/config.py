@@ -20,6 +20,50 @@ class Settings:
         self.GOOGLE_CALENDAR_ID_MULTICANCHA: str = os.getenv("GOOGLE_CALENDAR_ID_MULTICANCHA", "")
         self.GOOGLE_CALENDAR_ID_QUINCHO: str = os.getenv("GOOGLE_CALENDAR_ID_QUINCHO", "")
         self.GOOGLE_CALENDAR_ID_SALA_EVENTOS: str = os.getenv("GOOGLE_CALENDAR_ID_SALA_EVENTOS", "")
+        
+        # Espejo local de Google Calendar (sincronización incremental)
+        self.GOOGLE_CALENDAR_SYNC_SEGUNDOS: int = int(os.getenv("GOOGLE_CALENDAR_SYNC_SEGUNDOS", 60))
+        self.GOOGLE_CALENDAR_SYNC_DIAS_PASADO: int = int(os.getenv("GOOGLE_CALENDAR_SYNC_DIAS_PASADO", 30))
+        self.GOOGLE_CALENDAR_SYNC_MAX_ANTIGUEDAD_SEGUNDOS: int = int(os.getenv("GOOGLE_CALENDAR_SYNC_MAX_ANTIGUEDAD_SEGUNDOS", 600))
+        
+        # Outbox de escrituras en Google Calendar
+        self.CALENDAR_OUTBOX_INTERVALO_SEGUNDOS: int = int(os.getenv("CALENDAR_OUTBOX_INTERVALO_SEGUNDOS", 5))
+        self.CALENDAR_OUTBOX_MAX_INTENTOS: int = int(os.getenv("CALENDAR_OUTBOX_MAX_INTENTOS", 8))
+        self.CALENDAR_OUTBOX_LOTE: int = int(os.getenv("CALENDAR_OUTBOX_LOTE", 20))
+        # Plazo de una operación tomada por un worker; si vence sin resultado
+        # (el worker se cayó) otro la vuelve a tomar
+        self.CALENDAR_OUTBOX_PLAZO_SEGUNDOS: int = int(os.getenv("CALENDAR_OUTBOX_PLAZO_SEGUNDOS", 300))
+        
+        # Cache de disponibilidad (grillas por espacio/día/duración)
+        self.DISPONIBILIDAD_CACHE_MAX_ENTRADAS: int = int(os.getenv("DISPONIBILIDAD_CACHE_MAX_ENTRADAS", 2048))
+        self.DISPONIBILIDAD_CACHE_TTL_SEGUNDOS: int = int(os.getenv("DISPONIBILIDAD_CACHE_TTL_SEGUNDOS", 300))
+        
+        # Desglose de pagos del residente: meses que muestra sin filtro de periodo
+        self.DESGLOSE_MESES_POR_DEFECTO: int = int(os.getenv("DESGLOSE_MESES_POR_DEFECTO", 12))
+        
+        # Verificación periódica de saldos_viviendas contra las tablas de origen
+        self.SALDOS_VERIFICACION_INTERVALO_SEGUNDOS: int = int(os.getenv("SALDOS_VERIFICACION_INTERVALO_SEGUNDOS", 3600))
+        
+        # Facturación mensual de gastos comunes
+        self.FACTURACION_LOTE: int = int(os.getenv("FACTURACION_LOTE", 2000))
+        self.FACTURACION_DIA_VENCIMIENTO: int = int(os.getenv("FACTURACION_DIA_VENCIMIENTO", 10))
+        
+        # Conciliación de cartolas bancarias (líneas por lote/transacción)
+        self.CONCILIACION_LOTE: int = int(os.getenv("CONCILIACION_LOTE", 2000))
+        
+        # Informe de morosidad (cache por condominio y fecha de corte)
+        self.MOROSIDAD_CACHE_MAX_ENTRADAS: int = int(os.getenv("MOROSIDAD_CACHE_MAX_ENTRADAS", 64))
+        self.MOROSIDAD_CACHE_TTL_SEGUNDOS: int = int(os.getenv("MOROSIDAD_CACHE_TTL_SEGUNDOS", 600))
+        self.MOROSIDAD_FILAS_POR_BLOQUE: int = int(os.getenv("MOROSIDAD_FILAS_POR_BLOQUE", 500))
+        
+        # API de la CMF para el valor de la UF (se puede apuntar a un stub local)
+        self.CMF_API_URL: str = os.getenv("CMF_API_URL", "https://api.cmfchile.cl/api-sbifv3/recursos_api/uf")
+        self.CMF_API_KEY: str = os.getenv("CMF_API_KEY", "")
+        self.CMF_TIMEOUT_SEGUNDOS: int = int(os.getenv("CMF_TIMEOUT_SEGUNDOS", 5))
+        
+        # Logging (nivel: DEBUG|INFO|WARNING|ERROR; formato: json|texto)
+        self.LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_FORMATO: str = os.getenv("LOG_FORMATO", "json").lower()
 
     @property
     def database_url(self) -> str:
@@ -0,0 +1,157 @@
+"""
+Logging estructurado y no bloqueante
+
+Los handlers de la aplicación solo encolan el registro (QueueHandler); un
+hilo de fondo (QueueListener) lo formatea y escribe en stdout. Cada registro
+lleva el request id del request en curso, y los campos pasados en `extra`
+se emiten como claves del JSON.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import settings
+
+HEADER_REQUEST_ID = "X-Request-ID"
+
+# Request id del request en curso (se copia a los hilos de asyncio.to_thread)
+request_id_actual: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos propios de LogRecord: todo lo demás viene de `extra`
+_ATRIBUTOS_ESTANDAR = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+logger = logging.getLogger("app.requests")
+
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            datos["request_id"] = record.request_id
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR and not clave.startswith("_"):
+                datos[clave] = valor
+        if record.exc_text:
+            datos["excepcion"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    """Formato legible para desarrollo local"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not getattr(record, "request_id", None):
+            record.request_id = "-"
+        return super().format(record)
+
+
+class _QueueHandlerContexto(QueueHandler):
+    """
+    Agrega el request id en el hilo que registra (el listener no ve el
+    contexto) y deja la excepción ya formateada en `exc_text`.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.request_id = request_id_actual.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def configurar_logging() -> None:
+    """
+    Configura el logger raíz con la cola y arranca el listener (una sola vez).
+
+    Nivel y formato vienen de LOG_LEVEL y LOG_FORMATO (json|texto).
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    salida = logging.StreamHandler(sys.stdout)
+    salida.setFormatter(FormateadorJSON() if settings.LOG_FORMATO == "json" else FormateadorTexto())
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(_QueueHandlerContexto(cola))
+    raiz.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class MiddlewareRequestId:
+    """
+    Middleware ASGI: asigna el request id (o respeta el X-Request-ID
+    entrante), lo devuelve en la respuesta y registra método, ruta, status y
+    duración de cada request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for nombre, valor in scope.get("headers", ()):
+            if nombre == b"x-request-id":
+                request_id = valor.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = request_id_actual.set(request_id)
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def enviar(mensaje):
+            nonlocal status_code
+            if mensaje["type"] == "http.response.start":
+                status_code = mensaje["status"]
+                mensaje["headers"] = list(mensaje.get("headers", ())) + [
+                    (HEADER_REQUEST_ID.lower().encode(), request_id.encode("latin-1"))
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            logger.info(
+                "%s %s %s",
+                scope["method"], scope["path"], status_code,
+                extra={
+                    "metodo": scope["method"],
+                    "ruta": scope["path"],
+                    "status": status_code,
+                    "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                },
+            )
+            request_id_actual.reset(token)
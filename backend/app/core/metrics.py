@@ -0,0 +1,315 @@
+"""
+Métricas en formato de texto de Prometheus
+
+Contadores, gauges e histogramas en memoria (por proceso) expuestos en
+GET /metrics: latencia por ruta, requests en curso, pool y consultas de
+SQLAlchemy, y llamadas a Google Calendar.
+"""
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MEDIA_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Etiquetas = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Etiquetas, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatear_valor(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _encabezado(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} {self.tipo}"]
+
+    def exponer(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Etiquetas, float] = {} if self.etiquetas else {(): 0}
+
+    def inc(self, *etiquetas: str, valor: float = 1) -> None:
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        return self._encabezado() + [
+            f"{self.nombre}{_formatear_etiquetas(self.etiquetas, e)} {_formatear_valor(v)}"
+            for e, v in valores
+        ]
+
+
+class Gauge(_Metrica):
+    """
+    Gauge con valor propio (inc/dec) o leído al exponer desde `funcion`,
+    que retorna pares (etiquetas, valor).
+    """
+    tipo = "gauge"
+
+    def __init__(self, *args, funcion: Callable[[], Iterable[Tuple[Etiquetas, float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Etiquetas, float] = {} if self.etiquetas else {(): 0}
+        self._funcion = funcion
+
+    def inc(self, *etiquetas: str, valor: float = 1) -> None:
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def dec(self, *etiquetas: str, valor: float = 1) -> None:
+        self.inc(*etiquetas, valor=-valor)
+
+    def exponer(self) -> List[str]:
+        if self._funcion is not None:
+            valores = list(self._funcion())
+        else:
+            with self._lock:
+                valores = list(self._valores.items())
+        return self._encabezado() + [
+            f"{self.nombre}{_formatear_etiquetas(self.etiquetas, e)} {_formatear_valor(v)}"
+            for e, v in valores
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = BUCKETS_SEGUNDOS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # etiquetas -> [conteos por bucket (no acumulados), suma, total]
+        self._series: Dict[Etiquetas, list] = {}
+
+    def observar(self, valor: float, *etiquetas: str) -> None:
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            series = [(e, list(s[0]), s[1], s[2]) for e, s in self._series.items()]
+        lineas = self._encabezado()
+        for etiquetas, conteos, suma, total in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                le = f'le="{_formatear_valor(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, etiquetas, le)} {acumulado}")
+            base = _formatear_etiquetas(self.etiquetas, etiquetas)
+            lineas.append(f"{self.nombre}_sum{base} {_formatear_valor(suma)}")
+            lineas.append(f"{self.nombre}_count{base} {total}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: List[_Metrica] = []
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def generar_texto(self) -> str:
+        lineas: List[str] = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+http_requests_total = registro_metricas.registrar(Contador(
+    "http_requests_total", "Requests HTTP atendidos", ("metodo", "ruta", "status")
+))
+http_request_duration_seconds = registro_metricas.registrar(Histograma(
+    "http_request_duration_seconds", "Latencia de los requests HTTP por ruta", ("metodo", "ruta")
+))
+http_requests_in_flight = registro_metricas.registrar(Gauge(
+    "http_requests_in_flight", "Requests HTTP en curso"
+))
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI: cuenta requests en curso y registra la latencia por
+    plantilla de ruta (p. ej. /api/v1/reservas/usuario/{usuario_id}), para
+    no crear una serie por cada id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def enviar(mensaje):
+            nonlocal status_code
+            if mensaje["type"] == "http.response.start":
+                status_code = mensaje["status"]
+            await send(mensaje)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            http_requests_in_flight.dec()
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            http_request_duration_seconds.observar(time.perf_counter() - inicio, scope["method"], ruta)
+            http_requests_total.inc(scope["method"], ruta, str(status_code))
+
+
+# ============================================================================
+# BASE DE DATOS
+# ============================================================================
+
+db_queries_total = registro_metricas.registrar(Contador(
+    "db_queries_total", "Sentencias SQL ejecutadas", ("engine",)
+))
+db_query_duration_seconds = registro_metricas.registrar(Histograma(
+    "db_query_duration_seconds", "Duración de las sentencias SQL", ("engine",)
+))
+db_pool_checkouts_total = registro_metricas.registrar(Contador(
+    "db_pool_checkouts_total", "Conexiones tomadas del pool", ("engine",)
+))
+db_pool_connects_total = registro_metricas.registrar(Contador(
+    "db_pool_connects_total", "Conexiones nuevas abiertas por el pool", ("engine",)
+))
+db_pool_checkout_seconds = registro_metricas.registrar(Histograma(
+    "db_pool_checkout_seconds", "Tiempo que cada conexión permanece fuera del pool", ("engine",)
+))
+
+_engines: Dict[str, Engine] = {}
+
+
+def _estado_pool() -> Iterable[Tuple[Etiquetas, float]]:
+    for nombre, engine in _engines.items():
+        pool = engine.pool
+        for estado, funcion in (("en_uso", "checkedout"), ("libres", "checkedin"), ("overflow", "overflow"), ("tamano", "size")):
+            if hasattr(pool, funcion):
+                # QueuePool.overflow() parte en -pool_size
+                yield (nombre, estado), max(0, getattr(pool, funcion)())
+
+
+db_pool_conexiones = registro_metricas.registrar(Gauge(
+    "db_pool_conexiones", "Estado del pool de conexiones (en_uso, libres, overflow, tamano)",
+    ("engine", "estado"), funcion=_estado_pool
+))
+
+
+def instrumentar_engine(engine: Engine, nombre: str) -> None:
+    """
+    Registra los hooks de eventos del engine (para uno asíncrono, pasar
+    `async_engine.sync_engine`).
+    """
+    _engines[nombre] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get("_metricas_inicio")
+        if inicios:
+            db_query_duration_seconds.observar(time.perf_counter() - inicios.pop(), nombre)
+        db_queries_total.inc(nombre)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto):
+        inicios = contexto.connection.info.get("_metricas_inicio") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
+
+    @event.listens_for(engine.pool, "connect")
+    def _conectar(dbapi_conn, registro):
+        db_pool_connects_total.inc(nombre)
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_conn, registro, proxy):
+        registro.info["_metricas_checkout"] = time.perf_counter()
+        db_pool_checkouts_total.inc(nombre)
+
+    @event.listens_for(engine.pool, "checkin")
+    def _checkin(dbapi_conn, registro):
+        inicio = registro.info.pop("_metricas_checkout", None)
+        if inicio is not None:
+            db_pool_checkout_seconds.observar(time.perf_counter() - inicio, nombre)
+
+
+# ============================================================================
+# GOOGLE CALENDAR
+# ============================================================================
+
+google_calendar_llamadas_total = registro_metricas.registrar(Contador(
+    "google_calendar_llamadas_total", "Llamadas a GoogleCalendarManager por resultado", ("operacion", "resultado")
+))
+google_calendar_duracion_seconds = registro_metricas.registrar(Histograma(
+    "google_calendar_duracion_seconds", "Latencia de las llamadas a GoogleCalendarManager", ("operacion",)
+))
+
+
+def medir_google(operacion: str) -> Callable:
+    """Decorador: latencia y resultado (ok/error) de una llamada a Google Calendar"""
+    def decorador(funcion: Callable) -> Callable:
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = "error"
+            try:
+                valor = funcion(*args, **kwargs)
+                resultado = "ok"
+                return valor
+            finally:
+                google_calendar_duracion_seconds.observar(time.perf_counter() - inicio, operacion)
+                google_calendar_llamadas_total.inc(operacion, resultado)
+        return envoltura
+    return decorador
@@ -1,5 +1,6 @@
-from typing import Generator
-from .session import SessionLocal
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
+from .session import AsyncSessionLocal, SessionLocal
 
 
 def get_db() -> Generator:
@@ -8,3 +9,8 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
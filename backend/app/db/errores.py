@@ -0,0 +1,22 @@
+"""
+Clasificación de errores de integridad de PostgreSQL por SQLSTATE
+"""
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+
+# https://www.postgresql.org/docs/current/errcodes-appendix.html
+VIOLACION_FOREIGN_KEY = "23503"
+VIOLACION_UNIQUE = "23505"
+VIOLACION_EXCLUSION = "23P01"
+
+
+def sqlstate(error: DBAPIError) -> Optional[str]:
+    """SQLSTATE del error del driver (psycopg), o None si no lo expone"""
+    return getattr(error.orig, "sqlstate", None)
+
+
+def constraint_violada(error: DBAPIError) -> Optional[str]:
+    """Nombre de la constraint que provocó el error, si el driver lo expone"""
+    diag = getattr(error.orig, "diag", None)
+    return getattr(diag, "constraint_name", None)
@@ -1,6 +1,16 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from ..core.config import settings
+from ..core.metrics import instrumentar_engine
 
 engine = create_engine(settings.database_url, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine asíncrono (psycopg 3 en modo async) para las rutas FastAPI
+async_engine = create_async_engine(settings.database_url, pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Métricas de consultas y del pool (GET /metrics)
+instrumentar_engine(engine, "sync")
+instrumentar_engine(async_engine.sync_engine, "async")
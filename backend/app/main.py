@@ -1,8 +1,60 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from .core.logs import HEADER_REQUEST_ID, MiddlewareRequestId, configurar_logging
+
+# Antes de importar las rutas, que ya registran al inicializarse
+configurar_logging()
+
+from .api.v1.paginacion import HEADER_SIGUIENTE_CURSOR
 from .api.v1.router import api_router
+from .api.v1.routes import pagos, reservas
+from .core.config import settings
+from .core.metrics import MEDIA_TYPE_PROMETHEUS, MiddlewareMetricas, registro_metricas
+from .db.session import AsyncSessionLocal, SessionLocal, async_engine
+from .services.calendar_mirror import refrescar_periodicamente
+from .services.calendar_outbox import ejecutar_worker
+from .services.espacios_registry import registro_espacios
+from .services.saldos import verificar_periodicamente
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI(title="Condominio API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Registro de espacios; si la BD no está lista se carga en el primer uso
+    try:
+        async with AsyncSessionLocal() as db:
+            await registro_espacios.cargar(db)
+    except Exception as e:
+        logger.warning("No se pudo cargar el registro de espacios al iniciar: %s", e)
+    
+    # Tareas de fondo: se cancelan al apagar la aplicación
+    tareas = []
+    if reservas.calendar_manager is not None:
+        tareas.append(asyncio.create_task(
+            refrescar_periodicamente(reservas.calendar_manager.espejo, settings.GOOGLE_CALENDAR_SYNC_SEGUNDOS)
+        ))
+        tareas.append(asyncio.create_task(
+            ejecutar_worker(SessionLocal, reservas.calendar_manager)
+        ))
+    # Los saldos por vivienda los mantienen triggers de PostgreSQL
+    if async_engine.dialect.name == "postgresql":
+        tareas.append(asyncio.create_task(
+            verificar_periodicamente(AsyncSessionLocal, settings.SALDOS_VERIFICACION_INTERVALO_SEGUNDOS)
+        ))
+    yield
+    for tarea in tareas:
+        tarea.cancel()
+    # Esperar a que terminen (y suelten sus conexiones) antes de cerrar el engine
+    await asyncio.gather(*tareas, return_exceptions=True)
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Condominio API", version="0.1.0", lifespan=lifespan)
 
 # CORS for local dev
 app.add_middleware(
@@ -10,11 +62,27 @@ app.add_middleware(
     allow_origins=["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=[
+        "ETag",
+        HEADER_SIGUIENTE_CURSOR,
+        pagos.HEADER_CURSOR_GASTOS,
+        pagos.HEADER_CURSOR_MULTAS,
+        pagos.HEADER_CURSOR_RESERVAS,
+        HEADER_REQUEST_ID,
+    ]
 )
 
+# Request id, registro y métricas de cada request (quedan por fuera de CORS)
+app.add_middleware(MiddlewareMetricas)
+app.add_middleware(MiddlewareRequestId)
+
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(registro_metricas.generar_texto(), media_type=MEDIA_TYPE_PROMETHEUS)
+
 app.include_router(api_router, prefix="/api/v1")
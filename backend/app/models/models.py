@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Boolean, CheckConstraint, Column, Date, DateTime, Enum, ForeignKey, Integer, Numeric, String
+from sqlalchemy import BigInteger, Boolean, CheckConstraint, Column, Computed, Date, DateTime, Enum, ForeignKey, Integer, JSON, Numeric, String, Text, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 
@@ -48,7 +48,8 @@ class GastoComun(Base):
     estado = Column(String(20), nullable=False, server_default="pendiente")
     vencimiento = Column(Date)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)  # Trigger en sql/013
+    __table_args__ = (UniqueConstraint("vivienda_id", "mes", "ano"),)
 
 class Multa(Base):
     __tablename__ = "multas"
@@ -58,12 +59,14 @@ class Multa(Base):
     descripcion = Column(String(500))
     fecha_aplicada = Column(Date, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)  # Trigger en sql/014
 
 class EspacioComun(Base):
     __tablename__ = "espacios_comunes"
     id = Column(BigInteger, primary_key=True)
     condominio_id = Column(BigInteger, ForeignKey("condominios.id", onupdate="CASCADE", ondelete="RESTRICT"), nullable=False)
     nombre = Column(String(150), nullable=False)
+    slug = Column(String(50), nullable=True, unique=True)  # Clave en ESPACIOS_COMUNES
     requiere_pago = Column(Boolean, nullable=False, server_default="false")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -78,6 +81,7 @@ class Reserva(Base):
     estado_pago = Column(String(20), nullable=False, server_default="pendiente")
     google_event_id = Column(String(255), nullable=True)  # ID del evento en Google Calendar
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)  # Trigger en sql/014 y 017 (no cuenta google_event_id)
 
 class Pago(Base):
     __tablename__ = "pagos"
@@ -87,3 +91,38 @@ class Pago(Base):
     monto_pagado = Column(Numeric(14,2), nullable=False)
     fecha_pago = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     metodo_pago = Column(String(30), nullable=False, server_default="webpay")
+    referencia = Column(String(100), nullable=True, unique=True)  # Id de la transacción en la cartola
+
+class CalendarOutbox(Base):
+    __tablename__ = "calendar_outbox"
+    id = Column(BigInteger, primary_key=True)
+    operacion = Column(String(20), nullable=False)  # crear|eliminar
+    reserva_id = Column(BigInteger, nullable=False)  # Sin FK: la reserva puede eliminarse antes de procesar
+    espacio = Column(String(50), nullable=False)
+    google_event_id = Column(String(255), nullable=True)
+    payload = Column(JSON, nullable=True)
+    estado = Column(String(20), nullable=False, server_default="pendiente")  # pendiente|en_proceso|procesado|cancelado|fallido
+    intentos = Column(Integer, nullable=False, server_default="0")
+    ultimo_error = Column(Text, nullable=True)
+    proximo_intento = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    procesado_at = Column(DateTime(timezone=True), nullable=True)
+
+class SaldoVivienda(Base):
+    __tablename__ = "saldos_viviendas"  # Mantenida por triggers (sql/010_saldos_viviendas.sql)
+    vivienda_id = Column(BigInteger, ForeignKey("viviendas.id", onupdate="CASCADE", ondelete="CASCADE"), primary_key=True)
+    total_gastos = Column(Numeric(14,2), nullable=False, server_default="0")
+    total_multas = Column(Numeric(14,2), nullable=False, server_default="0")
+    total_reservas_pendientes = Column(Numeric(14,2), nullable=False, server_default="0")
+    total_pagado = Column(Numeric(14,2), nullable=False, server_default="0")
+    total_adeudado = Column(Numeric(14,2), Computed("total_gastos + total_multas + total_reservas_pendientes", persisted=True))
+    saldo = Column(Numeric(14,2), Computed("total_gastos + total_multas + total_reservas_pendientes - total_pagado", persisted=True))
+    gastos_impagos = Column(Integer, nullable=False, server_default="0")
+    periodo_impago_desde = Column(Date, nullable=True)  # Primer día del gasto común impago más antiguo
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class ValorUF(Base):
+    __tablename__ = "valores_uf"  # Cache diario del valor de la UF (CMF)
+    fecha = Column(Date, primary_key=True)
+    valor = Column(Numeric(12,2), nullable=False)
+    obtenido_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
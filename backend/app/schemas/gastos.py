@@ -0,0 +1,36 @@
+"""
+Modelos Pydantic para validación de datos en endpoints de gastos comunes
+"""
+from pydantic import BaseModel, Field
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+class FacturacionCreate(BaseModel):
+    """Model para facturar los gastos comunes de un mes"""
+    condominio_id: int
+    ano: int = Field(..., ge=2000)
+    mes: int = Field(..., ge=1, le=12)
+    valor_uf: Optional[Decimal] = Field(None, gt=0, description="Valor de la UF en pesos; por defecto, la UF del día")
+    vencimiento: Optional[date] = Field(None, description="Por defecto, FACTURACION_DIA_VENCIMIENTO del mes siguiente")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "condominio_id": 1,
+                "ano": 2025,
+                "mes": 11,
+                "valor_uf": 39500.25
+            }
+        }
+
+class FacturacionResponse(BaseModel):
+    """Resultado de una facturación mensual"""
+    condominio_id: int
+    ano: int
+    mes: int
+    valor_uf: float
+    viviendas: int
+    creados: int
+    existentes: int
+    lotes: int
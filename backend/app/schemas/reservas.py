@@ -1,9 +1,24 @@
 """
 Modelos Pydantic para validación de datos en endpoints de reservas
 """
-from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, timezone
+from typing import Literal, Optional, List
+
+# Máximo de ocurrencias por serie de reservas (p. ej. dos años semanales)
+MAX_OCURRENCIAS = 104
+
+def _a_utc(valor: Optional[datetime]) -> Optional[datetime]:
+    """
+    Fecha con zona horaria en UTC; las que vienen sin zona se interpretan
+    como UTC (igual que a_epoch), así se pueden comparar aunque el cliente
+    mezcle ambos formatos.
+    """
+    if valor is None:
+        return None
+    if valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc)
 
 class EspacioComunResponse(BaseModel):
     """Response model para espacios comunes"""
@@ -26,6 +41,12 @@ class DisponibilidadResponse(BaseModel):
     fecha_fin: datetime
     slots: List[SlotDisponible]
 
+class DisponibilidadMultipleResponse(BaseModel):
+    """Response de disponibilidad de varios espacios"""
+    fecha_inicio: datetime
+    fecha_fin: datetime
+    espacios: List[DisponibilidadResponse]
+
 class ReservaCreate(BaseModel):
     """Model para crear una reserva"""
     espacio: str = Field(..., description="Tipo de espacio: multicancha, quincho, sala_eventos")
@@ -41,6 +62,42 @@ class ReservaCreate(BaseModel):
             }
         }
 
+class IntervaloReserva(BaseModel):
+    """Inicio y fin de una ocurrencia"""
+    fecha_hora_inicio: datetime
+    fecha_hora_fin: datetime
+    
+    _normalizar_fechas = field_validator("fecha_hora_inicio", "fecha_hora_fin")(_a_utc)
+
+class ReservaRecurrenteCreate(BaseModel):
+    """
+    Model para crear una serie de reservas: una regla de recurrencia (primera
+    ocurrencia + frecuencia + repeticiones/hasta) o una lista explícita de
+    intervalos.
+    """
+    espacio: str = Field(..., description="Tipo de espacio: multicancha, quincho, sala_eventos")
+    fecha_hora_inicio: Optional[datetime] = Field(None, description="Inicio de la primera ocurrencia")
+    fecha_hora_fin: Optional[datetime] = Field(None, description="Fin de la primera ocurrencia")
+    frecuencia: Optional[Literal["diaria", "semanal"]] = None
+    cada: int = Field(1, ge=1, le=52, description="Cada cuántos días/semanas se repite")
+    repeticiones: Optional[int] = Field(None, ge=1, le=MAX_OCURRENCIAS)
+    hasta: Optional[datetime] = Field(None, description="Última fecha de inicio posible (inclusive)")
+    intervalos: Optional[List[IntervaloReserva]] = Field(None, max_length=MAX_OCURRENCIAS)
+    omitir_conflictos: bool = Field(False, description="Crear las ocurrencias libres aunque otras tengan conflicto")
+    
+    _normalizar_fechas = field_validator("fecha_hora_inicio", "fecha_hora_fin", "hasta")(_a_utc)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "espacio": "quincho",
+                "fecha_hora_inicio": "2025-11-05T19:00:00",
+                "fecha_hora_fin": "2025-11-05T21:00:00",
+                "frecuencia": "semanal",
+                "repeticiones": 52
+            }
+        }
+
 class ReservaResponse(BaseModel):
     """Response model para una reserva"""
     id: int
@@ -53,6 +110,18 @@ class ReservaResponse(BaseModel):
     created_at: datetime
     google_event_id: Optional[str] = None
 
+class ConflictoOcurrencia(BaseModel):
+    """Ocurrencia de una serie que no se pudo reservar"""
+    fecha_hora_inicio: datetime
+    fecha_hora_fin: datetime
+    motivo: str
+    reserva_id: Optional[int] = None
+
+class ReservaRecurrenteResponse(BaseModel):
+    """Response de una serie de reservas"""
+    creadas: List[ReservaResponse]
+    conflictos: List[ConflictoOcurrencia]
+
 class ReservaListResponse(BaseModel):
     """Response para listar reservas"""
     id: int
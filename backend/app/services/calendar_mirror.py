@@ -0,0 +1,207 @@
+"""
+Espejo local de los eventos de Google Calendar, sincronizado con syncToken
+
+La primera sincronización de cada calendario descarga todos los eventos y
+guarda el `nextSyncToken`; las siguientes solo traen los cambios. Las lecturas
+de disponibilidad usan el índice en memoria y no esperan a la red.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.metrics import medir_google
+from app.services.disponibilidad import (
+    Intervalo,
+    IndiceIntervalos,
+    a_epoch,
+    intervalo_evento_google,
+    invalidar_disponibilidad,
+    invalidar_espacio,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _es_sync_token_expirado(error: Exception) -> bool:
+    """Google responde 410 Gone cuando el syncToken ya no es válido"""
+    resp = getattr(error, "resp", None)
+    return getattr(resp, "status", None) == 410
+
+
+class EspejoCalendario:
+    """
+    Copia en memoria de los eventos de cada calendario de espacio común.
+
+    `service` es cualquier objeto con la interfaz de `googleapiclient`
+    (`service.events().list(**params).execute()`), lo que permite usar un
+    servicio falso en pruebas.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        calendar_ids: Dict[str, Optional[str]],
+        dias_pasado: int = 30,
+        max_antiguedad_segundos: float = 600,
+    ):
+        self.service = service
+        self.calendar_ids = {k: v for k, v in calendar_ids.items() if v}
+        self.dias_pasado = dias_pasado
+        self.max_antiguedad_segundos = max_antiguedad_segundos
+        self._eventos: Dict[str, Dict[str, Intervalo]] = {}
+        self._indices: Dict[str, IndiceIntervalos] = {}
+        self._sync_tokens: Dict[str, str] = {}
+        self._ultima_sincronizacion: Dict[str, float] = {}
+        self._cubre_desde: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def sincronizado(self, espacio: str, desde: Optional[datetime] = None) -> bool:
+        """
+        Indica si el espejo del espacio es lo bastante reciente para usarse y,
+        si se entrega `desde`, si la ventana sincronizada lo cubre.
+        """
+        ultima = self._ultima_sincronizacion.get(espacio)
+        if ultima is None or time.monotonic() - ultima > self.max_antiguedad_segundos:
+            return False
+        return desde is None or a_epoch(desde) >= self._cubre_desde.get(espacio, 0)
+
+    def indice(self, espacio: str) -> IndiceIntervalos:
+        """Índice de eventos del espacio (se reconstruye solo si hubo cambios)"""
+        with self._lock:
+            indice = self._indices.get(espacio)
+            if indice is None:
+                indice = IndiceIntervalos(self._eventos.get(espacio, {}).values())
+                self._indices[espacio] = indice
+            return indice
+
+    # ------------------------------------------------------------------
+    # Escritura local (eventos creados/eliminados por esta API)
+    # ------------------------------------------------------------------
+
+    def registrar_evento(self, espacio: str, evento: Dict) -> None:
+        intervalo = intervalo_evento_google(evento)
+        if evento.get("id") and intervalo and espacio in self._eventos:
+            self._aplicar_cambios(espacio, [(evento["id"], intervalo)])
+
+    def quitar_evento(self, espacio: str, event_id: str) -> None:
+        if espacio in self._eventos:
+            self._aplicar_cambios(espacio, [(event_id, None)])
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+
+    @medir_google("sincronizar_espejo")
+    def sincronizar(self, espacio: str) -> int:
+        """
+        Sincroniza un calendario: completa si no hay syncToken, incremental si
+        lo hay. Retorna la cantidad de eventos recibidos.
+        """
+        calendar_id = self.calendar_ids.get(espacio)
+        if not calendar_id:
+            raise ValueError(f"Espacio '{espacio}' no válido")
+
+        token = self._sync_tokens.get(espacio)
+        try:
+            eventos, nuevo_token = self._listar(calendar_id, token)
+        except Exception as e:
+            if token is None or not _es_sync_token_expirado(e):
+                raise
+            logger.info("syncToken expirado para %s, sincronización completa", espacio)
+            self._sync_tokens.pop(espacio, None)
+            token = None
+            eventos, nuevo_token = self._listar(calendar_id, None)
+
+        if token is None:
+            self._reemplazar(espacio, eventos)
+            self._cubre_desde[espacio] = a_epoch(datetime.now(timezone.utc) - timedelta(days=self.dias_pasado))
+        else:
+            self._aplicar_cambios(
+                espacio,
+                [
+                    (e["id"], None if e.get("status") == "cancelled" else intervalo_evento_google(e))
+                    for e in eventos
+                    if e.get("id")
+                ],
+            )
+
+        if nuevo_token:
+            self._sync_tokens[espacio] = nuevo_token
+        else:
+            # Sin token la próxima sincronización vuelve a ser completa
+            self._sync_tokens.pop(espacio, None)
+        self._ultima_sincronizacion[espacio] = time.monotonic()
+        return len(eventos)
+
+    def sincronizar_todos(self) -> None:
+        """Sincroniza todos los calendarios; un fallo no detiene a los demás"""
+        for espacio in self.calendar_ids:
+            try:
+                self.sincronizar(espacio)
+            except Exception as e:
+                logger.warning("No se pudo sincronizar el calendario de %s: %s", espacio, e)
+
+    def _listar(self, calendar_id: str, sync_token: Optional[str]) -> Tuple[list, Optional[str]]:
+        """Recorre todas las páginas de `events().list`"""
+        params: Dict[str, Any] = {"calendarId": calendar_id, "singleEvents": True}
+        if sync_token:
+            params["syncToken"] = sync_token
+        else:
+            desde = datetime.now(timezone.utc) - timedelta(days=self.dias_pasado)
+            params["timeMin"] = desde.isoformat()
+
+        eventos = []
+        while True:
+            resultado = self.service.events().list(**params).execute()
+            eventos.extend(resultado.get("items", []))
+            page_token = resultado.get("nextPageToken")
+            if not page_token:
+                return eventos, resultado.get("nextSyncToken")
+            params["pageToken"] = page_token
+
+    def _reemplazar(self, espacio: str, eventos: Iterable[Dict]) -> None:
+        nuevos = {}
+        for evento in eventos:
+            intervalo = intervalo_evento_google(evento)
+            if evento.get("id") and intervalo and evento.get("status") != "cancelled":
+                nuevos[evento["id"]] = intervalo
+        with self._lock:
+            self._eventos[espacio] = nuevos
+            self._indices.pop(espacio, None)
+        invalidar_espacio(espacio)
+
+    def _aplicar_cambios(self, espacio: str, cambios: Iterable[Tuple[str, Optional[Intervalo]]]) -> None:
+        """Aplica altas/bajas/modificaciones e invalida los días afectados"""
+        afectados = []
+        with self._lock:
+            eventos = self._eventos.setdefault(espacio, {})
+            for event_id, intervalo in cambios:
+                anterior = eventos.pop(event_id, None)
+                if anterior:
+                    afectados.append(anterior)
+                if intervalo:
+                    eventos[event_id] = intervalo
+                    afectados.append(intervalo)
+            if afectados:
+                self._indices.pop(espacio, None)
+
+        for inicio, fin in afectados:
+            invalidar_disponibilidad(
+                espacio,
+                datetime.fromtimestamp(inicio, timezone.utc),
+                datetime.fromtimestamp(fin, timezone.utc),
+            )
+
+
+async def refrescar_periodicamente(espejo: EspejoCalendario, intervalo_segundos: float) -> None:
+    """Tarea de fondo: sincroniza el espejo cada `intervalo_segundos`"""
+    while True:
+        await asyncio.to_thread(espejo.sincronizar_todos)
+        await asyncio.sleep(intervalo_segundos)
@@ -0,0 +1,273 @@
+"""
+Outbox transaccional para las escrituras en Google Calendar
+
+Las rutas de reservas solo insertan filas en `calendar_outbox` dentro de la
+misma transacción que la reserva; este worker las envía a Google en segundo
+plano con reintentos y backoff exponencial, y completa `google_event_id`.
+
+El worker toma cada lote en una transacción corta (las filas quedan
+`en_proceso` con un plazo en `proximo_intento`), llama a Google sin bloqueos
+tomados y registra el resultado de cada operación con su propio commit.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, Optional, Union
+
+from sqlalchemy import Text, cast, exists, func, insert, literal, select
+from sqlalchemy.sql import Insert
+from sqlalchemy.sql.selectable import CTE
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.models.models import CalendarOutbox, Reserva, Usuario
+
+logger = logging.getLogger(__name__)
+
+# Despierta al worker apenas se encola una operación
+_hay_pendientes = asyncio.Event()
+
+_PREFIJO_EVENT_ID = "reserva"
+
+
+def event_id_reserva(reserva_id: int) -> str:
+    """
+    ID determinístico del evento de Google para una reserva (base32hex), de
+    modo que reintentar una creación no duplique el evento.
+    """
+    return f"{_PREFIJO_EVENT_ID}{reserva_id}"
+
+
+def _estado_http(error: BaseException) -> Optional[int]:
+    """Status HTTP de un HttpError de Google, aunque venga envuelto"""
+    while error is not None:
+        status = getattr(getattr(error, "resp", None), "status", None)
+        if status is not None:
+            return int(status)
+        error = error.__cause__
+    return None
+
+
+# ============================================================================
+# ENCOLAR (llamado desde las rutas, dentro de su transacción)
+# ============================================================================
+
+def encolar_creacion(db: Union[Session, AsyncSession], reserva: Reserva, espacio: str, payload: dict) -> CalendarOutbox:
+    """Registra la creación del evento de una reserva recién insertada (sin commit)"""
+    fila = CalendarOutbox(
+        operacion="crear",
+        reserva_id=reserva.id,
+        espacio=espacio,
+        google_event_id=event_id_reserva(reserva.id),
+        payload=payload,
+    )
+    db.add(fila)
+    return fila
+
+
+def _texto(valor: str):
+    """Parámetro tipado como text (las funciones variádicas no infieren el tipo)"""
+    return cast(literal(valor), Text)
+
+
+def insertar_creaciones(reservas: CTE, espacio: str, titulo: str) -> Insert:
+    """
+    INSERT ... SELECT que encola la creación de los eventos de las reservas del
+    CTE `reservas` (columnas id, usuario_id, fecha_hora_inicio, fecha_hora_fin),
+    para ejecutarse en la misma sentencia que inserta las reservas.
+
+    Mismo payload y event id que `encolar_creacion`.
+    """
+    return insert(CalendarOutbox).from_select(
+        ["operacion", "reserva_id", "espacio", "google_event_id", "payload"],
+        select(
+            literal("crear"),
+            reservas.c.id,
+            literal(espacio),
+            func.concat(_texto(_PREFIJO_EVENT_ID), reservas.c.id),
+            func.json_build_object(
+                _texto("titulo"), _texto(titulo),
+                _texto("descripcion"), func.concat(
+                    _texto("Reserva del usuario "), Usuario.nombre_completo,
+                    _texto(" ("), Usuario.email, _texto(")")
+                ),
+                _texto("inicio"), reservas.c.fecha_hora_inicio,
+                _texto("fin"), reservas.c.fecha_hora_fin,
+                _texto("email"), Usuario.email,
+            ),
+        ).join(Usuario, Usuario.id == reservas.c.usuario_id)
+    )
+
+
+async def encolar_eliminacion(db: AsyncSession, reserva: Reserva, espacio: str) -> Optional[CalendarOutbox]:
+    """
+    Registra la eliminación del evento de una reserva cancelada (sin commit).
+
+    Si la creación aún no se intentó, basta con cancelarla y no se encola nada.
+    Si está en proceso, la eliminación no se toma hasta que termine.
+    """
+    creacion = (await db.execute(
+        select(CalendarOutbox).where(
+            CalendarOutbox.reserva_id == reserva.id,
+            CalendarOutbox.operacion == "crear"
+        ).order_by(CalendarOutbox.id.desc()).limit(1).with_for_update()
+    )).scalars().first()
+
+    if creacion is not None and creacion.estado == "pendiente":
+        creacion.estado = "cancelado"
+        if creacion.intentos == 0:
+            return None
+
+    event_id = reserva.google_event_id or (creacion.google_event_id if creacion is not None else None)
+    if not event_id:
+        return None
+
+    fila = CalendarOutbox(
+        operacion="eliminar",
+        reserva_id=reserva.id,
+        espacio=espacio,
+        google_event_id=event_id,
+    )
+    db.add(fila)
+    return fila
+
+
+def notificar_pendientes() -> None:
+    """Avisa al worker que hay operaciones nuevas (llamar tras el commit)"""
+    _hay_pendientes.set()
+
+
+# ============================================================================
+# PROCESAR (worker)
+# ============================================================================
+
+def _ejecutar(fila: CalendarOutbox, calendar_manager: Any, db: Session) -> None:
+    if fila.operacion == "crear":
+        datos = fila.payload or {}
+        try:
+            evento = calendar_manager.crear_evento(
+                fila.espacio,
+                datos.get("titulo", ""),
+                datos.get("descripcion", ""),
+                datetime.fromisoformat(datos["inicio"]),
+                datetime.fromisoformat(datos["fin"]),
+                datos.get("email"),
+                event_id=fila.google_event_id,
+            )
+            fila.google_event_id = evento.get("id", fila.google_event_id)
+        except Exception as e:
+            # 409: el evento ya existe (un intento anterior sí llegó a Google)
+            if _estado_http(e) != 409:
+                raise
+        # Sin tocar updated_at (versión del ETag del listado, que no muestra el event id)
+        db.query(Reserva).filter(Reserva.id == fila.reserva_id).update(
+            {Reserva.google_event_id: fila.google_event_id, Reserva.updated_at: Reserva.updated_at},
+            synchronize_session=False
+        )
+    elif fila.operacion == "eliminar":
+        try:
+            calendar_manager.eliminar_evento(fila.espacio, fila.google_event_id)
+        except Exception as e:
+            # 404/410: el evento ya no existe (o nunca se llegó a crear)
+            if _estado_http(e) not in (404, 410):
+                raise
+    else:
+        raise ValueError(f"Operación desconocida: {fila.operacion}")
+
+
+def _tomar_lote(db: Session, lote: int) -> List[CalendarOutbox]:
+    """
+    Toma las operaciones pendientes vencidas y las en proceso cuyo plazo
+    expiró (su worker se cayó). Quedan en proceso hasta que venza el plazo;
+    el commit libera los bloqueos antes de llamar a Google.
+
+    Las filas se bloquean con SKIP LOCKED, por lo que varios workers pueden
+    correr en paralelo sin tomar dos veces la misma operación. Una eliminación
+    espera a que termine la creación en proceso del mismo evento.
+    """
+    ahora = datetime.now(timezone.utc)
+    creacion = aliased(CalendarOutbox)
+    creacion_en_proceso = exists().where(
+        creacion.reserva_id == CalendarOutbox.reserva_id,
+        creacion.operacion == "crear",
+        creacion.estado == "en_proceso",
+        creacion.proximo_intento > ahora,
+    )
+    filas = db.query(CalendarOutbox).filter(
+        CalendarOutbox.estado.in_(("pendiente", "en_proceso")),
+        CalendarOutbox.proximo_intento <= ahora,
+        (CalendarOutbox.operacion != "eliminar") | ~creacion_en_proceso,
+    ).order_by(CalendarOutbox.id).limit(lote).with_for_update(skip_locked=True).all()
+
+    plazo = ahora + timedelta(seconds=settings.CALENDAR_OUTBOX_PLAZO_SEGUNDOS)
+    for fila in filas:
+        fila.estado = "en_proceso"
+        fila.proximo_intento = plazo
+    db.commit()
+    return filas
+
+
+def _registrar_error(fila: CalendarOutbox, error: Exception, db: Session) -> None:
+    fila.intentos += 1
+    fila.ultimo_error = str(error)[:2000]
+    cancelada = fila.operacion == "crear" and db.query(exists().where(
+        CalendarOutbox.reserva_id == fila.reserva_id,
+        CalendarOutbox.operacion == "eliminar",
+    )).scalar()
+    if cancelada:
+        # La reserva se canceló mientras se creaba el evento: no se reintenta
+        fila.estado = "cancelado"
+    elif fila.intentos >= settings.CALENDAR_OUTBOX_MAX_INTENTOS:
+        fila.estado = "fallido"
+        logger.error("Outbox %s (%s) falló definitivamente: %s", fila.id, fila.operacion, error)
+    else:
+        espera = min(settings.CALENDAR_OUTBOX_INTERVALO_SEGUNDOS * 2 ** fila.intentos, 3600)
+        fila.estado = "pendiente"
+        fila.proximo_intento = datetime.now(timezone.utc) + timedelta(seconds=espera)
+        logger.warning("Outbox %s (%s) reintento %s en %ss: %s", fila.id, fila.operacion, fila.intentos, espera, error)
+
+
+def procesar_pendientes(session_factory: Callable[[], Session], calendar_manager: Any, lote: int = None) -> int:
+    """
+    Procesa un lote de operaciones pendientes. Retorna cuántas se tomaron.
+
+    Ninguna transacción queda abierta durante las llamadas a Google: cancelar
+    una reserva no espera a que termine el lote.
+    """
+    lote = lote or settings.CALENDAR_OUTBOX_LOTE
+    with session_factory() as db:
+        # Las filas tomadas conservan sus valores tras el commit, sin volver a
+        # leerlas (lo que abriría una transacción durante la llamada a Google)
+        db.expire_on_commit = False
+        filas = _tomar_lote(db, lote)
+
+        for fila in filas:
+            try:
+                _ejecutar(fila, calendar_manager, db)
+                fila.estado = "procesado"
+                fila.procesado_at = datetime.now(timezone.utc)
+                fila.ultimo_error = None
+            except Exception as e:
+                db.rollback()
+                _registrar_error(fila, e, db)
+            db.commit()
+        return len(filas)
+
+
+async def ejecutar_worker(session_factory: Callable[[], Session], calendar_manager: Any) -> None:
+    """Tarea de fondo: vacía el outbox y luego espera nuevas operaciones"""
+    while True:
+        _hay_pendientes.clear()
+        try:
+            procesadas = await asyncio.to_thread(procesar_pendientes, session_factory, calendar_manager)
+        except Exception as e:
+            logger.error("Error en el worker de calendar_outbox: %s", e)
+            procesadas = 0
+
+        if procesadas >= settings.CALENDAR_OUTBOX_LOTE:
+            continue
+        try:
+            await asyncio.wait_for(_hay_pendientes.wait(), timeout=settings.CALENDAR_OUTBOX_INTERVALO_SEGUNDOS)
+        except asyncio.TimeoutError:
+            pass
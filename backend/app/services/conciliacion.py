@@ -0,0 +1,292 @@
+"""
+Conciliación de cartolas bancarias / Webpay con los gastos comunes
+
+Carga masiva de pagos desde un CSV exportado por el banco o Webpay, con una
+línea por abono:
+
+    referencia,fecha,vivienda_id,periodo,monto
+    TX-000123,2025-02-03,15,2025-01,150000
+
+El archivo se procesa como un flujo de líneas en lotes, con memoria acotada
+por el lote y por la deuda abierta del condominio (no por el archivo):
+
+- La deuda abierta (gastos comunes no pagados) se carga una vez en un índice
+  en memoria con clave (vivienda, periodo, monto).
+- Cada línea se busca en el índice; la coincidencia se retira del índice,
+  así que dos abonos iguales no pagan el mismo gasto.
+- Por lote, con su propio commit: un UPDATE que marca como pagados los gastos
+  coincidentes solo si siguen abiertos (dos cargas concurrentes no pagan el
+  mismo gasto aunque sus referencias difieran) y un INSERT de los pagos de
+  los gastos reclamados con ON CONFLICT (referencia) DO NOTHING (cargar dos
+  veces la misma cartola no duplica pagos).
+"""
+import csv
+import logging
+import re
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import GastoComun, Pago, ResidenteVivienda, Vivienda
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = ("referencia", "fecha", "vivienda_id", "periodo", "monto")
+
+# Errores de línea que se devuelven en el resumen (el resto solo se cuenta)
+MAX_ERRORES = 100
+
+_CENTAVOS = Decimal("0.01")
+_MILES = re.compile(r"^\d{1,3}(\.\d{3})+$")
+_PERIODO = re.compile(r"^(\d{4})-(\d{2})$")
+
+Clave = Tuple[int, int, int, Decimal]  # (vivienda_id, año, mes, monto)
+
+
+class CartolaInvalida(ValueError):
+    """El archivo no tiene el formato esperado (encabezado)"""
+
+
+class _LineaInvalida(ValueError):
+    pass
+
+
+def _insert(db: AsyncSession):
+    # ON CONFLICT DO NOTHING: PostgreSQL (o SQLite en los benchmarks)
+    return sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+
+
+def parsear_monto(texto: str) -> Decimal:
+    """Montos en pesos: "150000", "150.000", "$ 150.000", "150000.00" o "150.000,50" """
+    limpio = texto.replace("$", "").replace(" ", "").strip()
+    if "," in limpio:
+        limpio = limpio.replace(".", "").replace(",", ".")
+    elif _MILES.match(limpio):
+        limpio = limpio.replace(".", "")
+    try:
+        monto = Decimal(limpio).quantize(_CENTAVOS)
+    except InvalidOperation:
+        raise _LineaInvalida(f"monto no válido: {texto!r}")
+    if monto <= 0:
+        raise _LineaInvalida(f"monto no válido: {texto!r}")
+    return monto
+
+
+def _parsear_fila(fila: Dict[str, str]) -> Tuple[str, datetime, Clave]:
+    referencia = (fila.get("referencia") or "").strip()
+    if not referencia or len(referencia) > 100:
+        raise _LineaInvalida("referencia vacía o de más de 100 caracteres")
+    try:
+        fecha = datetime.fromisoformat(fila["fecha"].strip())
+    except (AttributeError, ValueError):
+        raise _LineaInvalida(f"fecha no válida: {fila.get('fecha')!r}")
+    try:
+        vivienda_id = int(fila["vivienda_id"])
+    except (TypeError, ValueError):
+        raise _LineaInvalida(f"vivienda_id no válido: {fila.get('vivienda_id')!r}")
+    periodo = _PERIODO.match((fila.get("periodo") or "").strip())
+    if periodo is None or not 1 <= int(periodo.group(2)) <= 12:
+        raise _LineaInvalida(f"periodo no válido (AAAA-MM): {fila.get('periodo')!r}")
+    monto = parsear_monto(fila.get("monto") or "")
+    return referencia, fecha, (vivienda_id, int(periodo.group(1)), int(periodo.group(2)), monto)
+
+
+async def _indice_deuda(db: AsyncSession, condominio_id: int) -> Tuple[Dict[Clave, List[int]], Dict[int, int]]:
+    """
+    Gastos comunes no pagados del condominio por (vivienda, año, mes, monto)
+    y titular de cada vivienda (el residente de menor id), que queda como
+    usuario del pago.
+    """
+    deuda: Dict[Clave, List[int]] = {}
+    gastos = await db.stream(
+        select(GastoComun.id, GastoComun.vivienda_id, GastoComun.ano, GastoComun.mes, GastoComun.monto_total)
+        .join(Vivienda, Vivienda.id == GastoComun.vivienda_id)
+        .where(Vivienda.condominio_id == condominio_id, GastoComun.estado != "pagado")
+        .order_by(GastoComun.id)
+        .execution_options(yield_per=settings.CONCILIACION_LOTE)
+    )
+    async for filas in gastos.partitions():
+        for g in filas:
+            clave = (g.vivienda_id, g.ano, g.mes, Decimal(g.monto_total).quantize(_CENTAVOS))
+            deuda.setdefault(clave, []).append(g.id)
+
+    titulares = dict((await db.execute(
+        select(ResidenteVivienda.vivienda_id, func.min(ResidenteVivienda.usuario_id))
+        .join(Vivienda, Vivienda.id == ResidenteVivienda.vivienda_id)
+        .where(Vivienda.condominio_id == condominio_id)
+        .group_by(ResidenteVivienda.vivienda_id)
+    )).all())
+    return deuda, titulares
+
+
+async def lineas_de_bytes(trozos: AsyncIterable[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Líneas de texto de un flujo de bytes (p. ej. el cuerpo de la solicitud)"""
+    pendiente = b""
+    async for trozo in trozos:
+        pendiente += trozo
+        *completas, pendiente = pendiente.split(b"\n")
+        for linea in completas:
+            yield linea.decode(encoding)
+    if pendiente:
+        yield pendiente.decode(encoding)
+
+
+async def conciliar_cartola(
+    db: AsyncSession,
+    condominio_id: int,
+    lineas: AsyncIterable[str],
+    metodo_pago: str = "transferencia",
+    lote: Optional[int] = None,
+) -> Dict:
+    """
+    Registra los abonos de la cartola que coinciden con un gasto común
+    abierto del condominio y marca esos gastos como pagados.
+
+    Returns:
+        lineas: líneas de datos leídas
+        conciliados: pagos registrados (y gastos marcados como pagados)
+        existentes: referencias ya cargadas antes (se omiten)
+        sin_coincidencia: abonos sin gasto abierto con esa vivienda, periodo y monto
+        sin_residente: coincidencias en viviendas sin residente a quien asignar el pago
+        invalidas: líneas con formato no válido
+        lotes: cantidad de lotes (uno por transacción)
+        errores: las primeras MAX_ERRORES líneas rechazadas, con el motivo
+
+    Raises:
+        CartolaInvalida: si el encabezado no tiene las columnas esperadas
+    """
+    lote = lote or settings.CONCILIACION_LOTE
+    inicio = time.perf_counter()
+    deuda, titulares = await _indice_deuda(db, condominio_id)
+    insert = _insert(db)
+    resumen = {
+        "lineas": 0, "conciliados": 0, "existentes": 0, "sin_coincidencia": 0,
+        "sin_residente": 0, "invalidas": 0, "lotes": 0, "errores": [],
+    }
+
+    def rechazar(numero: int, contador: str, motivo: str):
+        resumen[contador] += 1
+        if len(resumen["errores"]) < MAX_ERRORES:
+            resumen["errores"].append({"linea": numero, "motivo": motivo})
+
+    async def procesar(filas: List[Tuple[int, Dict[str, str]]]):
+        # Referencias ya cargadas: no consumen deuda del índice
+        leidas = {}
+        for numero, fila in filas:
+            try:
+                leidas[numero] = _parsear_fila(fila)
+            except _LineaInvalida as e:
+                rechazar(numero, "invalidas", str(e))
+        referencias = {referencia for referencia, _, _ in leidas.values()}
+        cargadas = set((await db.execute(
+            select(Pago.referencia).where(Pago.referencia.in_(referencias))
+        )).scalars()) if referencias else set()
+
+        candidatas = []
+        for numero, (referencia, fecha, clave) in leidas.items():
+            if referencia in cargadas:
+                resumen["existentes"] += 1
+                continue
+            usuario_id = titulares.get(clave[0])
+            if clave in deuda and usuario_id is None:
+                rechazar(numero, "sin_residente", f"la vivienda {clave[0]} no tiene residentes")
+                continue
+            cargadas.add(referencia)
+            candidatas.append((numero, referencia, fecha, clave, usuario_id))
+
+        # Cada línea reclama un gasto del índice con un UPDATE condicionado a
+        # que siga abierto: si otra carga concurrente ya lo pagó (el índice se
+        # leyó al inicio) la línea prueba con el siguiente gasto de su clave
+        pagos = []
+        claves: Dict[int, Clave] = {}
+        while candidatas:
+            intento = {}
+            for linea in candidatas:
+                numero, referencia, _, clave, _ = linea
+                gastos = deuda.get(clave)
+                if not gastos:
+                    rechazar(numero, "sin_coincidencia", f"sin gasto común abierto para {referencia}")
+                    continue
+                intento[gastos.pop()] = linea
+                if not gastos:
+                    del deuda[clave]
+            if not intento:
+                break
+            reclamados = set((await db.execute(
+                update(GastoComun)
+                .where(GastoComun.id.in_(intento), GastoComun.estado != "pagado")
+                .values(estado="pagado")
+                .returning(GastoComun.id)
+            )).scalars())
+            candidatas = [linea for gasto_id, linea in intento.items() if gasto_id not in reclamados]
+            for gasto_id in reclamados:
+                _, referencia, fecha, clave, usuario_id = intento[gasto_id]
+                claves[gasto_id] = clave
+                pagos.append({
+                    "gasto_comun_id": gasto_id, "usuario_id": usuario_id, "monto_pagado": clave[3],
+                    "fecha_pago": fecha, "metodo_pago": metodo_pago, "referencia": referencia,
+                })
+
+        if pagos:
+            # RETURNING: solo los pagos insertados (otra carga concurrente pudo ganar la referencia)
+            insertados = set((await db.execute(
+                insert(Pago).on_conflict_do_nothing(index_elements=["referencia"]).returning(Pago.referencia),
+                pagos,
+            )).scalars())
+            perdidos = [pago for pago in pagos if pago["referencia"] not in insertados]
+            if perdidos:
+                # La referencia ya estaba: su gasto vuelve a quedar abierto
+                await db.execute(
+                    update(GastoComun)
+                    .where(GastoComun.id.in_([pago["gasto_comun_id"] for pago in perdidos]))
+                    .values(estado="pendiente")
+                )
+                for pago in perdidos:
+                    deuda.setdefault(claves[pago["gasto_comun_id"]], []).append(pago["gasto_comun_id"])
+            resumen["conciliados"] += len(insertados)
+            resumen["existentes"] += len(perdidos)
+        await db.commit()
+        resumen["lotes"] += 1
+
+    encabezado = None
+    filas: List[Tuple[int, Dict[str, str]]] = []
+    numero = 0
+    async for linea in lineas:
+        numero += 1
+        if not linea.strip():
+            continue
+        # Una línea por registro: las cartolas no traen saltos de línea en los campos
+        valores = next(csv.reader([linea]))
+        if encabezado is None:
+            encabezado = [v.strip().lstrip("\ufeff").lower() for v in valores]
+            faltantes = [c for c in COLUMNAS if c not in encabezado]
+            if faltantes:
+                raise CartolaInvalida(f"Faltan columnas en el encabezado: {', '.join(faltantes)}")
+            continue
+        resumen["lineas"] += 1
+        filas.append((numero, dict(zip(encabezado, valores))))
+        if len(filas) >= lote:
+            await procesar(filas)
+            filas = []
+    if encabezado is None:
+        raise CartolaInvalida("Archivo vacío")
+    if filas or not resumen["lotes"]:
+        await procesar(filas)
+
+    resumen["errores"].sort(key=lambda error: error["linea"])
+    logger.info(
+        "Conciliación del condominio %s: %s pagos registrados de %s líneas",
+        condominio_id, resumen["conciliados"], resumen["lineas"],
+        extra={
+            **{k: v for k, v in resumen.items() if k != "errores"},
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        },
+    )
+    return resumen
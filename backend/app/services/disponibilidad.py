@@ -0,0 +1,218 @@
+"""
+Motor de disponibilidad: detección de conflictos entre slots y reservas/eventos
+
+Los intervalos se normalizan una sola vez a enteros (segundos epoch UTC) y se
+ordenan, de modo que marcar n slots contra m intervalos ocupados cuesta
+O((n + m) log m) en vez de O(n * m).
+"""
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+from app.core.config import settings
+from app.services.cache import CacheTTL
+
+Intervalo = Tuple[int, int]
+
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_SEGUNDO = timedelta(seconds=1)
+_EPOCH_DATE = date(1970, 1, 1)
+
+
+def a_epoch(valor: Union[datetime, str]) -> int:
+    """
+    Convierte un datetime (o string ISO) a segundos epoch UTC.
+
+    Los datetime sin zona horaria se interpretan como UTC.
+    """
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if valor.tzinfo is None:
+        return (valor - _EPOCH_NAIVE) // _SEGUNDO
+    return (valor - _EPOCH_UTC) // _SEGUNDO
+
+
+def intervalo_evento_google(evento: Dict) -> Union[Intervalo, None]:
+    """Intervalo epoch de un evento de Google Calendar, o None si no tiene horario"""
+    inicio = evento.get('start', {})
+    fin = evento.get('end', {})
+    valor_inicio = inicio.get('dateTime', inicio.get('date'))
+    valor_fin = fin.get('dateTime', fin.get('date'))
+    if not valor_inicio or not valor_fin:
+        return None
+    return a_epoch(valor_inicio), a_epoch(valor_fin)
+
+
+class IndiceIntervalos:
+    """
+    Índice de intervalos ocupados [inicio, fin) en epoch UTC.
+
+    Los intervalos se fusionan al construir el índice, por lo que los arreglos
+    paralelos `inicios` y `fines` quedan ambos ordenados y sin solapes.
+    """
+
+    __slots__ = ("inicios", "fines")
+
+    def __init__(self, intervalos: Iterable[Intervalo] = ()):
+        inicios: List[int] = []
+        fines: List[int] = []
+        for inicio, fin in sorted(i for i in intervalos if i[1] > i[0]):
+            if fines and inicio <= fines[-1]:
+                if fin > fines[-1]:
+                    fines[-1] = fin
+            else:
+                inicios.append(inicio)
+                fines.append(fin)
+        self.inicios = inicios
+        self.fines = fines
+
+    @classmethod
+    def desde_datetimes(cls, pares: Iterable[Tuple[datetime, datetime]]) -> "IndiceIntervalos":
+        """Construye el índice a partir de pares (inicio, fin) de datetime"""
+        return cls((a_epoch(inicio), a_epoch(fin)) for inicio, fin in pares)
+
+    @classmethod
+    def desde_eventos_google(cls, eventos: Iterable[Dict]) -> "IndiceIntervalos":
+        """
+        Construye el índice a partir de los `items` de `events().list`.
+
+        Cada evento se parsea una única vez. Los eventos de día completo
+        (`date` en vez de `dateTime`) se toman desde la medianoche UTC.
+        """
+        intervalos = (intervalo_evento_google(evento) for evento in eventos)
+        return cls(i for i in intervalos if i is not None)
+
+    def __len__(self) -> int:
+        return len(self.inicios)
+
+    def hay_conflicto(self, inicio: int, fin: int) -> bool:
+        """Indica si [inicio, fin) se solapa con algún intervalo del índice"""
+        # Primer intervalo cuyo fin es posterior al inicio consultado
+        i = bisect_right(self.fines, inicio)
+        return i < len(self.inicios) and self.inicios[i] < fin
+
+
+def marcar_conflictos(slots: Sequence[Intervalo], indice: IndiceIntervalos) -> List[bool]:
+    """
+    Retorna, para cada slot (inicio, fin) en epoch, si tiene conflicto.
+
+    Recorre los slots en orden de inicio avanzando un único puntero sobre el
+    índice (barrido lineal); el resultado respeta el orden original de `slots`.
+    """
+    conflictos = [False] * len(slots)
+    if not slots or not len(indice):
+        return conflictos
+
+    orden = range(len(slots))
+    if any(slots[k][0] > slots[k + 1][0] for k in range(len(slots) - 1)):
+        orden = sorted(orden, key=lambda k: slots[k][0])
+
+    inicios, fines = indice.inicios, indice.fines
+    n = len(inicios)
+    j = 0
+    for k in orden:
+        inicio, fin = slots[k]
+        while j < n and fines[j] <= inicio:
+            j += 1
+        if j == n:
+            break
+        conflictos[k] = inicios[j] < fin
+    return conflictos
+
+
+def mapas_ocupacion(dias: Sequence[date], indice: IndiceIntervalos, resolucion_minutos: int = 30) -> List[int]:
+    """
+    Mapa de ocupación de cada día (UTC) como entero: el bit i indica si la
+    celda i del día (de `resolucion_minutos`, 48 celdas con 30 minutos) se
+    solapa con algún intervalo del índice.
+
+    Cada intervalo se vuelca como un rango de bits, sin generar slots.
+    """
+    celda = resolucion_minutos * 60
+    inicios, fines = indice.inicios, indice.fines
+    n = len(inicios)
+    mapas = []
+    for dia in dias:
+        inicio_dia = (dia - _EPOCH_DATE).days * 86400
+        fin_dia = inicio_dia + 86400
+        mapa = 0
+        j = bisect_right(fines, inicio_dia)
+        while j < n and inicios[j] < fin_dia:
+            primera = (max(inicios[j], inicio_dia) - inicio_dia) // celda
+            ultima = -(-(min(fines[j], fin_dia) - inicio_dia) // celda)
+            mapa |= ((1 << (ultima - primera)) - 1) << primera
+            j += 1
+        mapas.append(mapa)
+    return mapas
+
+
+def marcar_slots_ocupados(
+    slots: List[Dict],
+    ocupados: Iterable[Tuple[datetime, datetime]],
+) -> List[Dict]:
+    """
+    Actualiza `disponible` en cada slot según los intervalos ocupados.
+
+    Args:
+        slots: Slots con claves "inicio"/"fin" (ISO o datetime) y "disponible"
+        ocupados: Pares (inicio, fin) de reservas o eventos existentes
+
+    Returns:
+        La misma lista de slots, modificada in situ
+    """
+    indice = IndiceIntervalos.desde_datetimes(ocupados)
+    rangos = [(a_epoch(s["inicio"]), a_epoch(s["fin"])) for s in slots]
+    for slot, conflicto in zip(slots, marcar_conflictos(rangos, indice)):
+        slot["disponible"] = not conflicto
+    return slots
+
+
+# ============================================================================
+# CACHE DE GRILLAS DIARIAS
+# ============================================================================
+
+# Clave: (espacio, dia, duracion_minutos) -> lista de slots del día
+cache_disponibilidad = CacheTTL(
+    max_entradas=settings.DISPONIBILIDAD_CACHE_MAX_ENTRADAS,
+    ttl_segundos=settings.DISPONIBILIDAD_CACHE_TTL_SEGUNDOS,
+)
+
+
+def dias_en_rango(inicio: datetime, fin: datetime) -> List[date]:
+    """Días calendario cubiertos por [inicio, fin], ambos inclusive"""
+    dias = []
+    dia = inicio.date()
+    while dia <= fin.date():
+        dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+
+def agrupar_slots_por_dia(slots: Iterable[Dict]) -> Dict[date, List[Dict]]:
+    """Agrupa slots por el día de su inicio (sin re-parsear el ISO completo)"""
+    grupos: Dict[date, List[Dict]] = {}
+    for slot in slots:
+        inicio = slot["inicio"]
+        dia = date.fromisoformat(inicio[:10]) if isinstance(inicio, str) else inicio.date()
+        grupos.setdefault(dia, []).append(slot)
+    return grupos
+
+
+def invalidar_disponibilidad(espacio: str, inicio: datetime, fin: datetime) -> int:
+    """
+    Invalida las grillas de `espacio` para los días tocados por [inicio, fin),
+    para todas las duraciones. Retorna la cantidad de entradas eliminadas.
+    """
+    if inicio.tzinfo is not None:
+        inicio = inicio.astimezone(timezone.utc)
+    if fin.tzinfo is not None:
+        fin = fin.astimezone(timezone.utc)
+    # Un intervalo que termina justo a medianoche no toca el día siguiente
+    dias = set(dias_en_rango(inicio, max(inicio, fin - timedelta(microseconds=1))))
+    return cache_disponibilidad.invalidar(lambda clave: clave[0] == espacio and clave[1] in dias)
+
+
+def invalidar_espacio(espacio: str) -> int:
+    """Invalida todas las grillas cacheadas de un espacio"""
+    return cache_disponibilidad.invalidar(lambda clave: clave[0] == espacio)
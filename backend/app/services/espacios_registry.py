@@ -0,0 +1,89 @@
+"""
+Registro en memoria de los espacios comunes, indexado por slug e id
+
+Se carga al iniciar la aplicación y se puede refrescar; resolver un espacio
+es una búsqueda O(1) en un diccionario, sin consultar la BD en cada request.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import EspacioComun
+
+logger = logging.getLogger(__name__)
+
+
+class EspacioRegistrado(NamedTuple):
+    id: int
+    slug: Optional[str]
+    nombre: str
+    condominio_id: int
+    requiere_pago: bool
+
+
+class RegistroEspacios:
+    """Mapa slug <-> espacio común, reemplazado completo en cada carga"""
+
+    def __init__(self, min_segundos_entre_recargas: float = 60):
+        self.min_segundos_entre_recargas = min_segundos_entre_recargas
+        self._por_slug: Dict[str, EspacioRegistrado] = {}
+        self._por_id: Dict[int, EspacioRegistrado] = {}
+        self._ultima_carga: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.version = 0
+
+    @property
+    def cargado(self) -> bool:
+        return self._ultima_carga is not None
+
+    async def cargar(self, db: AsyncSession) -> int:
+        """(Re)carga todos los espacios desde la BD; retorna cuántos hay"""
+        async with self._lock:
+            filas = (await db.execute(
+                select(
+                    EspacioComun.id,
+                    EspacioComun.slug,
+                    EspacioComun.nombre,
+                    EspacioComun.condominio_id,
+                    EspacioComun.requiere_pago,
+                ).order_by(EspacioComun.id)
+            )).all()
+            espacios = [EspacioRegistrado(*fila) for fila in filas]
+            self._por_id = {e.id: e for e in espacios}
+            self._por_slug = {e.slug: e for e in espacios if e.slug}
+            self._ultima_carga = time.monotonic()
+            self.version += 1
+            logger.info("Registro de espacios cargado: %s espacios", len(espacios))
+            return len(espacios)
+
+    async def asegurar_cargado(self, db: AsyncSession) -> None:
+        if not self.cargado:
+            await self.cargar(db)
+
+    async def resolver_slug(self, slug: str, db: AsyncSession) -> Optional[EspacioRegistrado]:
+        """
+        Busca un espacio por slug. Si no está, recarga el registro (a lo más
+        una vez cada `min_segundos_entre_recargas`) por si es un espacio nuevo.
+        """
+        await self.asegurar_cargado(db)
+        espacio = self._por_slug.get(slug)
+        if espacio is None and time.monotonic() - self._ultima_carga >= self.min_segundos_entre_recargas:
+            await self.cargar(db)
+            espacio = self._por_slug.get(slug)
+        return espacio
+
+    def por_slug(self, slug: str) -> Optional[EspacioRegistrado]:
+        return self._por_slug.get(slug)
+
+    def por_id(self, espacio_id: int) -> Optional[EspacioRegistrado]:
+        return self._por_id.get(espacio_id)
+
+    def todos(self) -> List[EspacioRegistrado]:
+        return list(self._por_id.values())
+
+
+registro_espacios = RegistroEspacios()
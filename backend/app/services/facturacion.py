@@ -0,0 +1,106 @@
+"""
+Facturación mensual de gastos comunes
+
+Genera el gasto común del mes de cada vivienda de un condominio:
+cargo_fijo_uf × valor de la UF, redondeado a pesos. Las viviendas se
+recorren por id en lotes; cada lote es un solo INSERT ... SELECT con
+ON CONFLICT (vivienda_id, mes, ano) DO NOTHING y su propio commit, de modo
+que la facturación es idempotente y, si se interrumpe, basta con volver a
+ejecutarla: los gastos ya generados se omiten.
+"""
+import calendar
+import logging
+import time
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import GastoComun, Vivienda
+
+logger = logging.getLogger(__name__)
+
+
+def vencimiento_por_defecto(ano: int, mes: int) -> date:
+    """Día FACTURACION_DIA_VENCIMIENTO del mes siguiente al facturado (o su último día si es más corto)"""
+    ano_sig, mes_sig = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    dia = min(settings.FACTURACION_DIA_VENCIMIENTO, calendar.monthrange(ano_sig, mes_sig)[1])
+    return date(ano_sig, mes_sig, dia)
+
+
+def _insert(db: AsyncSession):
+    # ON CONFLICT DO NOTHING: PostgreSQL (o SQLite en los benchmarks)
+    return sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+
+
+async def facturar_mes(
+    db: AsyncSession,
+    condominio_id: int,
+    ano: int,
+    mes: int,
+    valor_uf: Decimal,
+    vencimiento: Optional[date] = None,
+    lote: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Inserta los gastos comunes del mes para las viviendas del condominio.
+
+    Returns:
+        viviendas: viviendas recorridas
+        creados: gastos comunes insertados
+        existentes: viviendas que ya tenían el gasto del mes (omitidas)
+        lotes: cantidad de lotes (uno por transacción)
+    """
+    lote = lote or settings.FACTURACION_LOTE
+    vencimiento = vencimiento or vencimiento_por_defecto(ano, mes)
+    insert = _insert(db)
+    inicio = time.perf_counter()
+    resumen = {"viviendas": 0, "creados": 0, "existentes": 0, "lotes": 0}
+
+    ultimo_id = 0
+    while True:
+        # Último id del lote (búsqueda por índice; sin traer las filas)
+        del_condominio = (Vivienda.condominio_id == condominio_id, Vivienda.id > ultimo_id)
+        tope = (await db.execute(
+            select(Vivienda.id).where(*del_condominio).order_by(Vivienda.id).offset(lote - 1).limit(1)
+        )).scalar()
+        rango = del_condominio if tope is None else del_condominio + (Vivienda.id <= tope,)
+
+        viviendas = select(
+            Vivienda.id,
+            literal(mes),
+            literal(ano),
+            func.round(Vivienda.cargo_fijo_uf * valor_uf, 0),
+            literal("pendiente"),
+            literal(vencimiento),
+        ).where(*rango)
+        resultado = await db.execute(
+            insert(GastoComun).from_select(
+                ["vivienda_id", "mes", "ano", "monto_total", "estado", "vencimiento"], viviendas
+            ).on_conflict_do_nothing(index_elements=["vivienda_id", "mes", "ano"])
+        )
+        if tope is None:
+            cantidad = (await db.execute(select(func.count()).select_from(Vivienda).where(*rango))).scalar_one()
+        else:
+            cantidad = lote
+        await db.commit()
+
+        resumen["lotes"] += 1
+        resumen["viviendas"] += cantidad
+        resumen["creados"] += resultado.rowcount
+        if tope is None:
+            break
+        ultimo_id = tope
+
+    resumen["existentes"] = resumen["viviendas"] - resumen["creados"]
+    logger.info(
+        "Facturación %s-%02d del condominio %s: %s gastos creados, %s existentes",
+        ano, mes, condominio_id, resumen["creados"], resumen["existentes"],
+        extra={**resumen, "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1)},
+    )
+    return resumen
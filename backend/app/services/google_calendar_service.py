@@ -4,13 +4,25 @@ Utilidades para interactuar con Google Calendar API usando Service Account
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
+import logging
 import os
+import threading
+from app.core.config import settings
+from app.core.metrics import medir_google
 from app.core.google_calendar import GOOGLE_SERVICE_ACCOUNT_KEY_PATH, GOOGLE_CALENDAR_IDS
+from app.services.calendar_mirror import EspejoCalendario
+from app.services.disponibilidad import IndiceIntervalos, a_epoch
+
+logger = logging.getLogger(__name__)
 
 class GoogleCalendarManager:
     """Manager para interactuar con Google Calendar API usando Service Account"""
     
+    # Horario de apertura de los espacios (8am - 8pm)
+    HORA_APERTURA = 8
+    HORA_CIERRE = 20
+    
     def __init__(self):
         # Validar que el archivo de Service Account exista
         if not os.path.exists(GOOGLE_SERVICE_ACCOUNT_KEY_PATH):
@@ -23,9 +35,31 @@ class GoogleCalendarManager:
             scopes=SCOPES
         )
         
-        self.service = build('calendar', 'v3', credentials=credentials)
         self.credentials = credentials
+        # Las llamadas a Google corren en hilos (asyncio.to_thread, el worker
+        # del outbox) y httplib2 no es thread-safe: cada hilo usa su cliente
+        self._clientes = threading.local()
+        
+        # Espejo local de eventos; lo mantiene al día refrescar_periodicamente.
+        # Se sincroniza en otro hilo y httplib2 no es thread-safe, por lo que
+        # usa su propio cliente
+        self.espejo = EspejoCalendario(
+            build('calendar', 'v3', credentials=credentials),
+            GOOGLE_CALENDAR_IDS,
+            dias_pasado=settings.GOOGLE_CALENDAR_SYNC_DIAS_PASADO,
+            max_antiguedad_segundos=settings.GOOGLE_CALENDAR_SYNC_MAX_ANTIGUEDAD_SEGUNDOS
+        )
     
+    @property
+    def service(self):
+        """Cliente de Calendar del hilo actual (se construye en su primer uso)"""
+        service = getattr(self._clientes, "service", None)
+        if service is None:
+            service = build('calendar', 'v3', credentials=self.credentials)
+            self._clientes.service = service
+        return service
+    
+    @medir_google("get_disponibilidad")
     def get_disponibilidad(
         self, 
         espacio: str, 
@@ -50,10 +84,6 @@ class GoogleCalendarManager:
             raise ValueError(f"Espacio '{espacio}' no válido")
         
         try:
-            import sys
-            print(f"DEBUG GCal: Obteniendo eventos para {espacio}, ID={calendar_id}", file=sys.stderr, flush=True)
-            print(f"DEBUG GCal: Rango: {fecha_inicio.isoformat()} a {fecha_fin.isoformat()}", file=sys.stderr, flush=True)
-            
             # Asegurar que tenemos timezone info (convertir a UTC si es naive)
             from datetime import timezone
             if fecha_inicio.tzinfo is None:
@@ -61,89 +91,107 @@ class GoogleCalendarManager:
             if fecha_fin.tzinfo is None:
                 fecha_fin = fecha_fin.replace(tzinfo=timezone.utc)
             
-            print(f"DEBUG GCal: Rango con TZ: {fecha_inicio.isoformat()} a {fecha_fin.isoformat()}", file=sys.stderr, flush=True)
-            
-            # Obtener eventos del calendario
-            events_result = self.service.events().list(
-                calendarId=calendar_id,
-                timeMin=fecha_inicio.isoformat(),
-                timeMax=fecha_fin.isoformat(),
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            print(f"DEBUG GCal: Encontrados {len(events)} eventos", file=sys.stderr, flush=True)
+            indice_eventos = self.obtener_ocupados(espacio, fecha_inicio, fecha_fin)
             
             # Calcular slots disponibles
             disponibilidad = self._calcular_slots_disponibles(
                 fecha_inicio, 
                 fecha_fin, 
-                events, 
+                indice_eventos, 
                 duracion_minutos
             )
             
-            print(f"DEBUG GCal: Retornando {len(disponibilidad)} slots disponibles", file=sys.stderr, flush=True)
+            logger.debug("GCal %s: %s slots disponibles entre %s y %s", espacio, len(disponibilidad), fecha_inicio, fecha_fin)
             return disponibilidad
             
         except Exception as e:
-            import sys
-            print(f"DEBUG GCal ERROR: {str(e)}", file=sys.stderr, flush=True)
             raise Exception(f"Error al obtener disponibilidad de Google Calendar: {str(e)}")
     
+    @medir_google("obtener_ocupados")
+    def obtener_ocupados(self, espacio: str, fecha_inicio: datetime, fecha_fin: datetime) -> IndiceIntervalos:
+        """
+        Índice de los intervalos ocupados por eventos del calendario del espacio
+        (desde el espejo local si está al día, o consultando a Google)
+        """
+        calendar_id = GOOGLE_CALENDAR_IDS.get(espacio)
+        if not calendar_id:
+            raise ValueError(f"Espacio '{espacio}' no válido")
+        
+        espejo = getattr(self, 'espejo', None)
+        if espejo is not None and espejo.sincronizado(espacio, fecha_inicio):
+            # Leer del espejo local, sin esperar a la red
+            indice_eventos = espejo.indice(espacio)
+            logger.debug("GCal %s: espejo local (%s intervalos)", espacio, len(indice_eventos))
+            return indice_eventos
+        
+        # Obtener eventos del calendario
+        events_result = self.service.events().list(
+            calendarId=calendar_id,
+            timeMin=fecha_inicio.isoformat(),
+            timeMax=fecha_fin.isoformat(),
+            singleEvents=True,
+            orderBy='startTime'
+        ).execute()
+        
+        events = events_result.get('items', [])
+        logger.debug("GCal %s: %s eventos desde la API", espacio, len(events))
+        
+        # Parsear los eventos una sola vez en un índice ordenado
+        return IndiceIntervalos.desde_eventos_google(events)
+    
     def _calcular_slots_disponibles(
         self,
         fecha_inicio: datetime,
         fecha_fin: datetime,
-        eventos_ocupados: List,
+        eventos_ocupados: Union[IndiceIntervalos, List],
         duracion_minutos: int
     ) -> List[Dict]:
         """
         Calcula los slots disponibles considerando los eventos ocupados
+        
+        `eventos_ocupados` puede ser el índice ya construido o la lista cruda
+        de eventos de Google Calendar (se indexa una sola vez).
         """
+        if not isinstance(eventos_ocupados, IndiceIntervalos):
+            eventos_ocupados = IndiceIntervalos.desde_eventos_google(eventos_ocupados)
+        
         disponibilidad = []
         duracion = timedelta(minutes=duracion_minutos)
+        paso = timedelta(minutes=30)  # Bloques de 30 min
         
-        # Horario de apertura (8am - 8pm por defecto)
-        hora_apertura = 8
-        hora_cierre = 20
+        hora_apertura = self.HORA_APERTURA
+        hora_cierre = self.HORA_CIERRE
         
-        current = fecha_inicio.replace(hour=hora_apertura, minute=0, second=0)
+        dia = fecha_inicio.replace(hour=hora_apertura, minute=0, second=0)
         
-        while current < fecha_fin:
+        while dia < fecha_fin:
+            current = dia
             slot_fin = current + duracion
             
-            # Verificar que no supere la hora de cierre
-            if slot_fin.hour > hora_cierre:
-                current = current.replace(day=current.day + 1, hour=hora_apertura, minute=0)
-                continue
-            
-            # Verificar que no haya conflictos con eventos existentes
-            if not self._hay_conflicto(current, slot_fin, eventos_ocupados):
-                disponibilidad.append({
-                    "inicio": current.isoformat(),
-                    "fin": slot_fin.isoformat(),
-                    "disponible": True
-                })
+            # Recorrer el día hasta que el slot supere la hora de cierre
+            while current < fecha_fin and slot_fin.hour <= hora_cierre:
+                if not self._hay_conflicto(current, slot_fin, eventos_ocupados):
+                    disponibilidad.append({
+                        "inicio": current.isoformat(),
+                        "fin": slot_fin.isoformat(),
+                        "disponible": True
+                    })
+                
+                current += paso
+                slot_fin += paso
             
-            current += timedelta(minutes=30)  # Incrementar por bloques de 30 min
+            dia += timedelta(days=1)
         
         return disponibilidad
     
-    def _hay_conflicto(self, inicio: datetime, fin: datetime, eventos: List) -> bool:
+    def _hay_conflicto(self, inicio: datetime, fin: datetime, eventos: IndiceIntervalos) -> bool:
         """
         Verifica si hay conflicto entre el horario dado y los eventos existentes
+        (búsqueda binaria sobre el índice pre-parseado)
         """
-        for evento in eventos:
-            evento_inicio = datetime.fromisoformat(evento['start'].get('dateTime', evento['start'].get('date')))
-            evento_fin = datetime.fromisoformat(evento['end'].get('dateTime', evento['end'].get('date')))
-            
-            # Hay conflicto si los rangos se solapan
-            if not (fin <= evento_inicio or inicio >= evento_fin):
-                return True
-        
-        return False
+        return eventos.hay_conflicto(a_epoch(inicio), a_epoch(fin))
     
+    @medir_google("crear_evento")
     def crear_evento(
         self,
         espacio: str,
@@ -151,7 +199,8 @@ class GoogleCalendarManager:
         descripcion: str,
         fecha_inicio: datetime,
         fecha_fin: datetime,
-        email_asistente: str = None
+        email_asistente: str = None,
+        event_id: str = None
     ) -> Dict:
         """
         Crea un evento en el calendario de Google
@@ -163,6 +212,8 @@ class GoogleCalendarManager:
             fecha_inicio: Fecha y hora de inicio
             fecha_fin: Fecha y hora de fin
             email_asistente: Email opcional para agregar como asistente
+            event_id: ID opcional del evento (base32hex); permite reintentar
+                la creación sin duplicar el evento
         
         Returns:
             Datos del evento creado
@@ -185,6 +236,9 @@ class GoogleCalendarManager:
                 },
             }
             
+            if event_id:
+                event['id'] = event_id
+            
             # NOTA: No agregamos attendees porque Service Account no puede enviar invitaciones
             # Si necesitas invitar usuarios, requiere Domain-Wide Delegation
             # if email_asistente:
@@ -196,11 +250,14 @@ class GoogleCalendarManager:
                 sendUpdates='none'  # No enviar notificaciones
             ).execute()
             
+            self.espejo.registrar_evento(espacio, result)
+            
             return result
             
         except Exception as e:
-            raise Exception(f"Error al crear evento en Google Calendar: {str(e)}")
+            raise Exception(f"Error al crear evento en Google Calendar: {str(e)}") from e
     
+    @medir_google("eliminar_evento")
     def eliminar_evento(self, espacio: str, event_id: str) -> bool:
         """
         Elimina un evento del calendario de Google
@@ -215,7 +272,9 @@ class GoogleCalendarManager:
                 eventId=event_id
             ).execute()
             
+            self.espejo.quitar_evento(espacio, event_id)
+            
             return True
             
         except Exception as e:
-            raise Exception(f"Error al eliminar evento de Google Calendar: {str(e)}")
+            raise Exception(f"Error al eliminar evento de Google Calendar: {str(e)}") from e
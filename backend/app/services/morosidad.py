@@ -0,0 +1,220 @@
+"""
+Informe de morosidad del condominio
+
+Deuda vencida de cada vivienda a una fecha de corte, por antigüedad
+(1-30, 31-60, 61-90 y más de 90 días), calculada en una sola consulta:
+
+- Los cargos son los gastos comunes (por vencimiento; sin vencimiento, el
+  último día del mes facturado) y las multas (por fecha aplicada) vencidos
+  antes del corte.
+- Los pagos hechos hasta el corte se imputan a los cargos más antiguos de la
+  vivienda (suma acumulada con una función de ventana), igual que el saldo de
+  saldos_viviendas descuenta el total pagado del total adeudado.
+- Lo que queda impago de cada cargo se agrupa por tramo y por vivienda; el
+  ranking y la participación en la deuda del condominio son funciones de
+  ventana sobre ese resultado.
+
+Las filas se leen con un cursor del lado del servidor y quedan en cache por
+(condominio, corte).
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import AsyncIterator, Iterable, List, Tuple
+
+from sqlalchemy import Date, Integer, case, cast, func, literal, literal_column, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import GastoComun, Multa, Pago, Vivienda
+from app.services.cache import CacheTTL
+
+COLUMNAS = (
+    "vivienda_id",
+    "numero_vivienda",
+    "deuda_1_30",
+    "deuda_31_60",
+    "deuda_61_90",
+    "deuda_mas_90",
+    "deuda_total",
+    "cargos_impagos",
+    "dias_mayor_atraso",
+    "ranking",
+    "participacion",
+)
+
+# Tramos de antigüedad: (columna, días desde, días hasta o None)
+TRAMOS = (
+    ("deuda_1_30", 1, 30),
+    ("deuda_31_60", 31, 60),
+    ("deuda_61_90", 61, 90),
+    ("deuda_mas_90", 91, None),
+)
+
+Fila = Tuple  # Valores en el orden de COLUMNAS
+
+# Clave: (condominio_id, corte) -> filas del informe
+cache_morosidad = CacheTTL(
+    max_entradas=settings.MOROSIDAD_CACHE_MAX_ENTRADAS,
+    ttl_segundos=settings.MOROSIDAD_CACHE_TTL_SEGUNDOS,
+)
+
+
+def invalidar_morosidad(condominio_id: int) -> int:
+    """Descarta los informes cacheados del condominio (tras cargar pagos o facturar)"""
+    return cache_morosidad.invalidar(lambda clave: clave[0] == condominio_id)
+
+
+def _dias_vencido(corte: date, vencimiento, dialecto: str):
+    if dialecto == "sqlite":
+        return cast(func.julianday(literal(corte.isoformat())) - func.julianday(vencimiento), Integer)
+    return literal(corte, Date) - vencimiento
+
+
+def _vence_gasto(dialecto: str):
+    """Vencimiento del gasto común; si no tiene, el último día del mes facturado"""
+    if dialecto == "sqlite":
+        fin_de_mes = func.date(
+            func.printf("%04d-%02d-01", GastoComun.ano, GastoComun.mes), "+1 month", "-1 day"
+        )
+    else:
+        fin_de_mes = cast(
+            func.make_date(GastoComun.ano, GastoComun.mes, literal_column("1")) + text("interval '1 month' - interval '1 day'"),
+            Date,
+        )
+    return func.coalesce(GastoComun.vencimiento, fin_de_mes)
+
+
+def consulta_morosidad(condominio_id: int, corte: date, dialecto: str = "postgresql"):
+    """Filas del informe (en el orden de COLUMNAS), de la mayor deuda a la menor"""
+    del_condominio = Vivienda.condominio_id == condominio_id
+    vence_gasto = _vence_gasto(dialecto)
+    cargos = union_all(
+        select(
+            GastoComun.vivienda_id,
+            GastoComun.id.label("cargo_id"),
+            literal(0).label("tipo"),
+            vence_gasto.label("vence"),
+            GastoComun.monto_total.label("monto"),
+        ).join(Vivienda, Vivienda.id == GastoComun.vivienda_id)
+         .where(del_condominio, vence_gasto < corte),
+        select(
+            Multa.vivienda_id,
+            Multa.id,
+            literal(1),
+            Multa.fecha_aplicada,
+            Multa.monto,
+        ).join(Vivienda, Vivienda.id == Multa.vivienda_id)
+         .where(del_condominio, Multa.fecha_aplicada < corte),
+    ).cte("cargos")
+
+    fin_corte = datetime.combine(corte + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    pagado = select(
+        GastoComun.vivienda_id, func.sum(Pago.monto_pagado).label("total")
+    ).join(
+        GastoComun, GastoComun.id == Pago.gasto_comun_id
+    ).join(
+        Vivienda, Vivienda.id == GastoComun.vivienda_id
+    ).where(
+        del_condominio, Pago.fecha_pago < fin_corte
+    ).group_by(GastoComun.vivienda_id).cte("pagado")
+
+    # Cargos de la vivienda del más antiguo al más reciente: lo pagado cubre
+    # primero los cargos cuya suma acumulada no lo supera
+    imputados = select(
+        cargos.c.vivienda_id,
+        cargos.c.vence,
+        cargos.c.monto,
+        func.sum(cargos.c.monto).over(
+            partition_by=cargos.c.vivienda_id,
+            order_by=(cargos.c.vence, cargos.c.tipo, cargos.c.cargo_id),
+            rows=(None, 0),
+        ).label("acumulado"),
+        func.coalesce(pagado.c.total, 0).label("pagado"),
+    ).outerjoin(pagado, pagado.c.vivienda_id == cargos.c.vivienda_id).cte("imputados")
+
+    descubierto = imputados.c.acumulado - imputados.c.pagado
+    impagos = select(
+        imputados.c.vivienda_id,
+        _dias_vencido(corte, imputados.c.vence, dialecto).label("dias"),
+        case((descubierto < imputados.c.monto, descubierto), else_=imputados.c.monto).label("impago"),
+    ).where(descubierto > 0).cte("impagos")
+
+    def tramo(desde, hasta):
+        en_tramo = impagos.c.dias >= desde if hasta is None else impagos.c.dias.between(desde, hasta)
+        return func.coalesce(func.sum(impagos.c.impago).filter(en_tramo), 0)
+
+    por_vivienda = select(
+        impagos.c.vivienda_id,
+        *(tramo(desde, hasta).label(nombre) for nombre, desde, hasta in TRAMOS),
+        func.sum(impagos.c.impago).label("deuda_total"),
+        func.count().label("cargos_impagos"),
+        func.max(impagos.c.dias).label("dias_mayor_atraso"),
+    ).group_by(impagos.c.vivienda_id).cte("por_vivienda")
+
+    deuda_total = por_vivienda.c.deuda_total
+    return select(
+        por_vivienda.c.vivienda_id,
+        Vivienda.numero_vivienda,
+        *(por_vivienda.c[nombre] for nombre, _, _ in TRAMOS),
+        por_vivienda.c.deuda_total,
+        por_vivienda.c.cargos_impagos,
+        por_vivienda.c.dias_mayor_atraso,
+        func.rank().over(order_by=deuda_total.desc()).label("ranking"),
+        (deuda_total / func.sum(deuda_total).over()).label("participacion"),
+    ).join(
+        Vivienda, Vivienda.id == por_vivienda.c.vivienda_id
+    ).order_by(literal_column("ranking"), por_vivienda.c.vivienda_id)
+
+
+def _fila(fila) -> Fila:
+    return (
+        fila.vivienda_id,
+        fila.numero_vivienda,
+        *(float(fila[i]) for i in range(2, 7)),
+        int(fila.cargos_impagos),
+        int(fila.dias_mayor_atraso),
+        int(fila.ranking),
+        round(float(fila.participacion), 6),
+    )
+
+
+async def leer_morosidad(db: AsyncSession, condominio_id: int, corte: date) -> AsyncIterator[List[Fila]]:
+    """
+    Filas del informe en bloques, desde el cache o con un cursor del lado del
+    servidor (que se guarda en el cache al terminar de leerlo).
+    """
+    clave = (condominio_id, corte)
+    filas = cache_morosidad.obtener(clave)
+    if filas is not None:
+        for i in range(0, len(filas), settings.MOROSIDAD_FILAS_POR_BLOQUE):
+            yield filas[i:i + settings.MOROSIDAD_FILAS_POR_BLOQUE]
+        return
+
+    filas = []
+    resultado = await db.stream(
+        consulta_morosidad(condominio_id, corte, db.bind.dialect.name)
+        .execution_options(yield_per=settings.MOROSIDAD_FILAS_POR_BLOQUE)
+    )
+    async for bloque in resultado.partitions():
+        bloque = [_fila(fila) for fila in bloque]
+        filas.extend(bloque)
+        yield bloque
+    cache_morosidad.guardar(clave, filas)
+
+
+def a_csv(bloque: Iterable[Fila], encabezado: bool = False) -> str:
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator="\n")
+    if encabezado:
+        escritor.writerow(COLUMNAS)
+    escritor.writerows(bloque)
+    return salida.getvalue()
+
+
+def a_ndjson(bloque: Iterable[Fila]) -> str:
+    return "".join(
+        json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False, separators=(",", ":")) + "\n"
+        for fila in bloque
+    )
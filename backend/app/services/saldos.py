@@ -0,0 +1,205 @@
+"""
+Saldo por vivienda
+
+`saldos_viviendas` la mantienen los triggers de sql/010_saldos_viviendas.sql
+(cada escritura en gastos comunes, multas, reservas o pagos suma su
+diferencia) y sql/016_saldos_residentes_viviendas.sql (un residente que
+cambia de vivienda mueve sus reservas pendientes), así que leer el estado de deuda de una vivienda es una búsqueda
+por clave primaria. Este módulo la lee, recalcula los saldos desde las tablas
+de origen y, periódicamente, verifica que ambos coincidan y corrige las
+diferencias.
+"""
+import asyncio
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import GastoComun, Multa, Pago, Reserva, ResidenteVivienda, SaldoVivienda, Vivienda
+
+logger = logging.getLogger(__name__)
+
+# Columnas que suman los triggers (las demás son generadas o de control)
+COLUMNAS_SALDO = (
+    "total_gastos",
+    "total_multas",
+    "total_reservas_pendientes",
+    "total_pagado",
+    "gastos_impagos",
+    "periodo_impago_desde",
+)
+
+_CERO = Decimal("0.00")
+
+
+def _filtrar(consulta, columna, vivienda_ids: Optional[Iterable[int]]):
+    return consulta if vivienda_ids is None else consulta.where(columna.in_(vivienda_ids))
+
+
+def consulta_saldos_calculados(vivienda_ids: Optional[Iterable[int]] = None):
+    """
+    Saldos calculados desde cero (mismas reglas que los triggers), por
+    vivienda. El periodo impago más antiguo viene como ano * 100 + mes.
+    """
+    if vivienda_ids is not None:
+        vivienda_ids = list(vivienda_ids)
+    impago = GastoComun.estado != "pagado"
+    gastos = _filtrar(select(
+        GastoComun.vivienda_id,
+        func.sum(GastoComun.monto_total).label("total"),
+        func.count().filter(impago).label("impagos"),
+        func.min(GastoComun.ano * 100 + GastoComun.mes).filter(impago).label("periodo_impago"),
+    ), GastoComun.vivienda_id, vivienda_ids).group_by(GastoComun.vivienda_id).subquery()
+
+    multas = _filtrar(select(
+        Multa.vivienda_id, func.sum(Multa.monto).label("total")
+    ), Multa.vivienda_id, vivienda_ids).group_by(Multa.vivienda_id).subquery()
+
+    # Las reservas se cargan a la vivienda de menor id del usuario
+    titulares = select(
+        ResidenteVivienda.usuario_id, func.min(ResidenteVivienda.vivienda_id).label("vivienda_id")
+    ).group_by(ResidenteVivienda.usuario_id).subquery()
+    reservas = _filtrar(select(
+        titulares.c.vivienda_id, func.sum(Reserva.monto_pago).label("total")
+    ).join(
+        titulares, titulares.c.usuario_id == Reserva.usuario_id
+    ).where(
+        Reserva.estado_pago == "pendiente"
+    ), titulares.c.vivienda_id, vivienda_ids).group_by(titulares.c.vivienda_id).subquery()
+
+    pagos = _filtrar(select(
+        GastoComun.vivienda_id, func.sum(Pago.monto_pagado).label("total")
+    ).join(
+        GastoComun, GastoComun.id == Pago.gasto_comun_id
+    ), GastoComun.vivienda_id, vivienda_ids).group_by(GastoComun.vivienda_id).subquery()
+
+    cero = literal(0)
+    return _filtrar(select(
+        Vivienda.id.label("vivienda_id"),
+        func.coalesce(gastos.c.total, cero).label("total_gastos"),
+        func.coalesce(multas.c.total, cero).label("total_multas"),
+        func.coalesce(reservas.c.total, cero).label("total_reservas_pendientes"),
+        func.coalesce(pagos.c.total, cero).label("total_pagado"),
+        func.coalesce(gastos.c.impagos, cero).label("gastos_impagos"),
+        gastos.c.periodo_impago,
+    ).outerjoin(gastos, gastos.c.vivienda_id == Vivienda.id)
+     .outerjoin(multas, multas.c.vivienda_id == Vivienda.id)
+     .outerjoin(reservas, reservas.c.vivienda_id == Vivienda.id)
+     .outerjoin(pagos, pagos.c.vivienda_id == Vivienda.id),
+        Vivienda.id, vivienda_ids)
+
+
+def _saldo_calculado(fila) -> Dict:
+    periodo = fila.periodo_impago
+    return {
+        "vivienda_id": fila.vivienda_id,
+        "total_gastos": Decimal(fila.total_gastos).quantize(_CERO),
+        "total_multas": Decimal(fila.total_multas).quantize(_CERO),
+        "total_reservas_pendientes": Decimal(fila.total_reservas_pendientes).quantize(_CERO),
+        "total_pagado": Decimal(fila.total_pagado).quantize(_CERO),
+        "gastos_impagos": int(fila.gastos_impagos),
+        "periodo_impago_desde": date(periodo // 100, periodo % 100, 1) if periodo is not None else None,
+    }
+
+
+async def calcular_saldos(db: AsyncSession, vivienda_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict]:
+    """Saldos recalculados desde las tablas de origen, por vivienda_id"""
+    filas = (await db.execute(consulta_saldos_calculados(vivienda_ids))).all()
+    return {fila.vivienda_id: _saldo_calculado(fila) for fila in filas}
+
+
+def serializar_saldo(saldo: Dict) -> Dict:
+    """Saldo como JSON de la API (montos en float, fechas ISO)"""
+    total_adeudado = saldo["total_gastos"] + saldo["total_multas"] + saldo["total_reservas_pendientes"]
+    deuda = total_adeudado - saldo["total_pagado"]
+    periodo = saldo["periodo_impago_desde"]
+    actualizado = saldo.get("updated_at")
+    return {
+        "vivienda_id": saldo["vivienda_id"],
+        "total_gastos": float(saldo["total_gastos"]),
+        "total_multas": float(saldo["total_multas"]),
+        "total_reservas_pendientes": float(saldo["total_reservas_pendientes"]),
+        "total_adeudado": float(total_adeudado),
+        "total_pagado": float(saldo["total_pagado"]),
+        "saldo": float(deuda),
+        "al_dia": deuda <= 0,
+        "gastos_impagos": saldo["gastos_impagos"],
+        "periodo_impago_desde": periodo.isoformat() if periodo is not None else None,
+        "actualizado": actualizado.isoformat() if actualizado is not None else None,
+    }
+
+
+async def obtener_saldos(db: AsyncSession, vivienda_ids: List[int]) -> Dict[int, Dict]:
+    """
+    Saldos de las viviendas desde saldos_viviendas. Las viviendas sin fila
+    (sin movimientos desde la migración, o un motor sin los triggers) se
+    calculan en el momento.
+    """
+    if not vivienda_ids:
+        return {}
+    filas = (await db.execute(
+        select(SaldoVivienda.vivienda_id, SaldoVivienda.updated_at, *(getattr(SaldoVivienda, c) for c in COLUMNAS_SALDO))
+        .where(SaldoVivienda.vivienda_id.in_(vivienda_ids))
+    )).mappings().all()
+    saldos = {fila["vivienda_id"]: dict(fila) for fila in filas}
+    faltantes = [v for v in vivienda_ids if v not in saldos]
+    if faltantes:
+        saldos.update(await calcular_saldos(db, faltantes))
+    return saldos
+
+
+async def verificar_saldos(db: AsyncSession, corregir: bool = True) -> int:
+    """
+    Compara saldos_viviendas con el cálculo desde cero y, con `corregir`,
+    reemplaza las filas distintas. Retorna cuántas viviendas diferían.
+
+    Ambas lecturas se hacen en la misma instantánea (REPEATABLE READ): si una
+    escritura concurrente toca un saldo que se está corrigiendo, la
+    corrección falla por serialización y se reintenta en la próxima pasada.
+    """
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    calculados = await calcular_saldos(db)
+    guardados = {
+        fila["vivienda_id"]: fila
+        for fila in (await db.execute(
+            select(SaldoVivienda.vivienda_id, *(getattr(SaldoVivienda, c) for c in COLUMNAS_SALDO))
+        )).mappings()
+    }
+
+    distintos = []
+    for vivienda_id, calculado in calculados.items():
+        guardado = guardados.get(vivienda_id)
+        if guardado is None or any(guardado[c] != calculado[c] for c in COLUMNAS_SALDO):
+            distintos.append(calculado)
+            logger.warning(
+                "Saldo de la vivienda %s no coincide con el cálculo", vivienda_id,
+                extra={"guardado": dict(guardado) if guardado is not None else None, "calculado": calculado},
+            )
+
+    if distintos and corregir:
+        consulta = pg_insert(SaldoVivienda).values(distintos)
+        await db.execute(consulta.on_conflict_do_update(
+            index_elements=[SaldoVivienda.vivienda_id],
+            set_={**{c: consulta.excluded[c] for c in COLUMNAS_SALDO}, "updated_at": func.now()},
+        ))
+    await db.commit()
+    return len(distintos)
+
+
+async def verificar_periodicamente(session_factory: Callable[[], AsyncSession], intervalo_segundos: float) -> None:
+    """Tarea de fondo: verifica y corrige los saldos cada `intervalo_segundos`"""
+    while True:
+        try:
+            async with session_factory() as db:
+                distintos = await verificar_saldos(db)
+            if distintos:
+                logger.warning("Verificación de saldos: %s viviendas corregidas", distintos)
+            else:
+                logger.info("Verificación de saldos: sin diferencias")
+        except Exception:
+            logger.exception("Error en la verificación de saldos")
+        await asyncio.sleep(intervalo_segundos)
@@ -0,0 +1,169 @@
+"""
+Valor de la UF (Unidad de Fomento) desde la API de la CMF
+
+La UF se consulta a la CMF a lo más una vez al día por proceso: el valor del
+día queda en memoria y en la tabla `valores_uf`, que sirve también de
+respaldo si la CMF no responde (se usa el último valor guardado). Si no hay
+respaldo, la falla también queda en memoria y se responde sin volver a
+consultar a la CMF hasta que pase el plazo de reintento.
+"""
+import asyncio
+import json
+import logging
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import ValorUF
+
+logger = logging.getLogger(__name__)
+
+# Tras una falla de la CMF, segundos antes de volver a intentar
+_REINTENTO_SEGUNDOS = 300
+
+
+class UFNoDisponible(Exception):
+    """La CMF no respondió y no hay ningún valor guardado"""
+
+
+@dataclass(frozen=True)
+class ValorUFDia:
+    fecha: date     # Fecha del valor según la CMF
+    valor: Decimal  # Pesos por UF
+    fuente: str     # cmf | base_datos | respaldo
+
+    def a_pesos(self, monto_uf) -> Decimal:
+        """Monto en UF convertido a pesos (redondeado al peso, como round() de PostgreSQL)"""
+        return (Decimal(monto_uf) * self.valor).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+
+
+def parsear_valor_cmf(texto: str) -> Decimal:
+    """Formato chileno de la CMF: "39.485,65" -> Decimal("39485.65")"""
+    try:
+        return Decimal(texto.replace(".", "").replace(",", "."))
+    except (AttributeError, InvalidOperation):
+        raise ValueError(f"Valor de UF no válido: {texto!r}")
+
+
+def consultar_cmf() -> Tuple[date, Decimal]:
+    """Valor del día desde la CMF (bloqueante; usar en un hilo)"""
+    if not settings.CMF_API_KEY:
+        raise ValueError("CMF_API_KEY no está configurada")
+    partes = urllib.parse.urlsplit(settings.CMF_API_URL)
+    consulta = urllib.parse.urlencode({"apikey": settings.CMF_API_KEY, "formato": "json"})
+    url = urllib.parse.urlunsplit(partes._replace(query=f"{partes.query}&{consulta}" if partes.query else consulta))
+    solicitud = urllib.request.Request(url, headers={"Accept": "application/json"})
+    with urllib.request.urlopen(solicitud, timeout=settings.CMF_TIMEOUT_SEGUNDOS) as respuesta:
+        datos = json.load(respuesta)
+    # {"UFs": [{"Valor": "39.485,65", "Fecha": "2025-11-03"}]}
+    try:
+        item = datos["UFs"][0]
+        return date.fromisoformat(item["Fecha"]), parsear_valor_cmf(item["Valor"])
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"Respuesta de la CMF inesperada: {e}")
+
+
+class ServicioUF:
+    """
+    Valor de la UF del día con cache en memoria y en base de datos.
+
+    Las solicitudes concurrentes sin valor en memoria esperan una sola
+    consulta (a la base de datos y, si falta, a la CMF). El valor obtenido de
+    la CMF se guarda con `session_factory`, en una sesión propia.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._actual: Optional[ValorUFDia] = None
+        self._dia_consulta: Optional[date] = None
+        self._reintentar_desde = 0.0
+        self._error: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    def _vigente(self) -> Optional[ValorUFDia]:
+        if self._actual is None:
+            if time.monotonic() < self._reintentar_desde:
+                # Falló hace poco y no hay respaldo: no se vuelve a consultar
+                raise UFNoDisponible(self._error)
+            return None
+        if self._dia_consulta == date.today() or time.monotonic() < self._reintentar_desde:
+            return self._actual
+        return None
+
+    def _recordar(self, valor: ValorUFDia, reintentar: bool = False) -> ValorUFDia:
+        self._actual = valor
+        self._dia_consulta = None if reintentar else date.today()
+        self._reintentar_desde = time.monotonic() + _REINTENTO_SEGUNDOS if reintentar else 0.0
+        return valor
+
+    async def obtener(self, db: AsyncSession) -> ValorUFDia:
+        """
+        Valor de la UF de hoy.
+
+        Raises:
+            UFNoDisponible: si la CMF falla y no hay valores guardados
+        """
+        valor = self._vigente()
+        if valor is not None:
+            return valor
+        async with self._lock:
+            valor = self._vigente()
+            if valor is not None:
+                return valor
+
+            hoy = date.today()
+            guardado = (await db.execute(
+                select(ValorUF.fecha, ValorUF.valor).order_by(ValorUF.fecha.desc()).limit(1)
+            )).first()
+            if guardado is not None and guardado.fecha >= hoy:
+                return self._recordar(ValorUFDia(guardado.fecha, guardado.valor, "base_datos"))
+
+            try:
+                fecha, monto = await asyncio.to_thread(consultar_cmf)
+            except Exception as e:
+                if guardado is None:
+                    self._error = f"No se pudo obtener la UF de la CMF: {e}"
+                    self._reintentar_desde = time.monotonic() + _REINTENTO_SEGUNDOS
+                    raise UFNoDisponible(self._error) from e
+                logger.warning("CMF no disponible, se usa la UF del %s: %s", guardado.fecha, e)
+                return self._recordar(ValorUFDia(guardado.fecha, guardado.valor, "respaldo"), reintentar=True)
+
+            await self._guardar(fecha, monto)
+            logger.info("UF del %s obtenida de la CMF: %s", fecha, monto)
+            return self._recordar(ValorUFDia(fecha, monto, "cmf"))
+
+    async def _guardar(self, fecha: date, monto: Decimal) -> None:
+        """
+        Guarda el valor en su propia sesión (la del request puede estar a mitad
+        de su transacción). Si otro proceso lo guardó primero no hace nada.
+        """
+        try:
+            async with self._session_factory() as db:
+                insert = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+                await db.execute(
+                    insert(ValorUF).values(fecha=fecha, valor=monto)
+                    .on_conflict_do_nothing(index_elements=["fecha"])
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning("No se pudo guardar la UF del %s: %s", fecha, e)
+
+    def limpiar(self) -> None:
+        self._actual = None
+        self._dia_consulta = None
+        self._reintentar_desde = 0.0
+        self._error = None
+
+
+servicio_uf = ServicioUF()
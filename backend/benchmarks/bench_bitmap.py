@@ -0,0 +1,70 @@
+"""
+Micro-benchmark del formato bitmap de disponibilidad
+
+Compara, para el mismo rango y los mismos eventos, armar y serializar la
+respuesta json (slots -> SlotDisponible -> DisponibilidadResponse) contra
+los mapas de ocupación de 48 bits por día.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_bitmap --eventos 500 --dias 90
+"""
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.schemas.reservas import DisponibilidadResponse, SlotDisponible
+from app.services.disponibilidad import IndiceIntervalos, dias_en_rango, mapas_ocupacion
+from app.services.google_calendar_service import GoogleCalendarManager
+from benchmarks.bench_calendario import generar_eventos, medir
+
+
+def respuesta_json(manager, inicio, fin, indice):
+    slots = manager._calcular_slots_disponibles(inicio, fin, indice, 60)
+    return DisponibilidadResponse(
+        espacio="quincho",
+        fecha_inicio=inicio,
+        fecha_fin=fin,
+        slots=[SlotDisponible(inicio=s["inicio"], fin=s["fin"], disponible=s["disponible"]) for s in slots],
+    ).model_dump_json().encode()
+
+
+def respuesta_bitmap(inicio, fin, indice):
+    dias = dias_en_rango(inicio, fin)
+    return json.dumps({
+        "espacio": "quincho",
+        "fecha_inicio": dias[0].isoformat(),
+        "fecha_fin": dias[-1].isoformat(),
+        "resolucion_minutos": 30,
+        "hora_apertura": GoogleCalendarManager.HORA_APERTURA,
+        "hora_cierre": GoogleCalendarManager.HORA_CIERRE,
+        "ocupacion": mapas_ocupacion(dias, indice),
+    }, separators=(",", ":")).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eventos", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    inicio = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    fin = (inicio + timedelta(days=args.dias - 1)).replace(hour=23, minute=59, second=59)
+    indice = IndiceIntervalos.desde_eventos_google(generar_eventos(inicio, args.dias, args.eventos))
+
+    # Solo se necesita el cálculo de slots, no la conexión a Google
+    manager = GoogleCalendarManager.__new__(GoogleCalendarManager)
+
+    t_json = medir(respuesta_json, manager, inicio, fin, indice, repeticiones=args.repeticiones)
+    t_bitmap = medir(respuesta_bitmap, inicio, fin, indice, repeticiones=args.repeticiones)
+    bytes_json = len(respuesta_json(manager, inicio, fin, indice))
+    bytes_bitmap = len(respuesta_bitmap(inicio, fin, indice))
+
+    print(f"dias={args.dias} eventos={args.eventos}")
+    print(f"json:   {t_json * 1000:9.2f} ms  {bytes_json:9d} bytes")
+    print(f"bitmap: {t_bitmap * 1000:9.2f} ms  {bytes_bitmap:9d} bytes")
+    print(f"speedup: {t_json / t_bitmap:.1f}x  tamaño: {bytes_json / bytes_bitmap:.1f}x menor")
+
+
+if __name__ == "__main__":
+    main()
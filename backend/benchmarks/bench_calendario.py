@@ -0,0 +1,92 @@
+"""
+Micro-benchmark del cálculo de slots de GoogleCalendarManager
+
+Compara el chequeo original (re-parsear cada evento por cada slot candidato)
+contra el índice pre-parseado con búsqueda binaria.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_calendario --eventos 500 --dias 90
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.google_calendar_service import GoogleCalendarManager
+
+
+def generar_eventos(inicio: datetime, dias: int, cantidad: int, semilla: int = 7):
+    rnd = random.Random(semilla)
+    eventos = []
+    for _ in range(cantidad):
+        e_inicio = inicio + timedelta(days=rnd.randrange(dias), hours=rnd.randint(8, 19))
+        e_fin = e_inicio + timedelta(minutes=30 * rnd.randint(1, 6))
+        eventos.append({
+            "start": {"dateTime": e_inicio.isoformat()},
+            "end": {"dateTime": e_fin.isoformat()},
+        })
+    return eventos
+
+
+def slots_legacy(fecha_inicio, fecha_fin, eventos, duracion_minutos):
+    """Cálculo original: cada slot recorre y re-parsea todos los eventos"""
+    def hay_conflicto(inicio, fin):
+        for evento in eventos:
+            evento_inicio = datetime.fromisoformat(evento['start'].get('dateTime', evento['start'].get('date')))
+            evento_fin = datetime.fromisoformat(evento['end'].get('dateTime', evento['end'].get('date')))
+            if not (fin <= evento_inicio or inicio >= evento_fin):
+                return True
+        return False
+
+    disponibilidad = []
+    duracion = timedelta(minutes=duracion_minutos)
+    current = fecha_inicio.replace(hour=8, minute=0, second=0)
+    while current < fecha_fin:
+        slot_fin = current + duracion
+        if slot_fin.hour > 20:
+            # El original usaba replace(day=day + 1), que falla a fin de mes
+            current = (current + timedelta(days=1)).replace(hour=8, minute=0)
+            continue
+        if not hay_conflicto(current, slot_fin):
+            disponibilidad.append({"inicio": current.isoformat(), "fin": slot_fin.isoformat(), "disponible": True})
+        current += timedelta(minutes=30)
+    return disponibilidad
+
+
+def medir(funcion, *args, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eventos", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    inicio = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    fin = (inicio + timedelta(days=args.dias - 1)).replace(hour=23, minute=59, second=59)
+    eventos = generar_eventos(inicio, args.dias, args.eventos)
+
+    # Solo se necesita el cálculo de slots, no la conexión a Google
+    manager = GoogleCalendarManager.__new__(GoogleCalendarManager)
+
+    t_legacy = medir(slots_legacy, inicio, fin, eventos, 60, repeticiones=args.repeticiones)
+    t_indice = medir(manager._calcular_slots_disponibles, inicio, fin, eventos, 60, repeticiones=args.repeticiones)
+
+    if slots_legacy(inicio, fin, eventos, 60) != manager._calcular_slots_disponibles(inicio, fin, eventos, 60):
+        raise SystemExit("ERROR: los resultados difieren entre implementaciones")
+
+    print(f"dias={args.dias} eventos={len(eventos)}")
+    print(f"legacy: {t_legacy * 1000:9.2f} ms")
+    print(f"indice: {t_indice * 1000:9.2f} ms")
+    print(f"speedup: {t_legacy / t_indice:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
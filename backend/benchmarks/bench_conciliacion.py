@@ -0,0 +1,144 @@
+"""
+Benchmark de la conciliación de cartolas bancarias
+
+Siembra un condominio, arma una cartola CSV con un abono por gasto común
+abierto (más un 5% de abonos sin coincidencia) y compara una conciliación
+fila a fila con el ORM (buscar el gasto, verificar la referencia, agregar
+el pago y marcar el gasto) contra conciliar_cartola (índice en memoria,
+INSERT y UPDATE por lote). También mide volver a cargar la misma cartola.
+
+La versión ORM procesa solo las primeras --lineas-orm líneas; la comparación
+es en líneas por segundo. Entre ambas se vuelve a sembrar la base.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_conciliacion --db-url postgresql+psycopg://u:p@localhost/bench --reiniciar --viviendas 20000
+    python -m benchmarks.bench_conciliacion --db-url sqlite:////tmp/bench.sqlite --viviendas 20000 --lineas 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import func, select
+
+from app.models.models import GastoComun, Pago, ResidenteVivienda
+from app.services.conciliacion import conciliar_cartola
+from benchmarks.entorno import crear_engines, sembrar
+
+
+def armar_cartola(engine, lineas: int, semilla: int = 3):
+    """Líneas CSV (con encabezado): abonos de gastos abiertos y algunos sin coincidencia"""
+    rnd = random.Random(semilla)
+    with engine.connect() as conn:
+        abiertos = conn.execute(
+            select(GastoComun.vivienda_id, GastoComun.ano, GastoComun.mes, GastoComun.monto_total)
+            .where(GastoComun.estado != "pagado").order_by(GastoComun.id).limit(lineas)
+        ).all()
+    cartola = ["referencia,fecha,vivienda_id,periodo,monto"]
+    for i, g in enumerate(abiertos):
+        monto = int(g.monto_total) + (1 if rnd.random() < 0.05 else 0)
+        cartola.append(f"TX-{i:08d},2025-12-01,{g.vivienda_id},{g.ano}-{g.mes:02d},{monto}")
+    return cartola
+
+
+async def _lineas(cartola):
+    for linea in cartola:
+        yield linea
+
+
+async def conciliar_orm(db, condominio_id, cartola):
+    """Conciliación fila a fila (referencia para comparar)"""
+    conciliados = 0
+    for linea in cartola[1:]:
+        referencia, fecha, vivienda_id, periodo, monto = linea.split(",")
+        ano, mes = map(int, periodo.split("-"))
+        existe = (await db.execute(select(Pago.id).where(Pago.referencia == referencia))).scalar()
+        if existe is not None:
+            continue
+        gasto = (await db.execute(
+            select(GastoComun).where(
+                GastoComun.vivienda_id == int(vivienda_id), GastoComun.ano == ano, GastoComun.mes == mes,
+                GastoComun.monto_total == Decimal(monto), GastoComun.estado != "pagado",
+            ).limit(1)
+        )).scalar()
+        if gasto is None:
+            continue
+        usuario_id = (await db.execute(
+            select(func.min(ResidenteVivienda.usuario_id)).where(ResidenteVivienda.vivienda_id == gasto.vivienda_id)
+        )).scalar()
+        db.add(Pago(
+            gasto_comun_id=gasto.id, usuario_id=usuario_id, monto_pagado=Decimal(monto),
+            fecha_pago=datetime.fromisoformat(fecha), metodo_pago="transferencia", referencia=referencia,
+        ))
+        gasto.estado = "pagado"
+        await db.flush()
+        conciliados += 1
+    await db.commit()
+    return {"conciliados": conciliados}
+
+
+async def medir(session_factory, funcion, *args, **kwargs):
+    async with session_factory() as db:
+        t0 = time.perf_counter()
+        resultado = await funcion(db, *args, **kwargs)
+        return time.perf_counter() - t0, resultado
+
+
+async def correr_orm(args, async_engine, session_factory, cartola):
+    resultado = await medir(session_factory, conciliar_orm, 1, cartola[:args.lineas_orm + 1])
+    await async_engine.dispose()
+    return resultado
+
+
+async def correr_lotes(args, async_engine, session_factory, cartola):
+    t_lotes, r_lotes = await medir(session_factory, conciliar_cartola, 1, _lineas(cartola), lote=args.lote)
+    t_repetida, r_repetida = await medir(session_factory, conciliar_cartola, 1, _lineas(cartola), lote=args.lote)
+    await async_engine.dispose()
+    return (t_lotes, r_lotes), (t_repetida, r_repetida)
+
+
+def _sin_errores(resumen):
+    return {k: v for k, v in resumen.items() if k != "errores"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", required=True, help="URL SQLAlchemy de una base de pruebas (postgresql+psycopg:// o sqlite:///)")
+    parser.add_argument("--reiniciar", action="store_true", help="Vaciar las tablas antes de sembrar (solo PostgreSQL)")
+    parser.add_argument("--viviendas", type=int, default=20000)
+    parser.add_argument("--lineas", type=int, default=100000)
+    parser.add_argument("--lineas-orm", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine, async_engine, session_factory = crear_engines(args.db_url)
+    sembrar(engine, args.viviendas, reiniciar=args.reiniciar)
+    cartola = armar_cartola(engine, args.lineas)
+    print(f"cartola: {len(cartola) - 1} líneas", file=sys.stderr)
+
+    t_orm, r_orm = asyncio.run(correr_orm(args, async_engine, session_factory, cartola))
+
+    engine, async_engine, session_factory = crear_engines(args.db_url)
+    sembrar(engine, args.viviendas, reiniciar=True)
+    (t_lotes, r_lotes), (t_repetida, r_repetida) = asyncio.run(
+        correr_lotes(args, async_engine, session_factory, cartola)
+    )
+
+    lineas_orm = min(args.lineas_orm, len(cartola) - 1)
+    print(f"motor={async_engine.dialect.name} viviendas={args.viviendas} lote={args.lote}")
+    print(f"orm fila a fila: {t_orm:8.2f} s  {lineas_orm / t_orm:10.0f} líneas/s  {r_orm}")
+    print(f"por lotes:       {t_lotes:8.2f} s  {(len(cartola) - 1) / t_lotes:10.0f} líneas/s  {_sin_errores(r_lotes)}")
+    print(f"repetida:        {t_repetida:8.2f} s  {_sin_errores(r_repetida)}")
+    print(f"memoria máxima del proceso: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+    print(f"speedup: {(len(cartola) - 1) / t_lotes / (lineas_orm / t_orm):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
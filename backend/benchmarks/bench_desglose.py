@@ -0,0 +1,164 @@
+"""
+Benchmark del desglose de pagos de un residente con años de historia
+
+Siembra el condominio sintético y le agrega a un residente varias viviendas
+con gastos comunes mensuales, multas y reservas de varios años. Compara la
+versión anterior de desglose_residente (cinco consultas ORM + conversión
+objeto a objeto + serialización por FastAPI) contra la actual (una consulta
+con json_agg en PostgreSQL; consultas de solo columnas en otros motores),
+pidiendo toda la historia y la vista paginada por defecto.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_desglose --db-url postgresql+psycopg://u:p@localhost/bench --reiniciar --anos 20
+    python -m benchmarks.bench_desglose --db-url sqlite:////tmp/bench.sqlite --anos 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date, timedelta
+from typing import Any
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select, text
+
+from app.api.v1.routes.pagos import desglose_residente
+from app.models.models import GastoComun, Multa, Reserva, ResidenteVivienda, Vivienda
+from benchmarks.entorno import INICIO_DATOS, crear_engines, es_sqlite, sembrar
+
+
+async def desglose_orm(usuario_id: int, db) -> bytes:
+    """Implementación anterior del endpoint (referencia para comparar)"""
+    rv_list: list[Any] = (await db.execute(
+        select(ResidenteVivienda).where(ResidenteVivienda.usuario_id == usuario_id)
+    )).scalars().all()
+    viv_ids = [int(rv.vivienda_id) for rv in rv_list]
+    vivienda: Any = (await db.execute(
+        select(Vivienda).where(Vivienda.id.in_(viv_ids)).order_by(Vivienda.id.asc()).limit(1)
+    )).scalars().first()
+    gastos = (await db.execute(select(GastoComun).where(GastoComun.vivienda_id.in_(viv_ids)))).scalars().all()
+    multas = (await db.execute(select(Multa).where(Multa.vivienda_id.in_(viv_ids)))).scalars().all()
+    reservas = (await db.execute(select(Reserva).where(Reserva.usuario_id == usuario_id))).scalars().all()
+    contenido = {
+        "viviendas": viv_ids,
+        "cargo_fijo_uf": float(vivienda.cargo_fijo_uf or 0),
+        "gastos_comunes": [
+            {"id": int(g.id), "vivienda_id": int(g.vivienda_id), "mes": int(g.mes), "ano": int(g.ano),
+             "monto_total": float(g.monto_total), "estado": str(g.estado),
+             "vencimiento": g.vencimiento.isoformat() if g.vencimiento else None}
+            for g in gastos
+        ],
+        "multas": [
+            {"id": int(m.id), "vivienda_id": int(m.vivienda_id), "monto": float(m.monto),
+             "descripcion": str(m.descripcion), "fecha_aplicada": m.fecha_aplicada.isoformat()}
+            for m in multas
+        ],
+        "reservas": [
+            {"id": int(r.id), "monto_pago": float(r.monto_pago), "estado_pago": str(r.estado_pago),
+             "inicio": r.fecha_hora_inicio.isoformat(), "fin": r.fecha_hora_fin.isoformat()}
+            for r in reservas
+        ],
+    }
+    # Lo que hacía FastAPI con el dict retornado
+    return json.dumps(jsonable_encoder(contenido)).encode()
+
+
+def agregar_historia(engine, usuario_id: int, viviendas: int, anos: int, reservas_por_mes: int) -> dict:
+    """
+    Le asigna al usuario `viviendas` viviendas del sembrado (la propia y las
+    siguientes) y agrega gastos comunes, multas y reservas de los `anos`
+    anteriores a los datos sembrados.
+    """
+    ids = list(range(usuario_id, usuario_id + viviendas))
+    primer_ano = INICIO_DATOS.year - anos
+    gastos, multas, reservas = [], [], []
+    for v in ids:
+        for ano in range(primer_ano, INICIO_DATOS.year):
+            for mes in range(1, 13):
+                gastos.append({
+                    "vivienda_id": v, "mes": mes, "ano": ano, "monto_total": 120000 + mes * 1000,
+                    "estado": "pagado", "vencimiento": date(ano, mes, 28),
+                })
+                if mes % 4 == 0:
+                    multas.append({
+                        "vivienda_id": v, "monto": 15000, "descripcion": "Multa histórica",
+                        "fecha_aplicada": date(ano, mes, 10),
+                    })
+    # Reservas en el espacio 1, antes de los datos sembrados: sin solapes
+    inicio = INICIO_DATOS.replace(year=primer_ano)
+    for n in range(anos * 12 * reservas_por_mes):
+        desde = inicio + timedelta(hours=3 * n)
+        reservas.append({
+            "espacio_comun_id": 1, "usuario_id": usuario_id, "fecha_hora_inicio": desde,
+            "fecha_hora_fin": desde + timedelta(hours=2), "monto_pago": 20000, "estado_pago": "pagado",
+        })
+
+    with engine.begin() as conn:
+        conn.execute(insert(ResidenteVivienda), [{"usuario_id": usuario_id, "vivienda_id": v} for v in ids[1:]])
+        for tabla, filas in ((GastoComun, gastos), (Multa, multas), (Reserva, reservas)):
+            if filas:
+                conn.execute(insert(tabla), filas)
+        if not es_sqlite(str(engine.url)):
+            conn.execute(text("ANALYZE"))
+    return {"viviendas": len(ids), "gastos_comunes": len(gastos), "multas": len(multas), "reservas": len(reservas)}
+
+
+async def medir(funcion, usuario_id, session_factory, repeticiones, **parametros):
+    mejor, tamano = float("inf"), 0
+    for _ in range(repeticiones):
+        async with session_factory() as db:
+            t0 = time.perf_counter()
+            cuerpo = await funcion(usuario_id, db=db, **parametros)
+            if not isinstance(cuerpo, bytes):
+                cuerpo = cuerpo.body
+            mejor = min(mejor, time.perf_counter() - t0)
+            tamano = len(cuerpo)
+    return mejor, tamano
+
+
+async def correr(args, async_engine, session_factory):
+    t_orm, bytes_orm = await medir(desglose_orm, args.usuario, session_factory, args.repeticiones)
+    # Historia completa (mismo contenido que la versión anterior) y la vista
+    # por defecto: últimos meses, primera página de cada sección
+    t_nuevo, bytes_nuevo = await medir(
+        desglose_residente, args.usuario, session_factory, args.repeticiones, desde="2000-01", limite=10 ** 6
+    )
+    t_pagina, bytes_pagina = await medir(
+        desglose_residente, args.usuario, session_factory, args.repeticiones, limite=50
+    )
+    await async_engine.dispose()
+    return (t_orm, bytes_orm), (t_nuevo, bytes_nuevo), (t_pagina, bytes_pagina)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", required=True, help="URL SQLAlchemy de una base de pruebas (postgresql+psycopg:// o sqlite:///)")
+    parser.add_argument("--reiniciar", action="store_true", help="Vaciar las tablas antes de sembrar (solo PostgreSQL)")
+    parser.add_argument("--viviendas-condominio", type=int, default=200)
+    parser.add_argument("--usuario", type=int, default=1)
+    parser.add_argument("--viviendas", type=int, default=3, help="Viviendas del residente medido")
+    parser.add_argument("--anos", type=int, default=20, help="Años de historia del residente")
+    parser.add_argument("--reservas-por-mes", type=int, default=4)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    engine, async_engine, session_factory = crear_engines(args.db_url)
+    sembrar(engine, max(args.viviendas_condominio, args.usuario + args.viviendas), reiniciar=args.reiniciar)
+    historia = agregar_historia(engine, args.usuario, args.viviendas, args.anos, args.reservas_por_mes)
+
+    (t_orm, bytes_orm), (t_nuevo, bytes_nuevo), (t_pagina, bytes_pagina) = asyncio.run(
+        correr(args, async_engine, session_factory)
+    )
+
+    print(f"motor={async_engine.dialect.name} historia={historia}")
+    print(f"orm:    {t_orm * 1000:9.2f} ms  {bytes_orm:9d} bytes")
+    print(f"actual: {t_nuevo * 1000:9.2f} ms  {bytes_nuevo:9d} bytes")
+    print(f"página: {t_pagina * 1000:9.2f} ms  {bytes_pagina:9d} bytes  (vista por defecto)")
+    print(f"speedup: {t_orm / t_nuevo:.1f}x  (página por defecto: {t_orm / t_pagina:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark del motor de disponibilidad
+
+Compara el marcado de slots ocupados con el doble ciclo original
+(slots x reservas, re-parseando cada slot) contra el barrido de
+app.services.disponibilidad.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_disponibilidad --reservas 10000 --dias 30
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.services.disponibilidad import marcar_slots_ocupados
+
+
+def generar_slots(inicio: datetime, dias: int, duracion_minutos: int = 60):
+    """Slots cada 30 minutos entre 8:00 y 20:00, como en Google Calendar"""
+    slots = []
+    for d in range(dias):
+        dia = inicio + timedelta(days=d)
+        current = dia.replace(hour=8, minute=0)
+        while current + timedelta(minutes=duracion_minutos) <= dia.replace(hour=20, minute=0):
+            fin = current + timedelta(minutes=duracion_minutos)
+            slots.append({"inicio": current.isoformat(), "fin": fin.isoformat(), "disponible": True})
+            current += timedelta(minutes=30)
+    return slots
+
+
+def generar_reservas(inicio: datetime, dias: int, cantidad: int, semilla: int = 42):
+    rnd = random.Random(semilla)
+    reservas = []
+    for _ in range(cantidad):
+        r_inicio = inicio + timedelta(minutes=30 * rnd.randrange(dias * 48))
+        reservas.append((r_inicio, r_inicio + timedelta(minutes=30 * rnd.randint(1, 8))))
+    return reservas
+
+
+def marcar_legacy(slots, reservas):
+    """Implementación original de obtener_disponibilidad (O(n * m))"""
+    for slot in slots:
+        slot_inicio = datetime.fromisoformat(slot["inicio"])
+        slot_fin = datetime.fromisoformat(slot["fin"])
+        if slot_inicio.tzinfo is not None:
+            slot_inicio = slot_inicio.replace(tzinfo=None)
+        if slot_fin.tzinfo is not None:
+            slot_fin = slot_fin.replace(tzinfo=None)
+        tiene_conflicto = False
+        for res_inicio, res_fin in reservas:
+            if not (slot_fin <= res_inicio or slot_inicio >= res_fin):
+                tiene_conflicto = True
+                break
+        slot["disponible"] = not tiene_conflicto
+    return slots
+
+
+def medir(funcion, *args, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservas", type=int, default=10000)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    inicio = datetime(2025, 1, 1)
+    # Historial de un espacio concurrido: las reservas cubren un rango 12 veces
+    # mayor que la ventana consultada, por lo que la mayoría de los slots quedan libres
+    reservas = generar_reservas(inicio - timedelta(days=args.dias * 6), args.dias * 12, args.reservas)
+
+    slots_legacy = generar_slots(inicio, args.dias)
+    slots_motor = generar_slots(inicio, args.dias)
+
+    t_legacy = medir(marcar_legacy, slots_legacy, reservas, repeticiones=args.repeticiones)
+    t_motor = medir(marcar_slots_ocupados, slots_motor, reservas, repeticiones=args.repeticiones)
+
+    if [s["disponible"] for s in slots_legacy] != [s["disponible"] for s in slots_motor]:
+        raise SystemExit("ERROR: los resultados difieren entre implementaciones")
+
+    print(f"slots={len(slots_motor)} reservas={len(reservas)}")
+    print(f"legacy: {t_legacy * 1000:9.2f} ms")
+    print(f"motor:  {t_motor * 1000:9.2f} ms")
+    print(f"speedup: {t_legacy / t_motor:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark de la facturación mensual de gastos comunes
+
+Siembra un condominio con N viviendas y compara, para meses distintos, una
+facturación fila a fila con el ORM (consultar si existe el gasto y agregarlo)
+contra facturar_mes (INSERT ... SELECT por lotes con ON CONFLICT DO NOTHING).
+También mide volver a ejecutar facturar_mes sobre un mes ya facturado.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_facturacion --db-url postgresql+psycopg://u:p@localhost/bench --reiniciar --viviendas 20000
+    python -m benchmarks.bench_facturacion --db-url sqlite:////tmp/bench.sqlite --viviendas 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from decimal import Decimal
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import select
+
+from app.models.models import GastoComun, Vivienda
+from app.services.facturacion import facturar_mes, vencimiento_por_defecto
+from benchmarks.entorno import crear_engines, sembrar
+
+# Los datos sembrados tienen gastos de 2025
+ANO = 2026
+
+
+async def facturar_orm(db, condominio_id, ano, mes, valor_uf):
+    """Facturación fila a fila (referencia para comparar)"""
+    viviendas = (await db.execute(
+        select(Vivienda).where(Vivienda.condominio_id == condominio_id).order_by(Vivienda.id)
+    )).scalars().all()
+    creados = 0
+    for vivienda in viviendas:
+        existe = (await db.execute(
+            select(GastoComun.id).where(
+                GastoComun.vivienda_id == vivienda.id, GastoComun.mes == mes, GastoComun.ano == ano
+            )
+        )).scalar()
+        if existe is None:
+            db.add(GastoComun(
+                vivienda_id=vivienda.id, mes=mes, ano=ano,
+                monto_total=round(vivienda.cargo_fijo_uf * valor_uf), estado="pendiente",
+                vencimiento=vencimiento_por_defecto(ano, mes),
+            ))
+            await db.flush()
+            creados += 1
+    await db.commit()
+    return {"creados": creados}
+
+
+async def medir(session_factory, funcion, *args, **kwargs):
+    async with session_factory() as db:
+        t0 = time.perf_counter()
+        resultado = await funcion(db, *args, **kwargs)
+        return time.perf_counter() - t0, resultado
+
+
+async def correr(args, async_engine, session_factory):
+    valor_uf = Decimal(args.valor_uf)
+    t_orm, r_orm = await medir(session_factory, facturar_orm, 1, ANO, 1, valor_uf)
+    t_lotes, r_lotes = await medir(session_factory, facturar_mes, 1, ANO, 2, valor_uf, lote=args.lote)
+    t_repetida, r_repetida = await medir(session_factory, facturar_mes, 1, ANO, 2, valor_uf, lote=args.lote)
+    await async_engine.dispose()
+    return (t_orm, r_orm), (t_lotes, r_lotes), (t_repetida, r_repetida)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", required=True, help="URL SQLAlchemy de una base de pruebas (postgresql+psycopg:// o sqlite:///)")
+    parser.add_argument("--reiniciar", action="store_true", help="Vaciar las tablas antes de sembrar (solo PostgreSQL)")
+    parser.add_argument("--viviendas", type=int, default=20000)
+    parser.add_argument("--valor-uf", default="39500.55")
+    parser.add_argument("--lote", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine, async_engine, session_factory = crear_engines(args.db_url)
+    t0 = time.perf_counter()
+    sembrado = sembrar(engine, args.viviendas, reiniciar=args.reiniciar)
+    print(f"sembrado en {time.perf_counter() - t0:.1f}s: {sembrado}", file=sys.stderr)
+
+    (t_orm, r_orm), (t_lotes, r_lotes), (t_repetida, r_repetida) = asyncio.run(
+        correr(args, async_engine, session_factory)
+    )
+
+    print(f"motor={async_engine.dialect.name} viviendas={args.viviendas} lote={args.lote}")
+    print(f"orm fila a fila: {t_orm:8.2f} s  {r_orm}")
+    print(f"por lotes:       {t_lotes:8.2f} s  {r_lotes}")
+    print(f"repetida:        {t_repetida:8.2f} s  {r_repetida}")
+    print(f"speedup: {t_orm / t_lotes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
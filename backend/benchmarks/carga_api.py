@@ -0,0 +1,213 @@
+"""
+Benchmark de carga de los endpoints críticos de la API
+
+Siembra un condominio sintético, monta la aplicación en proceso (ASGI, sin
+servidor HTTP) con un GoogleCalendarManager falso y mide throughput y
+latencia de desglose_residente, obtener_disponibilidad, crear_reserva y
+listar_reservas con la concurrencia indicada. El resultado se emite como
+JSON para comparar entre commits.
+
+Uso (desde backend/):
+    # PostgreSQL de pruebas con las migraciones de sql/ aplicadas
+    python -m benchmarks.carga_api --db-url postgresql+psycopg://u:p@localhost/bench --reiniciar
+    # Reemplazo local con SQLite (pip install -r requirements-dev.txt;
+    # sin Google falso ni outbox)
+    python -m benchmarks.carga_api --db-url sqlite:////tmp/bench.sqlite --viviendas 500
+
+    --escenarios desglose,disponibilidad --concurrencia 32 --solicitudes 2000 --salida resultados.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+# Los logs por request irían a stdout junto con el resultado
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    raise SystemExit("El benchmark requiere httpx (pip install httpx)")
+
+from app.db import deps
+from app.main import app
+from app.api.v1.routes import reservas
+from app.core.google_calendar import ESPACIOS_COMUNES
+from app.services.disponibilidad import cache_disponibilidad
+from benchmarks.entorno import GoogleCalendarFalso, crear_engines, es_sqlite, sembrar
+
+ESCENARIOS = ("desglose", "disponibilidad", "crear_reserva", "listar_reservas")
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return None
+    return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] * 1000, 2)
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def construir_solicitud(escenario, n, rnd, args):
+    """(método, url, json) de la solicitud n del escenario"""
+    usuario = rnd.randint(1, args.viviendas)
+    if escenario == "desglose":
+        return "GET", f"/api/v1/pagos/residente/{usuario}", None
+    if escenario == "listar_reservas":
+        return "GET", f"/api/v1/reservas/usuario/{usuario}", None
+    if escenario == "disponibilidad":
+        espacio = rnd.choice(list(ESPACIOS_COMUNES))
+        desde = datetime(2025, 1, 1) + timedelta(days=rnd.randrange(330))
+        hasta = desde + timedelta(days=args.dias_disponibilidad - 1)
+        return "GET", (
+            f"/api/v1/reservas/espacios/{espacio}/disponibilidad"
+            f"?fecha_inicio={desde.date().isoformat()}&fecha_fin={hasta.date().isoformat()}"
+        ), None
+    if escenario == "crear_reserva":
+        # Una franja distinta por solicitud (años después de los datos sembrados)
+        espacio = list(ESPACIOS_COMUNES)[n % len(ESPACIOS_COMUNES)]
+        inicio = datetime(2030, 1, 1, tzinfo=timezone.utc) + timedelta(hours=n // len(ESPACIOS_COMUNES))
+        return "POST", f"/api/v1/reservas/?usuario_id={usuario}", {
+            "espacio": espacio,
+            "fecha_hora_inicio": inicio.isoformat(),
+            "fecha_hora_fin": (inicio + timedelta(hours=1)).isoformat(),
+        }
+    raise ValueError(escenario)
+
+
+async def correr_escenario(cliente, escenario, args, corrida, cantidad):
+    rnd = random.Random(args.semilla + corrida)
+    # Cada corrida usa números de solicitud distintos (franjas nuevas en crear_reserva)
+    solicitudes = [construir_solicitud(escenario, corrida * 1_000_000 + n, rnd, args) for n in range(cantidad)]
+    siguiente = itertools.count()
+    latencias, codigos = [], Counter()
+
+    async def trabajador():
+        while True:
+            i = next(siguiente)
+            if i >= len(solicitudes):
+                return
+            metodo, url, cuerpo = solicitudes[i]
+            if args.sin_cache:
+                cache_disponibilidad.limpiar()
+            t0 = time.perf_counter()
+            respuesta = await cliente.request(metodo, url, json=cuerpo)
+            latencias.append(time.perf_counter() - t0)
+            codigos[respuesta.status_code] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(args.concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    errores = sum(v for k, v in codigos.items() if k >= 400)
+    return {
+        "solicitudes": len(latencias),
+        "errores": errores,
+        "status": {str(k): v for k, v in sorted(codigos.items())},
+        "duracion_s": round(duracion, 3),
+        "rps": round(len(latencias) / duracion, 1),
+        "p50_ms": _percentil(latencias, 0.50),
+        "p90_ms": _percentil(latencias, 0.90),
+        "p99_ms": _percentil(latencias, 0.99),
+        "max_ms": _percentil(latencias, 1.0),
+    }
+
+
+async def correr(args, async_engine, session_factory):
+    async def obtener_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[deps.get_async_db] = obtener_db
+    transporte = httpx.ASGITransport(app=app)
+    resultados = {}
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+        for escenario in args.escenarios:
+            # Calentamiento: carga el registro de espacios y el pool
+            await correr_escenario(cliente, escenario, args, corrida=1, cantidad=min(20, args.solicitudes))
+            cache_disponibilidad.limpiar()
+            resultados[escenario] = await correr_escenario(cliente, escenario, args, corrida=0, cantidad=args.solicitudes)
+            r = resultados[escenario]
+            print(
+                f"{escenario:16s} {r['rps']:9.1f} req/s  p50={r['p50_ms']}ms  p99={r['p99_ms']}ms  errores={r['errores']}",
+                file=sys.stderr,
+            )
+    await async_engine.dispose()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", required=True, help="URL SQLAlchemy de una base de pruebas (postgresql+psycopg:// o sqlite:///)")
+    parser.add_argument("--reiniciar", action="store_true", help="Vaciar las tablas antes de sembrar (solo PostgreSQL)")
+    parser.add_argument("--sin-sembrar", action="store_true", help="Reusar los datos ya sembrados")
+    parser.add_argument("--viviendas", type=int, default=2000)
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS))
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--solicitudes", type=int, default=500, help="Solicitudes por escenario")
+    parser.add_argument("--dias-disponibilidad", type=int, default=7)
+    parser.add_argument("--sin-cache", action="store_true", help="Vaciar el cache de disponibilidad antes de cada solicitud")
+    parser.add_argument("--eventos-google", type=int, default=200, help="Eventos sintéticos por calendario")
+    parser.add_argument("--latencia-google-ms", type=float, default=0)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (default: stdout)")
+    args = parser.parse_args()
+    args.escenarios = [e.strip() for e in args.escenarios.split(",") if e.strip()]
+    for escenario in args.escenarios:
+        if escenario not in ESCENARIOS:
+            parser.error(f"Escenario '{escenario}' no válido. Use: {', '.join(ESCENARIOS)}")
+
+    engine, async_engine, session_factory = crear_engines(args.db_url)
+
+    sembrado = None
+    if not args.sin_sembrar:
+        t0 = time.perf_counter()
+        sembrado = sembrar(engine, args.viviendas, semilla=args.semilla, reiniciar=args.reiniciar)
+        print(f"sembrado en {time.perf_counter() - t0:.1f}s: {sembrado}", file=sys.stderr)
+
+    # En SQLite no hay exclusion constraint ni CTEs con INSERT: se mide sin
+    # Google (disponibilidad con datos de prueba y sin outbox)
+    if not es_sqlite(args.db_url):
+        reservas.calendar_manager = GoogleCalendarFalso(
+            eventos_por_espacio=args.eventos_google, latencia_ms=args.latencia_google_ms, semilla=args.semilla
+        )
+        reservas.GOOGLE_CALENDAR_AVAILABLE = True
+
+    escenarios = asyncio.run(correr(args, async_engine, session_factory))
+
+    resultado = {
+        "commit": _commit_actual(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "motor": async_engine.dialect.name,
+        "python": platform.python_version(),
+        "parametros": {
+            k: v for k, v in vars(args).items() if k not in ("db_url", "salida")
+        },
+        "sembrado": sembrado,
+        "escenarios": escenarios,
+    }
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(salida + "\n")
+    else:
+        print(salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Prueba de carga: muchos clientes reservando el mismo horario a la vez
+
+Contra una API corriendo sobre PostgreSQL (con sql/008 aplicada), exactamente
+una solicitud por horario debe responder 201 y todas las demás 409.
+
+Uso (desde backend/, con el servidor arriba):
+    python -m benchmarks.carga_reservas --url http://localhost:8000 --clientes 200 --rondas 5
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+
+def reservar(url: str, usuario_id: int, cuerpo: bytes) -> int:
+    solicitud = urllib.request.Request(
+        f"{url}/api/v1/reservas/?usuario_id={usuario_id}",
+        data=cuerpo,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(solicitud, timeout=30) as respuesta:
+            return respuesta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def ronda(url: str, espacio: str, usuario_id: int, inicio: datetime, clientes: int):
+    """Lanza `clientes` solicitudes idénticas liberadas al mismo tiempo"""
+    cuerpo = json.dumps({
+        "espacio": espacio,
+        "fecha_hora_inicio": inicio.isoformat(),
+        "fecha_hora_fin": (inicio + timedelta(hours=1)).isoformat(),
+    }).encode()
+    barrera = threading.Barrier(clientes)
+
+    def cliente(_):
+        barrera.wait()
+        t0 = time.perf_counter()
+        codigo = reservar(url, usuario_id, cuerpo)
+        return codigo, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=clientes) as pool:
+        return list(pool.map(cliente, range(clientes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--espacio", default="quincho")
+    parser.add_argument("--usuario-id", type=int, default=1)
+    parser.add_argument("--clientes", type=int, default=100)
+    parser.add_argument("--rondas", type=int, default=3)
+    args = parser.parse_args()
+
+    # Horarios lejanos y distintos por ejecución para no chocar con datos reales
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=3650)
+    base += timedelta(days=int(time.time()) % 1000)
+
+    correcto = True
+    for n in range(args.rondas):
+        resultados = ronda(args.url, args.espacio, args.usuario_id, base + timedelta(hours=n), args.clientes)
+        codigos = Counter(codigo for codigo, _ in resultados)
+        latencias = sorted(t for _, t in resultados)
+        p50 = latencias[len(latencias) // 2] * 1000
+        p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+        ok = codigos.get(201, 0) == 1 and codigos.get(409, 0) == args.clientes - 1
+        correcto &= ok
+        print(f"ronda {n + 1}: {dict(codigos)}  p50={p50:.1f}ms  p99={p99:.1f}ms  {'OK' if ok else 'ERROR'}")
+
+    print("resultado:", "OK" if correcto else "ERROR: hubo reservas duplicadas o errores")
+    raise SystemExit(0 if correcto else 1)
+
+
+if __name__ == "__main__":
+    main()
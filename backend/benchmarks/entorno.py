@@ -0,0 +1,191 @@
+"""
+Entorno reproducible para los benchmarks de la API
+
+- Siembra un condominio sintético (viviendas, usuarios, gastos comunes,
+  multas y reservas) con una semilla fija.
+- Reemplaza GoogleCalendarManager por uno falso con eventos generados y
+  latencia de red configurable.
+- Permite usar PostgreSQL (con las migraciones de sql/ aplicadas) o un
+  archivo SQLite como reemplazo local (requiere aiosqlite, incluido en
+  requirements-dev.txt).
+"""
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import BigInteger, create_engine, func, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from app.core.google_calendar import ESPACIOS_COMUNES
+from app.models.models import (
+    Base,
+    Condominio,
+    EspacioComun,
+    GastoComun,
+    Multa,
+    Reserva,
+    ResidenteVivienda,
+    Usuario,
+    Vivienda,
+)
+from app.services.disponibilidad import IndiceIntervalos
+from app.services.google_calendar_service import GoogleCalendarManager
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(tipo, compilador, **kw):
+    # En SQLite solo INTEGER PRIMARY KEY es autoincremental
+    return "INTEGER"
+
+
+TABLAS_SEMBRADAS = (Reserva, Multa, GastoComun, ResidenteVivienda, Usuario, Vivienda, EspacioComun, Condominio)
+
+# Inicio fijo de los datos sembrados, para que dos corridas sean comparables
+INICIO_DATOS = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def es_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def crear_engines(url: str):
+    """Engine síncrono (para sembrar) y fábrica de sesiones asíncronas (para la API)"""
+    if es_sqlite(url):
+        ruta = url.split("///", 1)[1]
+        engine = create_engine(f"sqlite:///{ruta}")
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{ruta}")
+    else:
+        engine = create_engine(url)
+        async_engine = create_async_engine(url, pool_size=20, max_overflow=20)
+    return engine, async_engine, async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def sembrar(engine, viviendas: int, semilla: int = 42, reiniciar: bool = False, lote: int = 5000) -> Dict[str, int]:
+    """
+    Inserta el condominio sintético. Con `reiniciar` vacía antes las tablas;
+    si no, exige que estén vacías (para no mezclar con datos reales).
+
+    Por vivienda: un residente, 12 gastos comunes, 0-3 multas y ~5 reservas
+    distribuidas en los tres espacios sin solaparse.
+    """
+    rnd = random.Random(semilla)
+    if es_sqlite(str(engine.url)):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    else:
+        with engine.begin() as conn:
+            if reiniciar:
+                tablas = ", ".join(t.__tablename__ for t in TABLAS_SEMBRADAS)
+                conn.execute(text(f"TRUNCATE {tablas} RESTART IDENTITY CASCADE"))
+            elif conn.execute(select(func.count()).select_from(Vivienda)).scalar():
+                raise SystemExit("La base de datos ya tiene datos: use una base de pruebas y --reiniciar")
+
+    filas: Dict[type, List[dict]] = {t: [] for t in TABLAS_SEMBRADAS}
+    filas[Condominio].append({"id": 1, "nombre": "Condominio Benchmark", "direccion": "Calle Falsa 123"})
+    espacios = list(ESPACIOS_COMUNES)
+    for i, slug in enumerate(espacios, start=1):
+        filas[EspacioComun].append({
+            "id": i, "condominio_id": 1, "nombre": ESPACIOS_COMUNES[slug]["nombre"],
+            "slug": slug, "requiere_pago": ESPACIOS_COMUNES[slug]["requiere_pago"],
+        })
+
+    gasto_id = multa_id = reserva_id = 0
+    # Reservas por espacio en franjas de 2 horas consecutivas: sin solapes
+    franjas = {i: 0 for i in range(1, len(espacios) + 1)}
+    for v in range(1, viviendas + 1):
+        filas[Vivienda].append({
+            "id": v, "condominio_id": 1, "numero_vivienda": str(100 + v),
+            "cargo_fijo_uf": round(rnd.uniform(2, 12), 2),
+        })
+        filas[Usuario].append({
+            "id": v, "email": f"residente{v}@benchmark.cl", "password_hash": "x",
+            "nombre_completo": f"Residente {v}",
+        })
+        filas[ResidenteVivienda].append({"usuario_id": v, "vivienda_id": v})
+        for mes in range(1, 13):
+            gasto_id += 1
+            filas[GastoComun].append({
+                "id": gasto_id, "vivienda_id": v, "mes": mes, "ano": 2025,
+                "monto_total": rnd.randint(80, 250) * 1000,
+                "estado": rnd.choice(("pagado", "pagado", "pendiente", "vencido")),
+                "vencimiento": date(2025, mes, 28),
+            })
+        for _ in range(rnd.randint(0, 3)):
+            multa_id += 1
+            filas[Multa].append({
+                "id": multa_id, "vivienda_id": v, "monto": rnd.randint(5, 50) * 1000,
+                "descripcion": "Multa sintética", "fecha_aplicada": date(2025, rnd.randint(1, 12), rnd.randint(1, 28)),
+            })
+        for _ in range(rnd.randint(3, 7)):
+            reserva_id += 1
+            espacio_id = rnd.randint(1, len(espacios))
+            inicio = INICIO_DATOS + timedelta(hours=2 * franjas[espacio_id])
+            franjas[espacio_id] += rnd.randint(1, 3)
+            filas[Reserva].append({
+                "id": reserva_id, "espacio_comun_id": espacio_id, "usuario_id": v,
+                "fecha_hora_inicio": inicio, "fecha_hora_fin": inicio + timedelta(hours=2),
+                "monto_pago": ESPACIOS_COMUNES[espacios[espacio_id - 1]]["precio"],
+                "estado_pago": rnd.choice(("pagado", "pendiente")),
+            })
+
+    with engine.begin() as conn:
+        for tabla in reversed(TABLAS_SEMBRADAS):
+            datos = filas[tabla]
+            for i in range(0, len(datos), lote):
+                conn.execute(insert(tabla), datos[i:i + lote])
+        if not es_sqlite(str(engine.url)):
+            # Las secuencias deben continuar después de los ids explícitos
+            for tabla in TABLAS_SEMBRADAS:
+                if tabla is ResidenteVivienda:
+                    continue
+                nombre = tabla.__tablename__
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{nombre}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {nombre}))"
+                ))
+
+    return {tabla.__tablename__: len(filas[tabla]) for tabla in TABLAS_SEMBRADAS}
+
+
+class GoogleCalendarFalso(GoogleCalendarManager):
+    """
+    GoogleCalendarManager sin red: eventos sintéticos por espacio y una
+    latencia fija por llamada (simula la API de Google).
+    """
+
+    def __init__(self, eventos_por_espacio: int = 200, dias: int = 365, latencia_ms: float = 0, semilla: int = 7):
+        rnd = random.Random(semilla)
+        self.latencia = latencia_ms / 1000
+        self.espejo = None
+        self._indices: Dict[str, IndiceIntervalos] = {}
+        for espacio in ESPACIOS_COMUNES:
+            intervalos = []
+            for _ in range(eventos_por_espacio):
+                inicio = INICIO_DATOS + timedelta(days=rnd.randrange(dias), hours=rnd.randint(8, 19))
+                intervalos.append((int(inicio.timestamp()), int(inicio.timestamp()) + 1800 * rnd.randint(1, 4)))
+            self._indices[espacio] = IndiceIntervalos(intervalos)
+
+    def obtener_ocupados(self, espacio: str, fecha_inicio: datetime, fecha_fin: datetime) -> IndiceIntervalos:
+        if self.latencia:
+            time.sleep(self.latencia)
+        return self._indices[espacio]
+
+    def get_disponibilidad(self, espacio: str, fecha_inicio: datetime, fecha_fin: datetime, duracion_minutos: int = 60) -> List[Dict]:
+        if fecha_inicio.tzinfo is None:
+            fecha_inicio = fecha_inicio.replace(tzinfo=timezone.utc)
+        if fecha_fin.tzinfo is None:
+            fecha_fin = fecha_fin.replace(tzinfo=timezone.utc)
+        return self._calcular_slots_disponibles(
+            fecha_inicio, fecha_fin, self.obtener_ocupados(espacio, fecha_inicio, fecha_fin), duracion_minutos
+        )
+
+    def crear_evento(self, espacio, titulo, descripcion, fecha_inicio, fecha_fin, email_asistente=None, event_id: Optional[str] = None) -> Dict:
+        if self.latencia:
+            time.sleep(self.latencia)
+        return {"id": event_id or f"falso{time.monotonic_ns()}"}
+
+    def eliminar_evento(self, espacio: str, event_id: str) -> bool:
+        if self.latencia:
+            time.sleep(self.latencia)
+        return True
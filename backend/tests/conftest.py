@@ -0,0 +1,8 @@
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(tipo, compilador, **kw):
+    # En SQLite solo INTEGER PRIMARY KEY es autoincremental
+    return "INTEGER"
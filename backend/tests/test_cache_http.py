@@ -0,0 +1,78 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends, FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from app.api.v1.cache_http import CACHE_CONTROL_PUBLICO, RutaConVersion, VersionHTTP, calcular_etag, etag_coincide
+from app.db.deps import get_async_db
+
+
+def test_calcular_etag_es_debil_y_deterministico():
+    etag = calcular_etag("/espacios", "", 3, datetime(2025, 1, 1, tzinfo=timezone.utc))
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == calcular_etag("/espacios", "", 3, datetime(2025, 1, 1, tzinfo=timezone.utc))
+    assert etag != calcular_etag("/espacios", "", 4, datetime(2025, 1, 1, tzinfo=timezone.utc))
+    assert calcular_etag(date(2025, 1, 1), Decimal("39485.65")) == calcular_etag("2025-01-01", "39485.65")
+
+
+def test_etag_coincide():
+    etag = calcular_etag(1)
+    opaco = etag.removeprefix("W/")
+    assert etag_coincide(etag, etag)
+    assert etag_coincide(opaco, etag)  # comparación débil
+    assert etag_coincide(f'"otro", {opaco}', etag)
+    assert etag_coincide(" * ", etag)
+    assert not etag_coincide(None, etag)
+    assert not etag_coincide("", etag)
+    assert not etag_coincide('W/"otro"', etag)
+
+
+def _app(version):
+    router = APIRouter(route_class=RutaConVersion)
+
+    async def leer_version(request: Request, db):
+        return version
+
+    @router.get("/datos", dependencies=[Depends(VersionHTTP(leer_version, CACHE_CONTROL_PUBLICO))])
+    async def datos():
+        return {"ok": True}
+
+    @router.get("/propio", dependencies=[Depends(VersionHTTP(leer_version))])
+    async def propio():
+        return Response("texto", media_type="text/plain")
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def sin_db():
+        yield None
+
+    app.dependency_overrides[get_async_db] = sin_db
+    return TestClient(app)
+
+
+def test_ruta_con_version_responde_304_con_el_mismo_etag():
+    version = [1]
+    cliente = _app(version)
+    respuesta = cliente.get("/datos")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["cache-control"] == CACHE_CONTROL_PUBLICO
+    etag = respuesta.headers["etag"]
+
+    no_modificado = cliente.get("/datos", headers={"If-None-Match": etag})
+    assert no_modificado.status_code == 304
+    assert no_modificado.content == b""
+    assert no_modificado.headers["etag"] == etag
+
+    version[0] = 2
+    assert cliente.get("/datos", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_ruta_con_version_agrega_headers_a_un_response_propio():
+    cliente = _app([1])
+    respuesta = cliente.get("/propio")
+    assert respuesta.text == "texto"
+    assert respuesta.headers["cache-control"] == "private, no-cache"
+    # La URL forma parte del ETag
+    assert respuesta.headers["etag"] != cliente.get("/datos").headers["etag"]
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.models.models import Base, Condominio, GastoComun, Pago, ResidenteVivienda, Usuario, Vivienda
+from app.services.conciliacion import (
+    COLUMNAS,
+    _LineaInvalida,
+    _parsear_fila,
+    conciliar_cartola,
+    lineas_de_bytes,
+    parsear_monto,
+)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("150000", "150000.00"),
+    ("150.000", "150000.00"),
+    ("$ 150.000", "150000.00"),
+    ("150000.00", "150000.00"),
+    ("150.000,50", "150000.50"),
+    ("1.234.567", "1234567.00"),
+    ("99.5", "99.50"),
+])
+def test_parsear_monto(texto, esperado):
+    assert parsear_monto(texto) == Decimal(esperado)
+
+
+@pytest.mark.parametrize("texto", ["", "abc", "0", "-100", "$"])
+def test_parsear_monto_no_valido(texto):
+    with pytest.raises(_LineaInvalida):
+        parsear_monto(texto)
+
+
+def test_parsear_fila():
+    referencia, fecha, clave = _parsear_fila({
+        "referencia": " TX-1 ", "fecha": "2025-02-03", "vivienda_id": "15", "periodo": "2025-01", "monto": "150.000",
+    })
+    assert referencia == "TX-1"
+    assert fecha.isoformat() == "2025-02-03T00:00:00"
+    assert clave == (15, 2025, 1, Decimal("150000.00"))
+
+
+@pytest.mark.parametrize("campo, valor", [
+    ("referencia", ""), ("fecha", "03-02-2025"), ("vivienda_id", "x"), ("periodo", "2025-13"), ("periodo", "2025/01"),
+])
+def test_parsear_fila_no_valida(campo, valor):
+    fila = {"referencia": "TX-1", "fecha": "2025-02-03", "vivienda_id": "15", "periodo": "2025-01", "monto": "1"}
+    fila[campo] = valor
+    with pytest.raises(_LineaInvalida):
+        _parsear_fila(fila)
+
+
+def _lineas(trozos):
+    async def flujo():
+        for trozo in trozos:
+            yield trozo
+
+    async def leer():
+        return [linea async for linea in lineas_de_bytes(flujo())]
+
+    return asyncio.run(leer())
+
+
+def test_lineas_de_bytes_une_trozos_partidos():
+    assert _lineas([b"a,b\nc", b",d\n", b"e", b",f"]) == ["a,b", "c,d", "e,f"]
+
+
+def test_lineas_de_bytes_no_parte_caracteres_multibyte():
+    texto = "número,ñandú\n".encode()
+    assert _lineas([texto[:2], texto[2:8], texto[8:]]) == ["número,ñandú"]
+
+
+def test_lineas_de_bytes_vacio_y_salto_final():
+    assert _lineas([]) == []
+    assert _lineas([b"a\n"]) == ["a"]
+
+
+# ----------------------------------------------------------------------------
+# Cargas concurrentes (SQLite en un archivo, una sesión por carga)
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def base(tmp_path):
+    ruta = tmp_path / "conciliacion.sqlite"
+    engine = create_engine(f"sqlite:///{ruta}")
+    Base.metadata.create_all(engine, tables=[
+        t.__table__ for t in (Condominio, Usuario, Vivienda, ResidenteVivienda, GastoComun, Pago)
+    ])
+    with Session(engine) as sesion:
+        sesion.add_all([
+            Condominio(id=1, nombre="c", direccion="d"),
+            Usuario(id=1, email="a@b.cl", password_hash="x", nombre_completo="A"),
+            Vivienda(id=1, condominio_id=1, numero_vivienda="101", cargo_fijo_uf=1),
+        ])
+        sesion.flush()
+        sesion.add_all([
+            ResidenteVivienda(usuario_id=1, vivienda_id=1),
+            GastoComun(id=1, vivienda_id=1, ano=2025, mes=1, monto_total=100, estado="pendiente",
+                       vencimiento=date(2025, 1, 31)),
+        ])
+        sesion.commit()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{ruta}")
+    yield engine, async_sessionmaker(async_engine, expire_on_commit=False)
+    asyncio.run(async_engine.dispose())
+
+
+def _cartola(*referencias):
+    async def lineas():
+        yield ",".join(COLUMNAS)
+        for referencia in referencias:
+            yield f"{referencia},2025-02-03,1,2025-01,100"
+    return lineas()
+
+
+def test_cargas_concurrentes_no_pagan_dos_veces_el_mismo_gasto(base):
+    engine, sesiones = base
+
+    async def cargar():
+        async with sesiones() as otra, sesiones() as db:
+            ejecutar = db.execute
+
+            async def otra_carga_antes_del_update(sentencia, *args, **kwargs):
+                # La otra cartola (con otra referencia) paga el gasto después de
+                # que esta leyó el índice de deuda y antes de reclamarlo
+                if getattr(sentencia, "is_update", False):
+                    db.execute = ejecutar
+                    resumen = await conciliar_cartola(otra, 1, _cartola("BANCO-1"))
+                    assert resumen["conciliados"] == 1
+                return await ejecutar(sentencia, *args, **kwargs)
+
+            db.execute = otra_carga_antes_del_update
+            return await conciliar_cartola(db, 1, _cartola("WEBPAY-1"))
+
+    resumen = asyncio.run(cargar())
+    assert resumen["conciliados"] == 0
+    assert resumen["sin_coincidencia"] == 1
+    with Session(engine) as sesion:
+        assert sesion.execute(select(Pago.referencia, Pago.gasto_comun_id)).all() == [("BANCO-1", 1)]
+        assert sesion.get(GastoComun, 1).estado == "pagado"
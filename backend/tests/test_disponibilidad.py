@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+import random
+
+from app.services.disponibilidad import IndiceIntervalos, a_epoch, marcar_conflictos
+
+
+def _fuerza_bruta(slots, intervalos):
+    return [any(i < fin and inicio < f for i, f in intervalos if f > i) for inicio, fin in slots]
+
+
+def test_indice_fusiona_intervalos_solapados_y_contiguos():
+    indice = IndiceIntervalos([(30, 40), (0, 10), (5, 20), (20, 25), (50, 50)])
+    assert indice.inicios == [0, 30]
+    assert indice.fines == [25, 40]
+    assert len(indice) == 2
+
+
+def test_hay_conflicto_con_intervalos_semiabiertos():
+    indice = IndiceIntervalos([(10, 20)])
+    assert indice.hay_conflicto(15, 16)
+    assert indice.hay_conflicto(5, 11)
+    assert not indice.hay_conflicto(20, 30)  # empieza justo cuando termina
+    assert not indice.hay_conflicto(0, 10)   # termina justo cuando empieza
+
+
+def test_marcar_conflictos_respeta_el_orden_de_los_slots():
+    indice = IndiceIntervalos([(10, 20), (40, 50)])
+    slots = [(45, 55), (0, 10), (15, 25), (20, 40)]
+    assert marcar_conflictos(slots, indice) == [True, False, True, False]
+
+
+def test_marcar_conflictos_sin_slots_o_sin_intervalos():
+    assert marcar_conflictos([], IndiceIntervalos([(0, 10)])) == []
+    assert marcar_conflictos([(0, 10)], IndiceIntervalos()) == [False]
+
+
+def test_marcar_conflictos_coincide_con_fuerza_bruta():
+    azar = random.Random(7)
+    for _ in range(200):
+        intervalos = [(a, a + azar.randint(0, 30)) for a in (azar.randint(0, 200) for _ in range(azar.randint(0, 12)))]
+        slots = [(a, a + azar.randint(1, 30)) for a in (azar.randint(0, 200) for _ in range(azar.randint(0, 20)))]
+        assert marcar_conflictos(slots, IndiceIntervalos(intervalos)) == _fuerza_bruta(slots, intervalos)
+
+
+def test_a_epoch_interpreta_fechas_sin_zona_como_utc():
+    assert a_epoch(datetime(1970, 1, 1, 0, 1)) == 60
+    assert a_epoch(datetime(1970, 1, 1, 0, 1, tzinfo=timezone.utc)) == 60
+    assert a_epoch("1970-01-01T01:00:00+01:00") == 0
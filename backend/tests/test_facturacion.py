@@ -0,0 +1,21 @@
+from datetime import date
+
+import pytest
+
+from app.core.config import settings
+from app.services.facturacion import vencimiento_por_defecto
+
+
+@pytest.mark.parametrize(
+    "dia, ano, mes, esperado",
+    [
+        (10, 2025, 1, date(2025, 2, 10)),
+        (31, 2025, 1, date(2025, 2, 28)),
+        (31, 2024, 1, date(2024, 2, 29)),
+        (31, 2025, 3, date(2025, 4, 30)),
+        (31, 2025, 12, date(2026, 1, 31)),
+    ],
+)
+def test_vencimiento_por_defecto_ajusta_al_ultimo_dia_del_mes(monkeypatch, dia, ano, mes, esperado):
+    monkeypatch.setattr(settings, "FACTURACION_DIA_VENCIMIENTO", dia)
+    assert vencimiento_por_defecto(ano, mes) == esperado
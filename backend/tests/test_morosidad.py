@@ -0,0 +1,115 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.models import Base, Condominio, GastoComun, Multa, Pago, Usuario, Vivienda
+from app.services.morosidad import COLUMNAS, _fila, a_csv, a_ndjson, consulta_morosidad
+
+CORTE = date(2025, 4, 15)
+
+
+@pytest.fixture
+def db():
+    # La consulta tiene una variante para SQLite (días vencidos con julianday)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        t.__table__ for t in (Condominio, Usuario, Vivienda, GastoComun, Multa, Pago)
+    ])
+    with Session(engine) as sesion:
+        sesion.add_all([
+            Condominio(id=1, nombre="c", direccion="d"),
+            Condominio(id=2, nombre="otro", direccion="d"),
+            Usuario(id=1, email="a@b.cl", password_hash="x", nombre_completo="A"),
+            Vivienda(id=1, condominio_id=1, numero_vivienda="101", cargo_fijo_uf=1),
+            Vivienda(id=2, condominio_id=1, numero_vivienda="102", cargo_fijo_uf=1),
+            Vivienda(id=3, condominio_id=1, numero_vivienda="103", cargo_fijo_uf=1),
+            Vivienda(id=4, condominio_id=2, numero_vivienda="201", cargo_fijo_uf=1),
+        ])
+        sesion.flush()
+        sesion.add_all([
+            # 101: enero (74 días) y febrero (46 días) más una multa (36 días)
+            _gasto(1, 1, 1, 100, date(2025, 1, 31)),
+            _gasto(2, 1, 2, 100, date(2025, 2, 28)),
+            Multa(id=1, vivienda_id=1, monto=50, fecha_aplicada=date(2025, 3, 10)),
+            _gasto(3, 1, 4, 100, date(2025, 4, 30)),  # vence después del corte
+            # 102: diciembre (105 días), sin pagos
+            _gasto(4, 2, 12, 300, date(2024, 12, 31)),
+            # 103: al día
+            _gasto(5, 3, 1, 100, date(2025, 1, 31)),
+            # Otro condominio
+            _gasto(6, 4, 1, 999, date(2025, 1, 31)),
+        ])
+        sesion.flush()
+        sesion.add_all([
+            # 101 pagó 120: cubre enero y 20 de febrero
+            _pago(1, 1, 120, datetime(2025, 4, 1)),
+            _pago(2, 1, 500, datetime(2025, 4, 16, 9)),  # después del corte
+            _pago(3, 5, 100, datetime(2025, 2, 1)),
+        ])
+        sesion.commit()
+        yield sesion
+
+
+def _gasto(id, vivienda_id, mes, monto, vencimiento):
+    return GastoComun(id=id, vivienda_id=vivienda_id, ano=2025 if mes < 12 else 2024, mes=mes,
+                      monto_total=monto, estado="pendiente", vencimiento=vencimiento)
+
+
+def _pago(id, gasto_comun_id, monto, fecha):
+    return Pago(id=id, gasto_comun_id=gasto_comun_id, usuario_id=1, monto_pagado=monto,
+                fecha_pago=fecha, metodo_pago="transferencia", referencia=f"TX-{id}")
+
+
+def _informe(db):
+    filas = db.execute(consulta_morosidad(1, CORTE, "sqlite")).all()
+    return [dict(zip(COLUMNAS, _fila(fila))) for fila in filas]
+
+
+def test_pagos_se_imputan_a_los_cargos_mas_antiguos(db):
+    por_vivienda = {fila["vivienda_id"]: fila for fila in _informe(db)}
+    assert set(por_vivienda) == {1, 2}
+
+    fila = por_vivienda[1]
+    assert (fila["deuda_1_30"], fila["deuda_31_60"], fila["deuda_61_90"], fila["deuda_mas_90"]) == (0, 130, 0, 0)
+    assert fila["deuda_total"] == 130
+    assert fila["cargos_impagos"] == 2
+    assert fila["dias_mayor_atraso"] == 46
+
+    fila = por_vivienda[2]
+    assert fila["deuda_mas_90"] == 300
+    assert fila["dias_mayor_atraso"] == 105
+
+
+def test_ranking_y_participacion(db):
+    informe = _informe(db)
+    assert [(f["vivienda_id"], f["ranking"]) for f in informe] == [(2, 1), (1, 2)]
+    # En SQLite el cociente vuelve con la escala de Numeric(14,2)
+    assert informe[0]["participacion"] == pytest.approx(300 / 430, abs=0.005)
+    assert sum(f["participacion"] for f in informe) == pytest.approx(1, abs=0.01)
+
+
+def test_formatos_de_salida():
+    fila = (1, "101", 0.0, 130.0, 0.0, 0.0, 130.0, 2, 46, 1, 1.0)
+    assert a_csv([fila], encabezado=True).splitlines() == [",".join(COLUMNAS), "1,101,0.0,130.0,0.0,0.0,130.0,2,46,1,1.0"]
+    assert a_ndjson([fila]) == '{"vivienda_id":1,"numero_vivienda":"101","deuda_1_30":0.0,"deuda_31_60":130.0,' \
+        '"deuda_61_90":0.0,"deuda_mas_90":0.0,"deuda_total":130.0,"cargos_impagos":2,"dias_mayor_atraso":46,' \
+        '"ranking":1,"participacion":1.0}\n'
+
+
+def test_gasto_sin_vencimiento_vence_a_fin_de_mes(db):
+    # 102 pagó su gasto de marzo, que no tiene vencimiento: el pago no puede
+    # achicar la deuda total, que incluye ese gasto (vence el 31 de marzo)
+    db.add_all([
+        _gasto(7, 2, 3, 80, None),
+        _gasto(8, 2, 4, 70, None),  # vence el 30 de abril, después del corte
+    ])
+    db.flush()
+    db.add(_pago(4, 7, 80, datetime(2025, 4, 2)))
+    db.commit()
+
+    fila = {f["vivienda_id"]: f for f in _informe(db)}[2]
+    assert fila["deuda_total"] == 300
+    assert (fila["deuda_1_30"], fila["deuda_mas_90"]) == (80, 220)
+    assert fila["cargos_impagos"] == 2
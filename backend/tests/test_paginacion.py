@@ -0,0 +1,81 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.api.v1.paginacion import codificar_cursor, decodificar_cursor
+from app.api.v1.routes import reservas
+from app.db.deps import get_async_db
+from app.models.models import Base, Condominio, EspacioComun, Reserva, Usuario
+
+
+def test_cursor_ida_y_vuelta():
+    inicio = datetime(2025, 10, 25, 18, 0, tzinfo=timezone.utc)
+    cursor = codificar_cursor(inicio, date(2025, 1, 1), 42)
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor, 3) == [inicio.isoformat(), "2025-01-01", 42]
+
+
+def test_cursor_es_url_safe():
+    # "?>?" en base64 estándar produce "+" y "/"
+    cursor = codificar_cursor("?>?", "\xff\xfe")
+    assert not set(cursor) & set("+/=")
+    assert decodificar_cursor(cursor, 2) == ["?>?", "\xff\xfe"]
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", codificar_cursor(1, 2), "e30"])
+def test_cursor_no_valido_responde_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decodificar_cursor(cursor, 3)
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def cliente_reservas(tmp_path):
+    ruta = tmp_path / "reservas.sqlite"
+    engine = create_engine(f"sqlite:///{ruta}")
+    Base.metadata.create_all(engine, tables=[t.__table__ for t in (Condominio, Usuario, EspacioComun, Reserva)])
+    with Session(engine) as sesion:
+        sesion.add_all([
+            Condominio(id=1, nombre="c", direccion="d"),
+            Usuario(id=1, email="a@b.cl", password_hash="x", nombre_completo="A"),
+            EspacioComun(id=1, condominio_id=1, nombre="Quincho"),
+        ])
+        sesion.flush()
+        sesion.add_all([
+            Reserva(id=i, espacio_comun_id=1, usuario_id=1, monto_pago=0,
+                    fecha_hora_inicio=datetime(2025, 10, i, 18), fecha_hora_fin=datetime(2025, 10, i, 19))
+            for i in range(1, 4)
+        ])
+        sesion.commit()
+
+    sesiones = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{ruta}"), expire_on_commit=False)
+
+    async def db():
+        async with sesiones() as sesion:
+            yield sesion
+
+    app = FastAPI()
+    app.include_router(reservas.router, prefix="/reservas")
+    app.dependency_overrides[get_async_db] = db
+    return TestClient(app)
+
+
+def test_listar_reservas_por_cursor(cliente_reservas):
+    primera = cliente_reservas.get("/reservas/usuario/1", params={"limite": 2})
+    assert [r["id"] for r in primera.json()] == [3, 2]
+    siguiente = cliente_reservas.get(
+        "/reservas/usuario/1", params={"limite": 2, "cursor": primera.headers["X-Next-Cursor"]}
+    )
+    assert [r["id"] for r in siguiente.json()] == [1]
+
+
+@pytest.mark.parametrize("valores", [("no-es-fecha", 1), ("2025-10-01T18:00:00", "x"), (None, 1), ("2025-10-01", [1])])
+def test_listar_reservas_cursor_con_valores_no_validos_responde_400(cliente_reservas, valores):
+    respuesta = cliente_reservas.get("/reservas/usuario/1", params={"cursor": codificar_cursor(*valores)})
+    assert respuesta.status_code == 400
+    assert respuesta.json()["detail"] == "Cursor de paginación no válido"
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.routes.reservas import _expandir_ocurrencias
+from app.schemas.reservas import MAX_OCURRENCIAS, ReservaRecurrenteCreate
+
+UTC = timezone.utc
+
+
+def _serie(**datos):
+    return ReservaRecurrenteCreate(espacio="quincho", **datos)
+
+
+def test_regla_semanal_con_repeticiones():
+    ocurrencias = _expandir_ocurrencias(_serie(
+        fecha_hora_inicio="2025-11-05T19:00:00Z", fecha_hora_fin="2025-11-05T21:00:00Z",
+        frecuencia="semanal", cada=2, repeticiones=3,
+    ))
+    inicios = [inicio for inicio, _ in ocurrencias]
+    assert inicios == [datetime(2025, 11, 5, 19, tzinfo=UTC) + timedelta(weeks=2 * i) for i in range(3)]
+    assert all(fin - inicio == timedelta(hours=2) for inicio, fin in ocurrencias)
+
+
+def test_regla_hasta_es_inclusiva():
+    ocurrencias = _expandir_ocurrencias(_serie(
+        fecha_hora_inicio="2025-11-01T10:00:00Z", fecha_hora_fin="2025-11-01T11:00:00Z",
+        frecuencia="diaria", hasta="2025-11-04T10:00:00Z",
+    ))
+    assert len(ocurrencias) == 4
+
+
+def test_mezcla_de_fechas_con_y_sin_zona():
+    # 'hasta' sin zona se interpreta como UTC
+    ocurrencias = _expandir_ocurrencias(_serie(
+        fecha_hora_inicio="2025-11-05T19:00:00-03:00", fecha_hora_fin="2025-11-05T21:00:00-03:00",
+        frecuencia="semanal", hasta="2025-11-19T22:00:00",
+    ))
+    assert len(ocurrencias) == 3
+    assert ocurrencias[0][0] == datetime(2025, 11, 5, 22, tzinfo=UTC)
+
+    intervalos = _expandir_ocurrencias(_serie(intervalos=[
+        {"fecha_hora_inicio": "2025-11-05T19:00:00", "fecha_hora_fin": "2025-11-05T22:00:00+02:00"},
+    ]))
+    assert intervalos == [(datetime(2025, 11, 5, 19, tzinfo=UTC), datetime(2025, 11, 5, 20, tzinfo=UTC))]
+
+
+@pytest.mark.parametrize("datos", [
+    {},
+    {"fecha_hora_inicio": "2025-11-05T19:00:00Z", "fecha_hora_fin": "2025-11-05T21:00:00Z", "frecuencia": "diaria"},
+    {"fecha_hora_inicio": "2025-11-05T19:00:00Z", "fecha_hora_fin": "2025-11-05T19:00:00Z", "frecuencia": "diaria", "repeticiones": 2},
+    {"fecha_hora_inicio": "2025-11-05T19:00:00Z", "fecha_hora_fin": "2025-11-05T21:00:00Z", "frecuencia": "diaria", "hasta": "2025-11-01T00:00:00Z"},
+    {"fecha_hora_inicio": "2020-01-01T19:00:00Z", "fecha_hora_fin": "2020-01-01T21:00:00Z", "frecuencia": "diaria", "hasta": "2030-01-01T00:00:00Z"},
+])
+def test_series_mal_definidas_responden_400(datos):
+    with pytest.raises(HTTPException) as error:
+        _expandir_ocurrencias(_serie(**datos))
+    assert error.value.status_code == 400
+
+
+def test_maximo_de_ocurrencias():
+    ocurrencias = _expandir_ocurrencias(_serie(
+        fecha_hora_inicio="2025-01-01T10:00:00Z", fecha_hora_fin="2025-01-01T11:00:00Z",
+        frecuencia="diaria", repeticiones=MAX_OCURRENCIAS,
+    ))
+    assert len(ocurrencias) == MAX_OCURRENCIAS
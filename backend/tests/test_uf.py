@@ -0,0 +1,84 @@
+import asyncio
+import io
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.core.config import settings
+from app.services import uf
+from app.services.uf import ServicioUF, UFNoDisponible, ValorUFDia, consultar_cmf, parsear_valor_cmf
+
+
+def test_parsear_valor_cmf():
+    assert parsear_valor_cmf("39.485,65") == Decimal("39485.65")
+    assert parsear_valor_cmf("985,1") == Decimal("985.1")
+    with pytest.raises(ValueError):
+        parsear_valor_cmf("sin valor")
+    with pytest.raises(ValueError):
+        parsear_valor_cmf(None)
+
+
+def test_a_pesos_redondea_al_peso():
+    valor = ValorUFDia(date(2025, 11, 3), Decimal("39485.65"), "cmf")
+    assert valor.a_pesos(Decimal("7.6")) == Decimal("300091")
+    assert ValorUFDia(date(2025, 11, 3), Decimal("10.25"), "cmf").a_pesos(2) == Decimal("21")
+
+
+def _responder(monkeypatch, cuerpo):
+    monkeypatch.setattr(settings, "CMF_API_KEY", "clave")
+    monkeypatch.setattr(uf.urllib.request, "urlopen", lambda *a, **k: io.BytesIO(json.dumps(cuerpo).encode()))
+
+
+def test_consultar_cmf(monkeypatch):
+    _responder(monkeypatch, {"UFs": [{"Valor": "39.485,65", "Fecha": "2025-11-03"}]})
+    assert consultar_cmf() == (date(2025, 11, 3), Decimal("39485.65"))
+
+
+def test_consultar_cmf_respuesta_inesperada(monkeypatch):
+    _responder(monkeypatch, {"CodigoError": 81})
+    with pytest.raises(ValueError):
+        consultar_cmf()
+
+
+def test_consultar_cmf_sin_api_key(monkeypatch):
+    monkeypatch.setattr(settings, "CMF_API_KEY", "")
+    monkeypatch.setattr(uf.urllib.request, "urlopen", pytest.fail)
+    with pytest.raises(ValueError):
+        consultar_cmf()
+
+
+class _SesionSinValores:
+    """Sesión falsa: `valores_uf` está vacía"""
+
+    class _Resultado:
+        def first(self):
+            return None
+
+    async def execute(self, *args, **kwargs):
+        return self._Resultado()
+
+
+def test_falla_sin_respaldo_no_reintenta_antes_del_plazo(monkeypatch):
+    consultas = []
+
+    def falla():
+        consultas.append(1)
+        raise OSError("sin red")
+
+    monkeypatch.setattr(uf, "consultar_cmf", falla)
+    servicio = ServicioUF(session_factory=None)
+
+    async def obtener_varias():
+        for _ in range(3):
+            with pytest.raises(UFNoDisponible):
+                await servicio.obtener(_SesionSinValores())
+
+    asyncio.run(obtener_varias())
+    assert len(consultas) == 1
+
+    monkeypatch.setattr(uf.time, "monotonic", lambda: float("inf"))
+    with pytest.raises(UFNoDisponible):
+        asyncio.run(servicio.obtener(_SesionSinValores()))
+    assert len(consultas) == 2
@@ -0,0 +1,28 @@
+-- Migración: Outbox transaccional para escrituras en Google Calendar
+-- Descripción: crear_reserva/cancelar_reserva registran la operación en la
+-- misma transacción que la reserva; un worker en segundo plano la envía a
+-- Google con reintentos y completa reservas.google_event_id.
+
+CREATE TABLE IF NOT EXISTS public.calendar_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  operacion VARCHAR(20) NOT NULL,            -- crear|eliminar
+  reserva_id BIGINT NOT NULL,                -- sin FK: la reserva puede eliminarse antes de procesar
+  espacio VARCHAR(50) NOT NULL,              -- clave de ESPACIOS_COMUNES
+  google_event_id VARCHAR(255),
+  payload JSONB,
+  estado VARCHAR(20) NOT NULL DEFAULT 'pendiente', -- pendiente|procesado|cancelado|fallido
+  intentos INT NOT NULL DEFAULT 0,
+  ultimo_error TEXT,
+  proximo_intento TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  procesado_at TIMESTAMPTZ,
+  CHECK (operacion IN ('crear', 'eliminar'))
+);
+
+-- El worker solo recorre las operaciones pendientes
+CREATE INDEX IF NOT EXISTS idx_calendar_outbox_pendientes
+  ON public.calendar_outbox (proximo_intento)
+  WHERE estado = 'pendiente';
+
+CREATE INDEX IF NOT EXISTS idx_calendar_outbox_reserva_id
+  ON public.calendar_outbox (reserva_id);
@@ -0,0 +1,19 @@
+-- Migración: Slug único para espacios_comunes
+-- Descripción: La API resuelve los espacios por su clave (multicancha,
+-- quincho, sala_eventos) con un registro en memoria indexado por slug, en vez
+-- de buscar por nombre con ILIKE '%...%' en cada request.
+
+ALTER TABLE public.espacios_comunes
+  ADD COLUMN IF NOT EXISTS slug VARCHAR(50);
+
+-- Completar el slug de los espacios existentes a partir del nombre
+UPDATE public.espacios_comunes
+SET slug = CASE
+    WHEN nombre ILIKE '%multicancha%' THEN 'multicancha'
+    WHEN nombre ILIKE '%quincho%' THEN 'quincho'
+    WHEN nombre ILIKE '%sala de eventos%' THEN 'sala_eventos'
+  END
+WHERE slug IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_espacios_comunes_slug
+  ON public.espacios_comunes (slug);
@@ -0,0 +1,10 @@
+-- Migración: Índice compuesto para listar reservas por usuario
+-- Descripción: GET /reservas/usuario/{id} pagina por cursor (keyset) sobre
+-- (fecha_hora_inicio, id) en orden descendente; este índice resuelve el
+-- filtro, el orden y el LIMIT sin ordenar en memoria.
+
+CREATE INDEX IF NOT EXISTS idx_reservas_usuario_inicio
+  ON public.reservas (usuario_id, fecha_hora_inicio DESC, id DESC);
+
+-- El índice simple por usuario_id queda cubierto por el compuesto
+DROP INDEX IF EXISTS public.idx_reservas_usuario_id;
@@ -0,0 +1,34 @@
+-- Migración: Reservas sin solape garantizado por la base de datos
+-- Descripción: Reemplaza el SELECT previo de crear_reserva (que tenía una
+-- carrera entre el chequeo y el INSERT) por una exclusion constraint: dos
+-- reservas del mismo espacio no pueden tener rangos [inicio, fin) que se
+-- solapen. La API inserta directamente y traduce la violación (SQLSTATE
+-- 23P01) a un 409.
+--
+-- Antes de aplicarla, revisar que no existan solapes previos:
+--   SELECT a.id, b.id
+--   FROM public.reservas a
+--   JOIN public.reservas b
+--     ON a.espacio_comun_id = b.espacio_comun_id
+--    AND a.id < b.id
+--    AND tstzrange(a.fecha_hora_inicio, a.fecha_hora_fin) && tstzrange(b.fecha_hora_inicio, b.fecha_hora_fin);
+
+-- Necesaria para usar el operador = sobre BIGINT en un índice GiST
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'reservas_sin_solape'
+  ) THEN
+    ALTER TABLE public.reservas
+      ADD CONSTRAINT reservas_sin_solape
+      EXCLUDE USING gist (
+        espacio_comun_id WITH =,
+        tstzrange(fecha_hora_inicio, fecha_hora_fin, '[)') WITH &&
+      );
+  END IF;
+END $$;
+
+-- El índice GiST de la constraint cubre las búsquedas por espacio
+DROP INDEX IF EXISTS public.idx_reservas_espacio_id;
@@ -0,0 +1,17 @@
+-- Migración: Índices compuestos para el desglose de pagos por periodo
+-- Descripción: GET /pagos/residente/{id} filtra gastos comunes y multas por
+-- vivienda y periodo, y pagina cada sección por cursor (keyset) en orden
+-- descendente sobre (ano, mes, id) y (fecha_aplicada, id). Con estos índices
+-- la vista por defecto (últimos meses) solo lee las filas recientes.
+
+CREATE INDEX IF NOT EXISTS idx_gastos_vivienda_periodo
+  ON public.gastos_comunes (vivienda_id, ano, mes, id);
+
+CREATE INDEX IF NOT EXISTS idx_multas_vivienda_fecha
+  ON public.multas (vivienda_id, fecha_aplicada, id);
+
+-- Los índices simples por vivienda_id quedan cubiertos por los compuestos
+DROP INDEX IF EXISTS public.idx_gastos_vivienda_id;
+DROP INDEX IF EXISTS public.idx_multas_vivienda_id;
+
+-- Las reservas ya tienen idx_reservas_usuario_inicio (007)
@@ -0,0 +1,195 @@
+-- Migración: Saldo por vivienda mantenido de forma incremental
+-- Descripción: saldos_viviendas guarda, por vivienda, el total cobrado
+-- (gastos comunes, multas y reservas pendientes), el total pagado y el gasto
+-- común impago más antiguo. Los triggers de gastos_comunes, multas, reservas
+-- y pagos le suman la diferencia de cada fila escrita, de modo que leer el
+-- estado de deuda de una vivienda es una búsqueda por clave primaria.
+--
+-- Las reservas son del usuario: se cargan a su vivienda de menor id (la
+-- misma que usa el desglose de pagos). Si cambia la vivienda de un residente,
+-- el trigger de residentes_viviendas (016_saldos_residentes_viviendas.sql)
+-- recalcula las viviendas afectadas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.saldos_viviendas (
+  vivienda_id BIGINT PRIMARY KEY REFERENCES public.viviendas(id) ON UPDATE CASCADE ON DELETE CASCADE,
+  total_gastos DECIMAL(14,2) NOT NULL DEFAULT 0,
+  total_multas DECIMAL(14,2) NOT NULL DEFAULT 0,
+  total_reservas_pendientes DECIMAL(14,2) NOT NULL DEFAULT 0,
+  total_pagado DECIMAL(14,2) NOT NULL DEFAULT 0,
+  total_adeudado DECIMAL(14,2) GENERATED ALWAYS AS (total_gastos + total_multas + total_reservas_pendientes) STORED,
+  saldo DECIMAL(14,2) GENERATED ALWAYS AS (total_gastos + total_multas + total_reservas_pendientes - total_pagado) STORED,
+  gastos_impagos INT NOT NULL DEFAULT 0,
+  periodo_impago_desde DATE,                 -- primer día del gasto común impago más antiguo
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Suma una diferencia al saldo de la vivienda (crea la fila si no existe)
+CREATE OR REPLACE FUNCTION public.saldos_sumar(
+  p_vivienda_id BIGINT,
+  p_gastos NUMERIC DEFAULT 0,
+  p_multas NUMERIC DEFAULT 0,
+  p_reservas NUMERIC DEFAULT 0,
+  p_pagado NUMERIC DEFAULT 0,
+  p_impagos INT DEFAULT 0
+) RETURNS void LANGUAGE sql AS $$
+  INSERT INTO public.saldos_viviendas AS s
+    (vivienda_id, total_gastos, total_multas, total_reservas_pendientes, total_pagado, gastos_impagos)
+  SELECT p_vivienda_id, p_gastos, p_multas, p_reservas, p_pagado, p_impagos
+  WHERE p_vivienda_id IS NOT NULL
+  ON CONFLICT (vivienda_id) DO UPDATE SET
+    total_gastos = s.total_gastos + EXCLUDED.total_gastos,
+    total_multas = s.total_multas + EXCLUDED.total_multas,
+    total_reservas_pendientes = s.total_reservas_pendientes + EXCLUDED.total_reservas_pendientes,
+    total_pagado = s.total_pagado + EXCLUDED.total_pagado,
+    gastos_impagos = s.gastos_impagos + EXCLUDED.gastos_impagos,
+    updated_at = NOW();
+$$;
+
+-- Vivienda a la que se cargan las reservas de un usuario
+CREATE OR REPLACE FUNCTION public.saldos_vivienda_usuario(p_usuario_id BIGINT)
+RETURNS BIGINT LANGUAGE sql STABLE AS $$
+  SELECT MIN(vivienda_id) FROM public.residentes_viviendas WHERE usuario_id = p_usuario_id;
+$$;
+
+-- Gasto común impago más antiguo (usa el índice por vivienda y periodo,
+-- idx_gastos_vivienda_periodo_cubre desde 013)
+CREATE OR REPLACE FUNCTION public.saldos_actualizar_periodo_impago(p_vivienda_id BIGINT)
+RETURNS void LANGUAGE sql AS $$
+  UPDATE public.saldos_viviendas
+     SET periodo_impago_desde = (
+       SELECT make_date(g.ano, g.mes, 1)
+         FROM public.gastos_comunes g
+        WHERE g.vivienda_id = p_vivienda_id AND g.estado <> 'pagado'
+        ORDER BY g.ano, g.mes
+        LIMIT 1
+     )
+   WHERE vivienda_id = p_vivienda_id;
+$$;
+
+CREATE OR REPLACE FUNCTION public.saldos_trg_gastos_comunes() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    PERFORM public.saldos_sumar(OLD.vivienda_id, p_gastos => -OLD.monto_total,
+                                p_impagos => -(OLD.estado <> 'pagado')::int);
+  END IF;
+  IF TG_OP <> 'DELETE' THEN
+    PERFORM public.saldos_sumar(NEW.vivienda_id, p_gastos => NEW.monto_total,
+                                p_impagos => (NEW.estado <> 'pagado')::int);
+    PERFORM public.saldos_actualizar_periodo_impago(NEW.vivienda_id);
+  END IF;
+  IF TG_OP = 'DELETE' OR OLD.vivienda_id <> NEW.vivienda_id THEN
+    PERFORM public.saldos_actualizar_periodo_impago(OLD.vivienda_id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.saldos_trg_multas() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    PERFORM public.saldos_sumar(OLD.vivienda_id, p_multas => -OLD.monto);
+  END IF;
+  IF TG_OP <> 'DELETE' THEN
+    PERFORM public.saldos_sumar(NEW.vivienda_id, p_multas => NEW.monto);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.saldos_trg_reservas() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' AND OLD.estado_pago = 'pendiente' THEN
+    PERFORM public.saldos_sumar(public.saldos_vivienda_usuario(OLD.usuario_id), p_reservas => -OLD.monto_pago);
+  END IF;
+  IF TG_OP <> 'DELETE' AND NEW.estado_pago = 'pendiente' THEN
+    PERFORM public.saldos_sumar(public.saldos_vivienda_usuario(NEW.usuario_id), p_reservas => NEW.monto_pago);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.saldos_trg_pagos() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    PERFORM public.saldos_sumar(
+      (SELECT vivienda_id FROM public.gastos_comunes WHERE id = OLD.gasto_comun_id), p_pagado => -OLD.monto_pagado);
+  END IF;
+  IF TG_OP <> 'DELETE' THEN
+    PERFORM public.saldos_sumar(
+      (SELECT vivienda_id FROM public.gastos_comunes WHERE id = NEW.gasto_comun_id), p_pagado => NEW.monto_pagado);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Solo las columnas que afectan el saldo disparan los triggers en UPDATE
+-- (p. ej. el outbox actualiza reservas.google_event_id sin tocar saldos)
+DROP TRIGGER IF EXISTS saldos_gastos_comunes ON public.gastos_comunes;
+CREATE TRIGGER saldos_gastos_comunes
+  AFTER INSERT OR DELETE OR UPDATE OF vivienda_id, ano, mes, monto_total, estado ON public.gastos_comunes
+  FOR EACH ROW EXECUTE FUNCTION public.saldos_trg_gastos_comunes();
+
+DROP TRIGGER IF EXISTS saldos_multas ON public.multas;
+CREATE TRIGGER saldos_multas
+  AFTER INSERT OR DELETE OR UPDATE OF vivienda_id, monto ON public.multas
+  FOR EACH ROW EXECUTE FUNCTION public.saldos_trg_multas();
+
+DROP TRIGGER IF EXISTS saldos_reservas ON public.reservas;
+CREATE TRIGGER saldos_reservas
+  AFTER INSERT OR DELETE OR UPDATE OF usuario_id, monto_pago, estado_pago ON public.reservas
+  FOR EACH ROW EXECUTE FUNCTION public.saldos_trg_reservas();
+
+DROP TRIGGER IF EXISTS saldos_pagos ON public.pagos;
+CREATE TRIGGER saldos_pagos
+  AFTER INSERT OR DELETE OR UPDATE OF gasto_comun_id, monto_pagado ON public.pagos
+  FOR EACH ROW EXECUTE FUNCTION public.saldos_trg_pagos();
+
+-- Carga inicial: bloquea las escrituras mientras se calcula para no perder
+-- diferencias entre el cálculo y la activación de los triggers
+LOCK TABLE public.gastos_comunes, public.multas, public.reservas, public.pagos IN SHARE MODE;
+
+INSERT INTO public.saldos_viviendas AS s
+  (vivienda_id, total_gastos, total_multas, total_reservas_pendientes, total_pagado, gastos_impagos, periodo_impago_desde)
+SELECT v.id,
+       COALESCE(g.total, 0),
+       COALESCE(m.total, 0),
+       COALESCE(r.total, 0),
+       COALESCE(p.total, 0),
+       COALESCE(g.impagos, 0),
+       g.periodo_impago_desde
+  FROM public.viviendas v
+  LEFT JOIN (
+    SELECT vivienda_id,
+           SUM(monto_total) AS total,
+           COUNT(*) FILTER (WHERE estado <> 'pagado') AS impagos,
+           MIN(make_date(ano, mes, 1)) FILTER (WHERE estado <> 'pagado') AS periodo_impago_desde
+      FROM public.gastos_comunes
+     GROUP BY vivienda_id
+  ) g ON g.vivienda_id = v.id
+  LEFT JOIN (
+    SELECT vivienda_id, SUM(monto) AS total FROM public.multas GROUP BY vivienda_id
+  ) m ON m.vivienda_id = v.id
+  LEFT JOIN (
+    SELECT public.saldos_vivienda_usuario(usuario_id) AS vivienda_id, SUM(monto_pago) AS total
+      FROM public.reservas
+     WHERE estado_pago = 'pendiente'
+     GROUP BY 1
+  ) r ON r.vivienda_id = v.id
+  LEFT JOIN (
+    SELECT g.vivienda_id, SUM(p.monto_pagado) AS total
+      FROM public.pagos p
+      JOIN public.gastos_comunes g ON g.id = p.gasto_comun_id
+     GROUP BY g.vivienda_id
+  ) p ON p.vivienda_id = v.id
+ON CONFLICT (vivienda_id) DO UPDATE SET
+  total_gastos = EXCLUDED.total_gastos,
+  total_multas = EXCLUDED.total_multas,
+  total_reservas_pendientes = EXCLUDED.total_reservas_pendientes,
+  total_pagado = EXCLUDED.total_pagado,
+  gastos_impagos = EXCLUDED.gastos_impagos,
+  periodo_impago_desde = EXCLUDED.periodo_impago_desde,
+  updated_at = NOW();
+
+COMMIT;
@@ -0,0 +1,9 @@
+-- Migración: Cache diario del valor de la UF
+-- Descripción: el backend consulta la UF a la CMF una vez al día y la guarda
+-- aquí; si la CMF no responde, usa el último valor guardado.
+
+CREATE TABLE IF NOT EXISTS public.valores_uf (
+  fecha DATE PRIMARY KEY,
+  valor DECIMAL(12,2) NOT NULL CHECK (valor > 0),
+  obtenido_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
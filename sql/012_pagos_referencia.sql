@@ -0,0 +1,9 @@
+-- Migración: Referencia de transacción en pagos
+-- Descripción: la conciliación de cartolas bancarias guarda el id de la
+-- transacción del banco/Webpay; el índice único hace idempotente la carga
+-- (ON CONFLICT (referencia) DO NOTHING). Los pagos sin referencia (NULL) no
+-- se ven afectados.
+
+ALTER TABLE public.pagos ADD COLUMN IF NOT EXISTS referencia VARCHAR(100);
+
+CREATE UNIQUE INDEX IF NOT EXISTS pagos_referencia_key ON public.pagos (referencia);
@@ -0,0 +1,34 @@
+-- Migración: Versión de los gastos comunes de una vivienda
+-- Descripción: GET /gastos/vivienda/{id} responde con un ETag calculado con
+-- count(*) y max(updated_at) de los gastos de la vivienda, y 304 si el
+-- cliente ya tiene esa versión.
+-- - updated_at se actualiza en cada UPDATE (trigger), también en los UPDATE
+--   masivos (conciliación de cartolas).
+-- - El índice por (vivienda_id, ano, mes, id) incluye updated_at y las
+--   columnas del listado: la versión y el listado se leen solo del índice.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION public.gastos_comunes_tocar_updated_at() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_gastos_comunes_updated_at ON public.gastos_comunes;
+CREATE TRIGGER trg_gastos_comunes_updated_at
+  BEFORE UPDATE ON public.gastos_comunes
+  FOR EACH ROW
+  WHEN (OLD.* IS DISTINCT FROM NEW.*)
+  EXECUTE FUNCTION public.gastos_comunes_tocar_updated_at();
+
+-- Reemplaza el índice de 009 (mismas columnas clave, más las incluidas)
+CREATE INDEX IF NOT EXISTS idx_gastos_vivienda_periodo_cubre
+  ON public.gastos_comunes (vivienda_id, ano, mes, id)
+  INCLUDE (updated_at, monto_total, estado, vencimiento);
+
+DROP INDEX IF EXISTS public.idx_gastos_vivienda_periodo;
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- Migración: updated_at mantenido por trigger en multas y reservas
+-- Descripción: las rutas con GET condicional (ETag) usan count(*) y
+-- max(updated_at) como versión de los datos. gastos_comunes ya lo tiene
+-- (013); aquí se agrega a multas y reservas, y los tres usan la misma
+-- función de trigger.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION public.tocar_updated_at() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$;
+
+ALTER TABLE public.multas ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+ALTER TABLE public.reservas ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+DROP TRIGGER IF EXISTS trg_multas_updated_at ON public.multas;
+CREATE TRIGGER trg_multas_updated_at
+  BEFORE UPDATE ON public.multas
+  FOR EACH ROW
+  WHEN (OLD.* IS DISTINCT FROM NEW.*)
+  EXECUTE FUNCTION public.tocar_updated_at();
+
+DROP TRIGGER IF EXISTS trg_reservas_updated_at ON public.reservas;
+CREATE TRIGGER trg_reservas_updated_at
+  BEFORE UPDATE ON public.reservas
+  FOR EACH ROW
+  WHEN (OLD.* IS DISTINCT FROM NEW.*)
+  EXECUTE FUNCTION public.tocar_updated_at();
+
+DROP TRIGGER IF EXISTS trg_gastos_comunes_updated_at ON public.gastos_comunes;
+CREATE TRIGGER trg_gastos_comunes_updated_at
+  BEFORE UPDATE ON public.gastos_comunes
+  FOR EACH ROW
+  WHEN (OLD.* IS DISTINCT FROM NEW.*)
+  EXECUTE FUNCTION public.tocar_updated_at();
+
+DROP FUNCTION IF EXISTS public.gastos_comunes_tocar_updated_at();
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- Migración: Operaciones del outbox en proceso
+-- Descripción: el worker marca las operaciones que toma como 'en_proceso'
+-- (con su plazo en proximo_intento) y hace commit antes de llamar a Google;
+-- si el plazo vence sin resultado, otro worker la vuelve a tomar. El índice
+-- parcial del worker pasa a cubrir ambos estados.
+
+DROP INDEX IF EXISTS public.idx_calendar_outbox_pendientes;
+
+CREATE INDEX IF NOT EXISTS idx_calendar_outbox_pendientes
+  ON public.calendar_outbox (proximo_intento)
+  WHERE estado IN ('pendiente', 'en_proceso');
@@ -0,0 +1,54 @@
+-- Migración: Saldos al cambiar la vivienda de un residente
+-- Descripción: las reservas pendientes se cargan a la vivienda de menor id
+-- del usuario (saldos_vivienda_usuario), así que agregar, quitar o mover un
+-- residente cambia a qué vivienda corresponden. El trigger de
+-- residentes_viviendas recalcula total_reservas_pendientes de las viviendas
+-- de los usuarios afectados, sin esperar a la verificación periódica.
+--
+-- Los triggers AFTER ... FOR EACH ROW se ejecutan al terminar la sentencia y
+-- ven su estado final: cada uno recalcula desde cero (no suma diferencias),
+-- por lo que una sentencia que toca varias filas del mismo usuario también
+-- queda bien.
+
+BEGIN;
+
+-- Recalcula las reservas pendientes cargadas a cada vivienda de la lista
+CREATE OR REPLACE FUNCTION public.saldos_recalcular_reservas(p_viviendas BIGINT[])
+RETURNS void LANGUAGE sql AS $$
+  INSERT INTO public.saldos_viviendas AS s (vivienda_id, total_reservas_pendientes)
+  SELECT v.id, COALESCE(SUM(r.monto_pago), 0)
+    FROM public.viviendas v
+    LEFT JOIN public.residentes_viviendas rv
+      ON rv.vivienda_id = v.id AND public.saldos_vivienda_usuario(rv.usuario_id) = v.id
+    LEFT JOIN public.reservas r
+      ON r.usuario_id = rv.usuario_id AND r.estado_pago = 'pendiente'
+   WHERE v.id = ANY(p_viviendas)
+   GROUP BY v.id
+  ON CONFLICT (vivienda_id) DO UPDATE SET
+    total_reservas_pendientes = EXCLUDED.total_reservas_pendientes,
+    updated_at = NOW();
+$$;
+
+-- Viviendas afectadas: las actuales de los usuarios de la fila y la que deja
+-- (la de menor id antes del cambio está entre ambas)
+CREATE OR REPLACE FUNCTION public.saldos_trg_residentes_viviendas() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+  v_viviendas BIGINT[];
+BEGIN
+  SELECT array_agg(vivienda_id) INTO v_viviendas
+    FROM public.residentes_viviendas
+   WHERE usuario_id IN (OLD.usuario_id, NEW.usuario_id);
+  IF TG_OP <> 'INSERT' THEN
+    v_viviendas := array_append(v_viviendas, OLD.vivienda_id);
+  END IF;
+  PERFORM public.saldos_recalcular_reservas(v_viviendas);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS saldos_residentes_viviendas ON public.residentes_viviendas;
+CREATE TRIGGER saldos_residentes_viviendas
+  AFTER INSERT OR DELETE OR UPDATE OF usuario_id, vivienda_id ON public.residentes_viviendas
+  FOR EACH ROW EXECUTE FUNCTION public.saldos_trg_residentes_viviendas();
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Migración: updated_at de reservas sin contar google_event_id
+-- Descripción: el worker del outbox escribe google_event_id en cada reserva
+-- recién creada; ese dato no sale en los listados, así que no debe cambiar
+-- updated_at (la versión del ETag de GET /reservas/usuario/{id}). El trigger
+-- compara la fila sin google_event_id ni updated_at.
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS trg_reservas_updated_at ON public.reservas;
+CREATE TRIGGER trg_reservas_updated_at
+  BEFORE UPDATE ON public.reservas
+  FOR EACH ROW
+  WHEN (to_jsonb(OLD) - 'google_event_id' - 'updated_at' IS DISTINCT FROM to_jsonb(NEW) - 'google_event_id' - 'updated_at')
+  EXECUTE FUNCTION public.tocar_updated_at();
+
+COMMIT;
@@ -82,6 +82,45 @@ class ReservasService {
     }
   }
 
+  /**
+   * Obtiene la disponibilidad de varios espacios en una sola llamada
+   * @param {Array<string>|null} espacios - Espacios a consultar (default: todos)
+   * @param {Date} fechaInicio - Fecha de inicio (default: hoy)
+   * @param {Date} fechaFin - Fecha de fin (default: 30 días desde hoy)
+   * @param {number} duracionMinutos - Duración en minutos (default: 60)
+   * @returns {Promise<Object>} Disponibilidad con slots por espacio
+   */
+  async obtenerDisponibilidadEspacios(espacios = null, fechaInicio = null, fechaFin = null, duracionMinutos = 60) {
+    try {
+      const params = {
+        duracion_minutos: duracionMinutos,
+      };
+
+      if (espacios && espacios.length > 0) {
+        params.espacios = espacios.join(',');
+      }
+      if (fechaInicio) {
+        params.fecha_inicio = fechaInicio.toISOString();
+      }
+      if (fechaFin) {
+        params.fecha_fin = fechaFin.toISOString();
+      }
+
+      const response = await this.client.get('/disponibilidad', { params });
+
+      return {
+        success: true,
+        data: response.data,
+      };
+    } catch (error) {
+      return {
+        success: false,
+        error: error.response?.data?.detail || 'Error al obtener disponibilidad',
+        status: error.response?.status,
+      };
+    }
+  }
+
   /**
    * Crea una nueva reserva
    * @param {string} espacio - Tipo de espacio
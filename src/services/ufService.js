@@ -1,27 +1,10 @@
-// Service to fetch current UF value from CMF API
+// Service to fetch current UF value from the backend (/api/v1/uf)
+// The backend caches the CMF value for the day, so the API key stays server-side
 // Exposes: fetchCurrentUf() -> { valueClp: number, date: string }
 
-const isDev = import.meta.env.DEV;
-// In dev, use Vite proxy path to avoid CORS; in prod, call full CMF API URL
-const API_URL = isDev
-  ? (import.meta.env.VITE_CMF_API_PROXY_PATH || '/cmf/uf')
-  : (import.meta.env.VITE_CMF_API_URL || 'https://api.cmfchile.cl/api-sbifv3/recursos_api/uf');
-const API_KEY = import.meta.env.VITE_CMF_API_KEY;
-
-function parseChileanNumber(str) {
-  if (typeof str !== 'string') return NaN;
-  // Convert "20.939,49" -> 20939.49
-  const normalized = str.replace(/\./g, '').replace(',', '.');
-  const n = Number.parseFloat(normalized);
-  return Number.isFinite(n) ? n : NaN;
-}
-
 export async function fetchCurrentUf(signal) {
-  if (!API_KEY) {
-    throw new Error('Falta VITE_CMF_API_KEY en variables de entorno');
-  }
-  const url = `${API_URL}?apikey=${API_KEY}&formato=json`;
-  const res = await fetch(url, {
+  // Using Vite proxy: '/api' forwards to backend target
+  const res = await fetch('/api/v1/uf', {
     signal,
     headers: { 'Accept': 'application/json' }
   });
@@ -31,17 +14,12 @@ export async function fetchCurrentUf(signal) {
     throw new Error(`Error al consultar UF: ${res.status} ${res.statusText}${detail ? ` - ${detail}` : ''}`);
   }
   const data = await res.json();
-  // Expected JSON: { UFs: [ { Valor: "20.939,49", Fecha: "YYYY-MM-DD" } ] }
-  const ufItem = data?.UFs?.[0];
-  if (!ufItem) {
-    throw new Error('Respuesta UF inesperada');
-  }
-  const valueClp = parseChileanNumber(ufItem.Valor);
-  const date = ufItem.Fecha;
+  // Expected JSON: { valor: 39485.65, fecha: "YYYY-MM-DD", fuente: "cmf" }
+  const valueClp = Number(data?.valor);
   if (!Number.isFinite(valueClp)) {
-    throw new Error('No se pudo parsear el valor UF');
+    throw new Error('Respuesta UF inesperada');
   }
-  return { valueClp, date };
+  return { valueClp, date: data.fecha };
 }
 
 export function formatClp(amount) {